@@ -0,0 +1,112 @@
+"""Matching free-text product names (as users type them) to ``Product`` rows.
+
+Every lookup is one ranked query over the trigram-indexed
+``Product.search_text`` and the unique ``barcode`` index. Candidates are
+ordered by:
+
+1. barcode equal to the text;
+2. Hebrew or English name equal to the text;
+3. brand equal to the given brand (products of another brand last);
+4. trigram word similarity of the text (plus brand) to ``search_text``.
+
+``match_product`` leaves out products of another brand and accepts the top
+remaining candidate only when it is an exact match or similar enough
+(``CATALOG_MATCH_MIN_SIMILARITY``); otherwise callers create a new product
+rather than attach a report to an unrelated one.
+``match_products`` resolves many texts (e.g. historical
+``PriceReport.product_text_raw`` values) with one query per distinct
+normalized text.
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Case, IntegerField, Q, QuerySet, Value, When
+
+from .models import Product, normalize_product_text
+from .search import text_match
+
+# Candidates offered when a name is ambiguous
+MATCH_CANDIDATES = 5
+
+_BARCODE_RE = re.compile(r"^\d{8,14}$")
+
+
+def _min_similarity() -> float:
+    return float(getattr(settings, "CATALOG_MATCH_MIN_SIMILARITY", 0.6))
+
+
+def ranked_products(name: Optional[str], brand: Optional[str] = None) -> QuerySet[Product]:
+    """Products matching ``name``, best first, annotated with ``exact_rank``/``brand_rank``/``rank``."""
+    raw = (name or "").strip()
+    query_norm = normalize_product_text(raw)
+    if not query_norm:
+        return Product.objects.none()
+    brand = (brand or "").strip()
+    brand_norm = normalize_product_text(brand)
+
+    match = text_match(query_norm)
+    exact_whens = [When(Q(name_he__iexact=raw) | Q(name_en__iexact=raw), then=Value(2))]
+    if _BARCODE_RE.match(raw):
+        match |= Q(barcode=raw)
+        exact_whens.insert(0, When(barcode=raw, then=Value(3)))
+    if brand:
+        brand_rank = Case(
+            When(brand__iexact=brand, then=Value(2)),
+            When(brand="", then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    else:
+        brand_rank = Value(0, output_field=IntegerField())
+    scored_text = f"{query_norm} {brand_norm}" if brand_norm and brand_norm not in query_norm else query_norm
+    return (
+        Product.objects.filter(match, is_active=True)
+        .annotate(
+            exact_rank=Case(*exact_whens, default=Value(0), output_field=IntegerField()),
+            brand_rank=brand_rank,
+            rank=TrigramWordSimilarity(scored_text, "search_text"),
+        )
+        .order_by("-exact_rank", "-brand_rank", "-rank", "pk")
+    )
+
+
+def product_candidates(
+    name: Optional[str], brand: Optional[str] = None, limit: int = MATCH_CANDIDATES
+) -> list[Product]:
+    """The top ``limit`` of ``ranked_products``, in one query."""
+    return list(ranked_products(name, brand)[:limit])
+
+
+def is_confident(product: Product) -> bool:
+    """Whether a ranked candidate is close enough to reuse instead of creating a product."""
+    return bool(product.exact_rank) or product.rank >= _min_similarity()
+
+
+def match_product(name: Optional[str], brand: Optional[str] = None) -> Optional[Product]:
+    """The best product for ``name`` (and ``brand``), or ``None`` when no candidate is close enough."""
+    candidates = ranked_products(name, brand)
+    if (brand or "").strip():
+        # Same name, another brand: a different product, whatever its rank
+        candidates = candidates.filter(brand_rank__gt=0)
+    best = candidates.first()
+    if best is None or not is_confident(best):
+        return None
+    return best
+
+
+def match_products(names: Iterable[str], brand: Optional[str] = None) -> dict[str, Optional[Product]]:
+    """``match_product`` for many texts, keyed by the text; repeats share one lookup."""
+    by_norm: dict[str, Optional[Product]] = {}
+    matches: dict[str, Optional[Product]] = {}
+    for name in names:
+        if name in matches:
+            continue
+        key = normalize_product_text(name)
+        if key not in by_norm:
+            by_norm[key] = match_product(name, brand) if key else None
+        matches[name] = by_norm[key]
+    return matches
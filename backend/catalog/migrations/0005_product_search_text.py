@@ -0,0 +1,58 @@
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+_NON_WORD = re.compile(r"[^0-9a-zא-ת]+")
+
+
+def _normalize(value):
+    text = unicodedata.normalize("NFKC", value or "").casefold()
+    text = "".join(ch for ch in text if not ("֑" <= ch <= "ׇ"))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _search_text(*values):
+    words = []
+    for value in values:
+        for word in _normalize(value).split():
+            if word not in words:
+                words.append(word)
+    return " ".join(words)
+
+
+def populate_search_text(apps, schema_editor):
+    Product = apps.get_model("catalog", "Product")
+    batch = []
+    for product in Product.objects.only("id", "name_he", "name_en", "brand", "variant").iterator(chunk_size=2000):
+        product.search_text = _search_text(product.name_he, product.name_en, product.brand, product.variant)
+        batch.append(product)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, ["search_text"])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ["search_text"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_alter_product_default_unit_type'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='product_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -1,7 +1,34 @@
 from __future__ import annotations
+import re
+import unicodedata
+
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
+_NON_WORD = re.compile(r"[^0-9a-z\u05d0-\u05ea]+")
+
+# Product fields that search_text is derived from
+SEARCH_SOURCE_FIELDS = frozenset({"name_he", "name_en", "brand", "variant"})
+
+
+def normalize_product_text(value: str | None) -> str:
+    """Normalize product text for search: casefold, drop niqqud/punctuation, single spaces."""
+    text = unicodedata.normalize("NFKC", value or "").casefold()
+    text = "".join(ch for ch in text if not ("\u0591" <= ch <= "\u05c7"))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def build_product_search_text(*values: str | None) -> str:
+    """Space-joined normalized words of the given fields, without repeats."""
+    words: list[str] = []
+    for value in values:
+        for word in normalize_product_text(value).split():
+            if word not in words:
+                words.append(word)
+    return " ".join(words)
+
+
 class Product(models.Model):
     """Global product identity (not tied to any single store).
 
@@ -37,6 +64,8 @@ class Product(models.Model):
     category = models.CharField(max_length=120, blank=True)
     barcode = models.CharField(max_length=32, blank=True, null=True, unique=True)
     is_active = models.BooleanField(default=True)
+    # Normalized Hebrew/English names, brand and variant (trigram-indexed for search)
+    search_text = models.TextField(blank=True, default="", editable=False)
 
     # Many-to-many to stores through StoreProduct mapping table
     stores = models.ManyToManyField(
@@ -51,6 +80,7 @@ class Product(models.Model):
             models.Index(fields=["name_he"], name="product_name_he_idx"),
             models.Index(fields=["name_en"], name="product_name_en_idx"),
             models.Index(fields=["brand", "category"], name="product_brand_cat_idx"),
+            GinIndex(fields=["search_text"], opclasses=["gin_trgm_ops"], name="product_search_trgm_idx"),
         ]
 
     def __str__(self) -> str:  # pragma: no cover
@@ -67,8 +97,20 @@ class Product(models.Model):
             self.default_unit_type_he = self.default_unit_type
         if not self.default_unit_type and self.default_unit_type_en:
             self.default_unit_type = self.default_unit_type_en
+        self.set_search_fields()
+        update_fields = kwargs.get("update_fields")
+        if (
+            update_fields is not None
+            and "search_text" not in update_fields
+            and SEARCH_SOURCE_FIELDS.intersection(update_fields)
+        ):
+            kwargs["update_fields"] = [*update_fields, "search_text"]
         super().save(*args, **kwargs)
 
+    def set_search_fields(self) -> None:
+        """Fill search_text (bulk_create callers must call this)."""
+        self.search_text = build_product_search_text(self.name_he, self.name_en, self.brand, self.variant)
+
 
 class StoreProduct(models.Model):
     """Through model for Product×Store availability/metadata.
@@ -0,0 +1,36 @@
+"""Product search over ``Product.search_text``.
+
+``search_text`` holds the normalized Hebrew/English names, brand and variant
+and carries a ``gin_trgm_ops`` index, so both the substring match (``LIKE
+'%q%'``) and the typo-tolerant word-similarity match (``q <% search_text``)
+are index scans on the product table. Callers join prices by product id.
+"""
+from __future__ import annotations
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q, QuerySet
+
+from .models import Product, normalize_product_text
+
+# Best-ranked products considered per search
+PRODUCT_CANDIDATES = 50
+
+
+def text_match(query_norm: str, field: str = "search_text") -> Q:
+    """Substring or trigram word-similarity match of an already normalized query."""
+    return Q(**{f"{field}__contains": query_norm}) | Q(**{f"{field}__trigram_word_similar": query_norm})
+
+
+def search_products(query: str, brand: str | None = None) -> QuerySet[Product]:
+    """Products matching ``query`` (and ``brand`` when given), best match first.
+
+    Ranked by trigram word similarity; the annotation is exposed as ``rank``.
+    """
+    query_norm = normalize_product_text(query)
+    if not query_norm:
+        return Product.objects.none()
+    qs = Product.objects.filter(text_match(query_norm))
+    brand_norm = normalize_product_text(brand)
+    if brand_norm:
+        qs = qs.filter(text_match(brand_norm))
+    return qs.annotate(rank=TrigramWordSimilarity(query_norm, "search_text")).order_by("-rank", "id")
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from django.test import TestCase
+
+from catalog.matching import match_product, match_products, product_candidates
+from catalog.models import Product
+
+
+class ProductMatchingTests(TestCase):
+    def setUp(self):
+        self.tnuva = Product.objects.create(name_he="חלב תנובה 3%", name_en="Tnuva Milk 3% 1L", brand="Tnuva")
+        self.tara = Product.objects.create(name_he="חלב טרה 3%", name_en="Tara Milk 3% 1L", brand="Tara")
+        self.rice = Product.objects.create(name_he="אורז פרסי", name_en="Persian Rice", brand="Sugat", barcode="7290000123456")
+
+    def test_exact_name_and_barcode(self):
+        self.assertEqual(match_product("tnuva milk 3% 1l"), self.tnuva)
+        self.assertEqual(match_product("7290000123456"), self.rice)
+
+    def test_typo_matches_by_similarity(self):
+        self.assertEqual(match_product("Persian Rise"), self.rice)
+
+    def test_brand_breaks_ties_and_rejects_other_brands(self):
+        self.assertEqual(product_candidates("חלב 3%", "Tara")[0], self.tara)
+        self.assertIsNone(match_product("Persian Rice", "Osem"))
+
+    def test_exact_name_of_another_brand_does_not_hide_a_close_match(self):
+        Product.objects.create(name_he="חלב 3% 1 ליטר", name_en="Milk 3% 1L", brand="Tnuva")
+        self.assertEqual(match_product("Milk 3% 1L", "Tara"), self.tara)
+
+    def test_unrelated_name_does_not_match(self):
+        # The old three-letter prefix fallback matched "אורז פרסי" here
+        self.assertIsNone(match_product("אורגנו"))
+
+    def test_candidates_in_one_query(self):
+        with self.assertNumQueries(1):
+            candidates = product_candidates("milk 3%")
+        self.assertEqual({p.pk for p in candidates}, {self.tnuva.pk, self.tara.pk})
+
+    def test_batch_shares_lookups_for_repeated_texts(self):
+        with self.assertNumQueries(2):
+            matches = match_products(["Persian Rice", "persian rice!", "Tara Milk 3% 1L", "Persian Rice"])
+        self.assertEqual(matches["persian rice!"], self.rice)
+        self.assertEqual(matches["Tara Milk 3% 1L"], self.tara)
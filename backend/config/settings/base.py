@@ -40,6 +40,7 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',') if os.getenv('ALLOWED_
 
 INSTALLED_APPS = [
     'django.contrib.gis',
+    'django.contrib.postgres',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -165,8 +166,75 @@ WHATSAPP_PHONE_NUMBER_ID = os.getenv('WHATSAPP_PHONE_NUMBER_ID', '')
 META_APP_SECRET = os.getenv('META_APP_SECRET', '')
 WHATSAPP_VERIFY_TOKEN = os.getenv('WHATSAPP_VERIFY_TOKEN', '')
 WA_SALT = os.getenv('WA_SALT', '')
+
+# Outbound Graph API transport (persistent keep-alive pool shared by sender threads)
+WHATSAPP_GRAPH_API_BASE_URL = os.getenv('WHATSAPP_GRAPH_API_BASE_URL', 'https://graph.facebook.com/v20.0')
+WHATSAPP_HTTP_POOL_SIZE = int(os.getenv('WHATSAPP_HTTP_POOL_SIZE', '16'))
+WHATSAPP_HTTP_TIMEOUT = float(os.getenv('WHATSAPP_HTTP_TIMEOUT', '10'))
+WHATSAPP_SEND_CONCURRENCY = int(os.getenv('WHATSAPP_SEND_CONCURRENCY', '16'))
 AXES_DISABLE_ACCESS_LOG = True
 
+# Webhook ingestion: when enabled the webhook only verifies, enqueues and acks;
+# `manage.py process_webhook_queue` drains the queue with a pool of workers.
+WHATSAPP_WEBHOOK_ASYNC = os.getenv('WHATSAPP_WEBHOOK_ASYNC', '').lower() in ('1', 'true', 'yes')
+WHATSAPP_WEBHOOK_WORKERS = int(os.getenv('WHATSAPP_WEBHOOK_WORKERS', '4'))
+WHATSAPP_WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WHATSAPP_WEBHOOK_MAX_ATTEMPTS', '5'))
+WHATSAPP_WEBHOOK_LOCK_TIMEOUT = int(os.getenv('WHATSAPP_WEBHOOK_LOCK_TIMEOUT', '300'))  # seconds
+WHATSAPP_WEBHOOK_BACKOFF_BASE = float(os.getenv('WHATSAPP_WEBHOOK_BACKOFF_BASE', '2'))  # seconds
+WHATSAPP_WEBHOOK_BACKOFF_MAX = float(os.getenv('WHATSAPP_WEBHOOK_BACKOFF_MAX', '300'))  # seconds
+
+# Webhook de-duplication by WhatsApp message id (per-process LRU + DB table).
+WHATSAPP_DEDUP_LRU_SIZE = int(os.getenv('WHATSAPP_DEDUP_LRU_SIZE', '10000'))
+WHATSAPP_DEDUP_TTL_HOURS = int(os.getenv('WHATSAPP_DEDUP_TTL_HOURS', '72'))
+
+# Shared cache (needs the `redis` package). Without REDIS_URL each process keeps a
+# local-memory cache, which is not safe for the per-user context cache when more
+# than one process handles messages, so that cache is then off by default.
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+
+# Per-user context cache (WAUser row + active flow pointers) and last_seen coalescing.
+WHATSAPP_USER_CACHE_TTL = int(os.getenv('WHATSAPP_USER_CACHE_TTL', '600' if REDIS_URL else '0'))  # seconds; 0 disables
+WHATSAPP_LAST_SEEN_FLUSH_SECONDS = float(os.getenv('WHATSAPP_LAST_SEEN_FLUSH_SECONDS', '60'))
+
+# Where in-progress add-deal flow state lives (whatsapp.session_store): "db" writes the
+# DealReportSession row once per message; "cache" (needs a shared cache such as Redis)
+# keeps it in the cache and writes the row on completion and every N steps.
+WHATSAPP_DEAL_SESSION_STORE = os.getenv('WHATSAPP_DEAL_SESSION_STORE', 'db')
+WHATSAPP_DEAL_SESSION_CHECKPOINT_STEPS = int(os.getenv('WHATSAPP_DEAL_SESSION_CHECKPOINT_STEPS', '5'))
+WHATSAPP_DEAL_SESSION_TTL = int(os.getenv('WHATSAPP_DEAL_SESSION_TTL', '86400'))  # seconds
+
+# Outbound outbox: when enabled replies are persisted and delivered in order per
+# recipient by `manage.py dispatch_outbox`, with retries and dead-lettering.
+WHATSAPP_OUTBOX_ENABLED = os.getenv('WHATSAPP_OUTBOX_ENABLED', '').lower() in ('1', 'true', 'yes')
+WHATSAPP_OUTBOX_WORKERS = int(os.getenv('WHATSAPP_OUTBOX_WORKERS', '2'))
+WHATSAPP_OUTBOX_MAX_ATTEMPTS = int(os.getenv('WHATSAPP_OUTBOX_MAX_ATTEMPTS', '8'))
+WHATSAPP_OUTBOX_BACKOFF_BASE = float(os.getenv('WHATSAPP_OUTBOX_BACKOFF_BASE', '1'))  # seconds
+WHATSAPP_OUTBOX_BACKOFF_MAX = float(os.getenv('WHATSAPP_OUTBOX_BACKOFF_MAX', '300'))  # seconds
+WHATSAPP_OUTBOX_LOCK_TIMEOUT = int(os.getenv('WHATSAPP_OUTBOX_LOCK_TIMEOUT', '120'))  # seconds
+
+# Find-a-deal by shared location: nearest stores within the radius whose latest
+# approved deal is newer than the max age.
+FIND_DEAL_RADIUS_KM = float(os.getenv('FIND_DEAL_RADIUS_KM', '15'))
+FIND_DEAL_MAX_AGE_DAYS = int(os.getenv('FIND_DEAL_MAX_AGE_DAYS', '30'))
+
+# In-memory city name index (stores.city_index): rebuilt after City/Store edits,
+# and at least this often when the cache is per-process.
+STORES_CITY_INDEX_TTL = int(os.getenv('STORES_CITY_INDEX_TTL', '300'))  # seconds
+
+# Product matching (catalog.matching): minimum trigram word similarity for a
+# typed product name to reuse an existing product instead of creating one.
+CATALOG_MATCH_MIN_SIMILARITY = float(os.getenv('CATALOG_MATCH_MIN_SIMILARITY', '0.6'))
+
+# Admin moderation queue (pricing.moderation.pending_queue): pending reports per page.
+PRICING_MODERATION_QUEUE_PAGE_SIZE = int(os.getenv('PRICING_MODERATION_QUEUE_PAGE_SIZE', '50'))
+
 # DRF configuration
 REST_FRAMEWORK = {
     'DEFAULT_THROTTLE_CLASSES': [
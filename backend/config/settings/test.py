@@ -12,3 +12,8 @@ PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
 
 # In-memory email backend to keep tests hermetic.
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+# Process-local caches would outlive the per-test transaction rollback.
+WHATSAPP_DEDUP_LRU_SIZE = 0
+WHATSAPP_USER_CACHE_TTL = 0
+WHATSAPP_LAST_SEEN_FLUSH_SECONDS = 0
@@ -3,14 +3,18 @@ from django import forms
 from django.contrib import admin, messages
 from django.contrib.admin.helpers import ActionForm
 from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.urls import path, reverse
 from django.shortcuts import redirect
 from django.template.response import TemplateResponse
-from django.utils import timezone, translation
-from django.utils.translation import gettext_lazy as _, gettext
-from .models import PriceReport, StoreProductSnapshot
+from django.utils.translation import gettext_lazy as _
+from . import export, moderation
+from .models import PriceFeedImport, PriceReport, StoreProductSnapshot
 from .forms import PriceReportFixForm
-from whatsapp.utils import send_whatsapp_text
+
+
+QUEUE_PARAM = "moderation_queue"
+QUEUE_AFTER_PARAM = "after"
 
 
 class PriceReportActionForm(ActionForm):
@@ -59,7 +63,7 @@ class PriceReportAdmin(admin.ModelAdmin):
         "store__city_obj__name_en",
     )
     autocomplete_fields = ("product", "store", "user")
-    readonly_fields = ("created_at", "moderated_at", "moderated_by")
+    readonly_fields = ("created_at", "moderated_at", "moderated_by", "deal_session")
     date_hierarchy = "observed_at"
     actions = ["mark_reports_approved", "mark_reports_rejected"]
 
@@ -71,18 +75,16 @@ class PriceReportAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.fix_view),
                 name="pricing_pricereport_fix",
             ),
+            path("export/", self.admin_site.admin_view(self.export_view), name="pricing_pricereport_export"),
         ]
         return custom + urls
 
     @admin.action(description=_("Approve selected price reports"))
     def mark_reports_approved(self, request, queryset):
-        updated = 0
-        for report in queryset.select_related("product", "store", "user"):
-            self._apply_moderation(report, request.user, approved=True)
-            updated += 1
+        result = moderation.approve_reports(queryset, request.user)
         self.message_user(
             request,
-            _("Marked %(count)s report(s) as approved.") % {"count": updated},
+            _("Marked %(count)s report(s) as approved.") % {"count": result.count},
             messages.SUCCESS,
         )
 
@@ -96,63 +98,50 @@ class PriceReportAdmin(admin.ModelAdmin):
                 messages.ERROR,
             )
             return
-        updated = 0
-        for report in queryset.select_related("product", "store", "user"):
-            self._apply_moderation(report, request.user, approved=False, reason=reason)
-            updated += 1
+        result = moderation.reject_reports(queryset, request.user, reason)
         self.message_user(
             request,
-            _("Rejected %(count)s report(s).") % {"count": updated},
+            _("Rejected %(count)s report(s).") % {"count": result.count},
             messages.WARNING,
         )
-        if request.POST.get("from_queue") == "1":
-            return self._queue_response(request, queryset)
-
-    def _apply_moderation(self, report: PriceReport, moderator, approved: bool, reason: str = "") -> None:
-        now = timezone.now()
-        report.needs_moderation = False
-        report.moderated_at = now
-        report.moderated_by = moderator
-        report.moderation_reason = "" if approved else reason[:240]
-        report.save(update_fields=["needs_moderation", "moderated_at", "moderated_by", "moderation_reason"])
-        if approved:
-            self._increment_snapshot(report)
-            self._notify_user_approved(report)
-
-    def _increment_snapshot(self, report: PriceReport) -> None:
-        snapshot, created = StoreProductSnapshot.objects.get_or_create(
-            product=report.product,
-            store=report.store,
-            defaults={
-                "last_price": report.price,
-                "last_observed_at": report.observed_at,
-                "confirmation_count": 0,
-            },
-        )
-        snapshot.last_price = report.price
-        snapshot.last_observed_at = report.observed_at
-        snapshot.confirmation_count = (snapshot.confirmation_count or 0) + 1
-        snapshot.save(update_fields=["last_price", "last_observed_at", "confirmation_count"])
-
-    def _notify_user_approved(self, report: PriceReport) -> None:
-        user = report.user
-        if not user or not getattr(user, "wa_number", ""):
-            return
-        locale = getattr(user, "locale", "en")
+
+    def changelist_view(self, request, extra_context=None):
+        if request.GET.get(QUEUE_PARAM) == "1":
+            # The queue's query parameters are not changelist filters
+            request.GET = request.GET.copy()
+            request.GET.pop(QUEUE_PARAM)
+            after = request.GET.pop(QUEUE_AFTER_PARAM, [""])[-1]
+            page = moderation.pending_queue(after=int(after) if after.isdigit() else None)
+            extra_context = {
+                **(extra_context or {}),
+                "queue": page.entries,
+                "queue_next_url": (
+                    f"?{QUEUE_PARAM}=1&{QUEUE_AFTER_PARAM}={page.next_after}" if page.next_after else ""
+                ),
+            }
+        return super().changelist_view(request, extra_context=extra_context)
+
+    def export_view(self, request):
+        """Stream approved reports (or snapshots) as CSV/JSON Lines; see pricing.export for the filters."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        dataset = request.GET.get("dataset", "reports")
+        fmt = request.GET.get("format", "csv")
+        if dataset not in export.DATASETS or fmt not in export.TEXT_FORMATS:
+            return HttpResponseBadRequest(
+                f"dataset must be one of {sorted(export.DATASETS)} and format one of {list(export.TEXT_FORMATS)}"
+            )
         try:
-            with translation.override(locale):
-                message = gettext(
-                    "Your deal for %(product)s at %(store)s (%(price)s₪) was approved! "
-                    "Thanks for helping everyone save."
-                ) % {
-                    "product": report.product_text_raw or report.product.name_he,
-                    "store": report.store.display_name or report.store.name,
-                    "price": report.price,
-                }
-            send_whatsapp_text(user.wa_number, message)
-        except Exception:
-            # Don't let messaging failures break admin actions
-            pass
+            filters = export.parse_filters(*(request.GET.get(name) for name in ("since", "until", "city", "chain")))
+        except ValueError as exc:
+            return HttpResponseBadRequest(str(exc))
+        rows = export.iter_rows(export.export_queryset(dataset, **filters))
+        response = StreamingHttpResponse(
+            export.text_lines(fmt, export.DATASETS[dataset].headers, rows),
+            content_type="text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
+        return response
 
     def fix_view(self, request, object_id, *args, **kwargs):
         report = self.get_object(request, object_id)
@@ -206,29 +195,11 @@ class StoreProductSnapshotAdmin(admin.ModelAdmin):
     )
     list_filter = ("last_observed_at",)
     autocomplete_fields = ("product", "store")
-    def changelist_view(self, request, extra_context=None):
-        if request.GET.get("moderation_queue") == "1":
-            extra_context = extra_context or {}
-            extra_context["queue"] = self._build_queue()
-        return super().changelist_view(request, extra_context=extra_context)
-
-    def _build_queue(self):
-        pending = PriceReport.objects.filter(needs_moderation=True).select_related("product", "store", "user")
-        queue = []
-        for report in pending:
-            queue.append(
-                {
-                    "report": report,
-                    "session_data": self._fetch_session_data(report),
-                }
-            )
-        return queue
 
-    def _fetch_session_data(self, report: PriceReport) -> dict:
-        session = report.user.deal_sessions.filter(
-            data__price_report_id=report.id
-        ).order_by("-updated_at").first() if report.user_id else None
-        return session.data if session else {}
 
-    def _queue_response(self, request, queryset):
-        return self.changelist_view(request, extra_context={"queue": self._build_queue(), "from_queue": True})
+@admin.register(PriceFeedImport)
+class PriceFeedImportAdmin(admin.ModelAdmin):
+    list_display = ("id", "file_name", "status", "rows_done", "reports_created", "rows_skipped", "started_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("file_name", "sha256")
+    readonly_fields = ("sha256", "started_at", "finished_at", "last_error")
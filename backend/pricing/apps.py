@@ -5,3 +5,6 @@ class PricingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "pricing"
     verbose_name = "Pricing"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401 - keeps StoreProductSnapshot in sync with catalog/store edits
@@ -0,0 +1,309 @@
+"""Streaming exports of approved price reports and store×product snapshots.
+
+Rows are read through a server-side cursor (``QuerySet.iterator``) as plain
+tuples, with product, store, chain and city columns joined in, and written
+one at a time (CSV, JSON Lines) or one row group per chunk (Parquet, needs
+``pyarrow``), so memory stays flat whatever the table size. Used by
+``manage.py export_prices`` and the staff-only admin endpoint
+``admin/pricing/pricereport/export/``.
+
+Filters: ``since`` (inclusive) and ``until`` (exclusive) on the observation
+time, ``city`` (id or name, resolved through ``stores.city_index``) and
+``chain`` (id, name or slug).
+"""
+from __future__ import annotations
+
+import csv
+import datetime
+import json
+from dataclasses import dataclass
+from typing import IO, Iterable, Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from stores import city_index
+from stores.models import StoreChain
+
+from .models import PriceReport, StoreProductSnapshot
+from .snapshots import APPROVED
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional, only needed for Parquet exports
+    pyarrow = None
+
+
+DEFAULT_CHUNK_SIZE = 2000
+FORMATS = ("csv", "jsonl", "parquet")
+# Formats written line by line (the HTTP endpoint streams these)
+TEXT_FORMATS = ("csv", "jsonl")
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: type[models.Model]
+    # (column name, ORM path) pairs, in output order
+    columns: tuple[tuple[str, str], ...]
+    time_field: str
+    city_field: str
+    chain_field: str
+    base_filter: Q = Q()
+
+    @property
+    def headers(self) -> list[str]:
+        return [name for name, _path in self.columns]
+
+
+DATASETS = {
+    "reports": Dataset(
+        model=PriceReport,
+        columns=(
+            ("id", "id"),
+            ("observed_at", "observed_at"),
+            ("price", "price"),
+            ("units_in_price", "units_in_price"),
+            ("unit_measure_type_en", "unit_measure_type_en"),
+            ("unit_measure_type_he", "unit_measure_type_he"),
+            ("unit_measure_quantity", "unit_measure_quantity"),
+            ("normalized_unit_price", "normalized_unit_price"),
+            ("normalized_unit", "normalized_unit"),
+            ("is_for_club_members_only", "is_for_club_members_only"),
+            ("min_cart_total", "min_cart_total"),
+            ("deal_notes", "deal_notes"),
+            ("product_text_raw", "product_text_raw"),
+            ("source", "source"),
+            ("product_id", "product_id"),
+            ("product_name_he", "product__name_he"),
+            ("product_name_en", "product__name_en"),
+            ("product_brand", "product__brand"),
+            ("product_barcode", "product__barcode"),
+            ("store_id", "store_id"),
+            ("store_name", "store__name"),
+            ("store_display_name", "store__display_name"),
+            ("store_address", "store__address"),
+            ("chain", "store__chain__name"),
+            ("city_id", "store__city_obj_id"),
+            ("city_he", "store__city_obj__name_he"),
+            ("city_en", "store__city_obj__name_en"),
+            ("store_city", "store__city"),
+        ),
+        time_field="observed_at",
+        city_field="store__city_obj",
+        chain_field="store__chain",
+        base_filter=APPROVED,
+    ),
+    "snapshots": Dataset(
+        model=StoreProductSnapshot,
+        columns=(
+            ("id", "id"),
+            ("last_observed_at", "last_observed_at"),
+            ("last_price", "last_price"),
+            ("confirmation_count", "confirmation_count"),
+            ("units_in_price", "units_in_price"),
+            ("unit_price", "unit_price"),
+            ("unit_measure_type_en", "unit_measure_type_en"),
+            ("unit_measure_type_he", "unit_measure_type_he"),
+            ("unit_measure_quantity", "unit_measure_quantity"),
+            ("normalized_unit_price", "normalized_unit_price"),
+            ("normalized_unit", "normalized_unit"),
+            ("is_for_club_members_only", "is_for_club_members_only"),
+            ("last_report_id", "last_report_id"),
+            ("product_id", "product_id"),
+            ("product_name_he", "product_name_he"),
+            ("product_name_en", "product_name_en"),
+            ("product_brand", "product_brand"),
+            ("store_id", "store_id"),
+            ("store_display_name", "store_display_name"),
+            ("chain", "store__chain__name"),
+            ("city_id", "city_id"),
+            ("city_he", "city__name_he"),
+            ("city_en", "city__name_en"),
+            ("store_city", "store_city"),
+            ("updated_at", "updated_at"),
+        ),
+        time_field="last_observed_at",
+        city_field="city",
+        chain_field="store__chain",
+    ),
+}
+
+
+def _parse_moment(value: Optional[str], name: str) -> Optional[datetime.datetime]:
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{name} must be an ISO date or datetime, got {value!r}")
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_filters(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    city: Optional[str] = None,
+    chain: Optional[str] = None,
+) -> dict:
+    """Keyword arguments for ``export_queryset`` from raw (command line or query string) values."""
+    return {
+        "since": _parse_moment(since, "since"),
+        "until": _parse_moment(until, "until"),
+        "city": (city or "").strip() or None,
+        "chain": (chain or "").strip() or None,
+    }
+
+
+def _city_ids(city: str) -> list[int]:
+    return [int(city)] if city.isdigit() else city_index.city_ids(city)
+
+
+def _chains(chain: str) -> QuerySet:
+    if chain.isdigit():
+        return StoreChain.objects.filter(pk=int(chain)).values("pk")
+    return StoreChain.objects.filter(
+        Q(name__iexact=chain) | Q(name_he__iexact=chain) | Q(name_en__iexact=chain) | Q(slug=chain)
+    ).values("pk")
+
+
+def export_queryset(
+    dataset: str,
+    *,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    city: Optional[str] = None,
+    chain: Optional[str] = None,
+) -> QuerySet:
+    """Rows of ``dataset`` as tuples (``Dataset.columns`` order), in id order."""
+    spec = DATASETS[dataset]
+    rows = spec.model.objects.filter(spec.base_filter)
+    if since:
+        rows = rows.filter(**{f"{spec.time_field}__gte": since})
+    if until:
+        rows = rows.filter(**{f"{spec.time_field}__lt": until})
+    if city:
+        # An unknown city name matches no rows
+        rows = rows.filter(**{f"{spec.city_field}__in": _city_ids(city)})
+    if chain:
+        rows = rows.filter(**{f"{spec.chain_field}__in": _chains(chain)})
+    return rows.order_by("pk").values_list(*(path for _name, path in spec.columns))
+
+
+def iter_rows(queryset: QuerySet, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple]:
+    """Stream ``queryset`` through a server-side cursor, ``chunk_size`` rows per fetch."""
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def _cell(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the text instead of storing it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_lines(headers: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def jsonl_lines(headers: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def text_lines(fmt: str, headers: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    if fmt == "csv":
+        return csv_lines(headers, rows)
+    if fmt == "jsonl":
+        return jsonl_lines(headers, rows)
+    raise ValueError(f"{fmt!r} is not a text format; expected one of {TEXT_FORMATS}")
+
+
+def _model_field(model: type[models.Model], path: str) -> models.Field:
+    *relations, name = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _arrow_type(field: models.Field):
+    internal = field.get_internal_type()
+    if internal == "DecimalField":
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if internal == "DateTimeField":
+        return pyarrow.timestamp("us", tz="UTC")
+    if internal == "BooleanField":
+        return pyarrow.bool_()
+    if internal.endswith(("AutoField", "IntegerField")) or internal == "ForeignKey":
+        return pyarrow.int64()
+    return pyarrow.string()
+
+
+def arrow_schema(dataset: str):
+    spec = DATASETS[dataset]
+    return pyarrow.schema(
+        [(name, _arrow_type(_model_field(spec.model, path))) for name, path in spec.columns]
+    )
+
+
+def write_parquet(dataset: str, rows: Iterable[tuple], path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Write ``rows`` to a Parquet file, one row group per ``chunk_size`` rows; returns the row count."""
+    if pyarrow is None:
+        raise RuntimeError("Parquet exports need pyarrow (pip install pyarrow)")
+    schema = arrow_schema(dataset)
+    written = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        columns: list[list] = [[] for _ in schema]
+        for row in rows:
+            for column, value in zip(columns, row):
+                column.append(value)
+            if len(columns[0]) >= chunk_size:
+                written += _write_row_group(writer, schema, columns)
+        if columns[0] or not written:
+            written += _write_row_group(writer, schema, columns)
+    return written
+
+
+def _write_row_group(writer, schema, columns: list[list]) -> int:
+    table = pyarrow.Table.from_arrays(
+        [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+    )
+    writer.write_table(table)
+    for column in columns:
+        column.clear()
+    return table.num_rows
+
+
+def write_text(fmt: str, headers: list[str], rows: Iterable[tuple], out: IO[str]) -> int:
+    """Write ``rows`` to ``out`` as CSV or JSON Lines; returns the row count."""
+    counted = _Counter(rows)
+    for line in text_lines(fmt, headers, counted):
+        out.write(line)
+    return counted.count
+
+
+class _Counter:
+    def __init__(self, rows: Iterable[tuple]):
+        self._rows = rows
+        self.count = 0
+
+    def __iter__(self) -> Iterator[tuple]:
+        for row in self._rows:
+            self.count += 1
+            yield row
@@ -4,12 +4,13 @@ from decimal import Decimal
 from typing import Optional
 
 from django import forms
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
 from catalog.models import Product
 from stores.models import Store, City
+from pricing import snapshots
 from pricing.models import PriceReport
-from whatsapp.models import DealReportSession
 
 
 class PriceReportFixForm(forms.Form):
@@ -72,9 +73,15 @@ class PriceReportFixForm(forms.Form):
         self.fields["city_en"].initial = getattr(report.store, "city_en", "")
 
     def apply(self) -> None:
+        # Report, store and StoreProductSnapshot rows change together
+        with transaction.atomic():
+            self._apply()
+
+    def _apply(self) -> None:
         report = self.report
         cleaned = self.cleaned_data
         update_fields: set[str] = set()
+        previous_pair = (report.product_id, report.store_id)
 
         target_store = cleaned.get("store") or report.store
         target_product = cleaned.get("product")
@@ -114,6 +121,14 @@ class PriceReportFixForm(forms.Form):
 
         self._update_store_city(target_store or report.store)
         self._sync_session(report)
+        if update_fields and not report.needs_moderation and not report.moderation_reason:
+            self._sync_snapshots(previous_pair, (report.product_id, report.store_id))
+
+    def _sync_snapshots(self, previous_pair: tuple[int, int], current_pair: tuple[int, int]) -> None:
+        """Recompute the read model for an approved report that moved or changed."""
+        snapshots.refresh_pair(*current_pair)
+        if previous_pair != current_pair:
+            snapshots.refresh_pair(*previous_pair)
 
     def _update_store_city(self, store: Optional[Store]) -> None:
         if not store:
@@ -163,17 +178,7 @@ class PriceReportFixForm(forms.Form):
             store.save(update_fields=list(store_updates))
 
     def _sync_session(self, report: PriceReport) -> None:
-        session = (
-            DealReportSession.objects.filter(data__price_report_id=str(report.pk))
-            .order_by("-updated_at")
-            .first()
-        )
-        if not session:
-            session = (
-                DealReportSession.objects.filter(data__price_report_id=report.pk)
-                .order_by("-updated_at")
-                .first()
-            )
+        session = report.deal_session
         if not session:
             return
         data = dict(session.data or {})
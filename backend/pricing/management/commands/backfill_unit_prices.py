@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from pricing import snapshots
+from pricing.models import PriceReport
+
+
+class Command(BaseCommand):
+    help = "Fill PriceReport.normalized_unit_price (₪ per liter/kg/unit) and copy it to StoreProductSnapshot."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Reports per bulk update.")
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every report, not only those without a normalized unit.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        chunk_size = options["chunk_size"]
+        reports = PriceReport.objects.only(
+            "id",
+            "price",
+            "units_in_price",
+            "unit_measure_type",
+            "unit_measure_type_he",
+            "unit_measure_type_en",
+            "unit_measure_quantity",
+            "normalized_unit_price",
+            "normalized_unit",
+        ).order_by("pk")
+        if not options["all"]:
+            reports = reports.filter(normalized_unit="")
+        scanned = updated = 0
+        last_pk = 0
+        while True:
+            chunk = list(reports.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            changed = []
+            for report in chunk:
+                before = (report.normalized_unit_price, report.normalized_unit)
+                report.set_normalized_unit_price()
+                if (report.normalized_unit_price, report.normalized_unit) != before:
+                    changed.append(report)
+            PriceReport.objects.bulk_update(changed, ["normalized_unit_price", "normalized_unit"])
+            scanned += len(chunk)
+            updated += len(changed)
+        synced = snapshots.sync_normalized_unit_prices()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scanned {scanned} report(s), updated {updated}, synced {synced} snapshot(s) in {elapsed:.1f}s"
+            )
+        )
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
+
+from pricing import price_feed
+from stores.models import Store, StoreChain
+
+
+class Command(BaseCommand):
+    help = (
+        "Import chain price files (PriceFull-style XML or CSV, optionally gzipped) as approved price "
+        "reports in bulk, updating StoreProductSnapshot. Interrupted files resume where they stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+", help="Price files to import.")
+        parser.add_argument("--workers", type=int, default=1, help="Files imported in parallel (processes).")
+        parser.add_argument(
+            "--chunk-size", type=int, default=price_feed.DEFAULT_CHUNK_SIZE, help="Rows inserted per transaction."
+        )
+        parser.add_argument("--store", type=int, help="Store id for every row (ignores the file's store ids).")
+        parser.add_argument("--chain", help="Store chain id, name or slug the files belong to.")
+        parser.add_argument(
+            "--create-stores",
+            action="store_true",
+            help=f"Create stores of --chain missing from Store.external_ids['{price_feed.FEED_STORE_KEY}'].",
+        )
+        parser.add_argument("--force", action="store_true", help="Import files again even if already done.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        files = options["files"]
+        missing = [path for path in files if not os.path.isfile(path)]
+        if missing:
+            raise CommandError(f"No such file(s): {', '.join(missing)}")
+        if options["store"] and not Store.objects.filter(pk=options["store"]).exists():
+            raise CommandError(f"Store {options['store']} does not exist.")
+        chain_id = self._chain_id(options["chain"]) if options["chain"] else None
+        if options["create_stores"] and not chain_id:
+            raise CommandError("--create-stores needs --chain.")
+
+        import_file = functools.partial(
+            price_feed.import_file,
+            force=options["force"],
+            store_id=options["store"],
+            chain_id=chain_id,
+            create_stores=options["create_stores"],
+            chunk_size=options["chunk_size"],
+        )
+        workers = min(max(1, options["workers"]), len(files))
+        if workers == 1:
+            results = map(import_file, files)
+        else:
+            # Children must open their own DB connections.
+            connections.close_all()
+            pool = multiprocessing.get_context("fork").Pool(workers)
+            results = pool.imap_unordered(import_file, files)
+
+        totals = {"rows": 0, "reports": 0, "failed": 0}
+        try:
+            for result in results:
+                totals["rows"] += result.rows
+                totals["reports"] += result.reports_created
+                totals["failed"] += result.status == price_feed.PriceFeedImport.Status.FAILED
+                resumed = f", resumed at row {result.resumed_from}" if result.resumed_from else ""
+                self.stdout.write(
+                    f"{result.file_name}: {result.status}, {result.rows} row(s), {result.reports_created} "
+                    f"report(s), {result.rows_skipped} skipped, {result.products_created} new product(s), "
+                    f"{result.stores_created} new store(s) in {result.elapsed_s:.1f}s{resumed}"
+                    + (f" ({result.error})" if result.error else "")
+                )
+        finally:
+            if workers > 1:
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - started
+        summary = (
+            f"Imported {totals['reports']} report(s) from {totals['rows']} row(s) in {len(files)} file(s) "
+            f"in {elapsed:.1f}s"
+        )
+        if totals["failed"]:
+            raise CommandError(f"{summary}; {totals['failed']} file(s) failed (run again to resume).")
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def _chain_id(self, value: str) -> int:
+        if value.isdigit():
+            chains = StoreChain.objects.filter(pk=int(value))
+        else:
+            chains = StoreChain.objects.filter(
+                Q(name__iexact=value) | Q(name_he__iexact=value) | Q(name_en__iexact=value) | Q(slug=value)
+            )
+        chain_id = chains.values_list("pk", flat=True).first()
+        if chain_id is None:
+            raise CommandError(f"Unknown store chain {value!r}.")
+        return chain_id
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from pricing import snapshots
+
+
+class Command(BaseCommand):
+    help = "Rebuild StoreProductSnapshot (the deal-search read model) from approved price reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Products per upsert batch.")
+        parser.add_argument(
+            "--product",
+            type=int,
+            action="append",
+            dest="products",
+            help="Only rebuild these product ids (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = snapshots.rebuild(product_ids=options["products"], chunk_size=options["chunk_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Rebuilt snapshots for {products} product(s): {upserted} upserted, {deleted} deleted in {elapsed:.1f}s".format(
+                    elapsed=elapsed, **stats
+                )
+            )
+        )
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.matching import match_products
+from pricing import snapshots
+from pricing.models import PriceReport
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-match PriceReport.product_text_raw to products with the ranked product matcher and "
+        "report (or, with --apply, fix) reports attached to a different product. Reports are only "
+        "matched to products of their current product's brand (or without a brand)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Reports read per batch.")
+        parser.add_argument("--apply", action="store_true", help="Move reports to the matched product.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        chunk_size = options["chunk_size"]
+        reports = (
+            PriceReport.objects.exclude(product_text_raw="")
+            .select_related("product")
+            .only("id", "product_id", "product_text_raw", "product__brand")
+        )
+        # (brand, text) -> matched product
+        matches: dict = {}
+        scanned = changed = 0
+        affected_products: set[int] = set()
+        last_pk = 0
+        while True:
+            chunk = list(reports.filter(pk__gt=last_pk).order_by("pk")[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            # Each distinct (brand, text) is looked up once per run
+            pending: dict[str, set[str]] = {}
+            for report in chunk:
+                if (report.product.brand, report.product_text_raw) not in matches:
+                    pending.setdefault(report.product.brand, set()).add(report.product_text_raw)
+            for brand, texts in pending.items():
+                for text, product in match_products(texts, brand).items():
+                    matches[(brand, text)] = product
+            moved = []
+            for report in chunk:
+                product = matches.get((report.product.brand, report.product_text_raw))
+                if product is None or product.pk == report.product_id:
+                    continue
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"#{report.pk} {report.product_text_raw!r}: {report.product_id} -> {product.pk}")
+                affected_products.update((report.product_id, product.pk))
+                report.product_id = product.pk
+                moved.append(report)
+            if moved and options["apply"]:
+                with transaction.atomic():
+                    PriceReport.objects.bulk_update(moved, ["product"])
+            scanned += len(chunk)
+            changed += len(moved)
+        if options["apply"] and affected_products:
+            snapshots.rebuild(product_ids=sorted(affected_products))
+        elapsed = time.perf_counter() - started
+        verb = "moved" if options["apply"] else "would move"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scanned {scanned} report(s) ({len(matches)} distinct text(s)), {verb} {changed} "
+                f"in {elapsed:.1f}s"
+            )
+        )
@@ -0,0 +1,18 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built concurrently so PriceReport stays writable on large tables
+    atomic = False
+
+    dependencies = [
+        ('pricing', '0007_pricereport_unit_measure_translations'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='pricereport',
+            index=models.Index(condition=models.Q(('needs_moderation', False)), fields=['product', 'store', '-observed_at'], include=('price',), name='pr_approved_latest_idx'),
+        ),
+    ]
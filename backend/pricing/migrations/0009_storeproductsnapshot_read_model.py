@@ -0,0 +1,180 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:50
+
+import re
+import unicodedata
+from decimal import Decimal
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.contrib.postgres.operations import BtreeGinExtension
+from django.db import migrations, models
+from django.db.models import Count
+
+
+_NON_WORD = re.compile(r"[^0-9a-zא-ת]+")
+
+
+def _search_text(*values):
+    words = []
+    for value in values:
+        text = unicodedata.normalize("NFKC", value or "").casefold()
+        text = "".join(ch for ch in text if not ("֑" <= ch <= "ׇ"))
+        for word in _NON_WORD.sub(" ", text).split():
+            if word not in words:
+                words.append(word)
+    return " ".join(words)
+
+
+def rebuild_snapshots(apps, schema_editor):
+    """Fill the new columns from the latest approved report of every pair.
+
+    Frozen copy of pricing.snapshots.rebuild; existing confirmation counts are kept.
+    """
+    PriceReport = apps.get_model("pricing", "PriceReport")
+    Snapshot = apps.get_model("pricing", "StoreProductSnapshot")
+    Product = apps.get_model("catalog", "Product")
+    fields = [
+        "last_report", "last_price", "last_observed_at", "product_name_he", "product_name_en",
+        "product_brand", "product_text_raw", "search_text", "store_display_name", "store_city",
+        "city", "units_in_price", "unit_price", "unit_measure_type_he", "unit_measure_type_en",
+        "unit_measure_quantity", "is_for_club_members_only",
+    ]
+    product_ids = list(Product.objects.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(product_ids), 1000):
+        chunk = product_ids[start:start + 1000]
+        approved = PriceReport.objects.filter(needs_moderation=False, moderation_reason="", product_id__in=chunk)
+        counts = {
+            (row["product_id"], row["store_id"]): row["n"]
+            for row in approved.order_by().values("product_id", "store_id").annotate(n=Count("id"))
+        }
+        rows = []
+        latest = (
+            approved.select_related("product", "store", "store__city_obj")
+            .order_by("product_id", "store_id", "-observed_at", "-pk")
+            .distinct("product_id", "store_id")
+        )
+        for report in latest:
+            product, store = report.product, report.store
+            city = store.city_obj
+            units = report.units_in_price or 1
+            rows.append(
+                Snapshot(
+                    product_id=report.product_id,
+                    store_id=report.store_id,
+                    last_report=report,
+                    last_price=report.price,
+                    last_observed_at=report.observed_at,
+                    product_name_he=product.name_he,
+                    product_name_en=product.name_en,
+                    product_brand=product.brand,
+                    product_text_raw=report.product_text_raw,
+                    search_text=_search_text(product.search_text, report.product_text_raw),
+                    store_display_name=store.display_name or store.name,
+                    store_city=(city.name_en or city.name_he or city.slug) if city else (store.city or store.city_en or store.city_he),
+                    city=city,
+                    units_in_price=units,
+                    unit_price=(Decimal(report.price) / units).quantize(Decimal("0.0001")),
+                    unit_measure_type_he=report.unit_measure_type_he,
+                    unit_measure_type_en=report.unit_measure_type_en or report.unit_measure_type,
+                    unit_measure_quantity=report.unit_measure_quantity,
+                    is_for_club_members_only=report.is_for_club_members_only,
+                    confirmation_count=counts.get((report.product_id, report.store_id), 1),
+                )
+            )
+        if rows:
+            Snapshot.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=["product", "store"], update_fields=fields
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_search_text'),
+        ('pricing', '0008_pricereport_approved_latest_idx'),
+        ('stores', '0005_store_name_aliases_en_store_name_aliases_he_and_more'),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='city',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='stores.city'),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='is_for_club_members_only',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='last_report',
+            field=models.ForeignKey(blank=True, help_text='Approved report the snapshot currently reflects.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pricing.pricereport'),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='product_brand',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='product_name_en',
+            field=models.CharField(blank=True, max_length=160),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='product_name_he',
+            field=models.CharField(blank=True, max_length=160),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='product_text_raw',
+            field=models.CharField(blank=True, max_length=240),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='search_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='store_city',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='store_display_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='unit_measure_quantity',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='unit_measure_type_en',
+            field=models.CharField(blank=True, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='unit_measure_type_he',
+            field=models.CharField(blank=True, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Price per unit (last_price / units_in_price).', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='units_in_price',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.RunPython(rebuild_snapshots, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='storeproductsnapshot',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['city', 'search_text'], name='sps_city_search_idx', opclasses=['int8_ops', 'gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:53
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0009_storeproductsnapshot_read_model'),
+        ('stores', '0005_store_name_aliases_en_store_name_aliases_he_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, geography=True, null=True, spatial_index=False, srid=4326),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "UPDATE pricing_storeproductsnapshot AS s SET location = st.location "
+                "FROM stores_store AS st WHERE st.id = s.store_id AND st.location IS NOT NULL"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='storeproductsnapshot',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['location'], name='sps_location_gist_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0010_storeproductsnapshot_location'),
+    ]
+
+    # Existing rows are filled by `manage.py backfill_unit_prices`
+    operations = [
+        migrations.AddField(
+            model_name='pricereport',
+            name='normalized_unit',
+            field=models.CharField(blank=True, editable=False, help_text='Base unit of normalized_unit_price (liter, kilogram or unit).', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='pricereport',
+            name='normalized_unit_price',
+            field=models.DecimalField(blank=True, decimal_places=4, editable=False, help_text='Price per liter, kilogram or unit; derived on save from the price and unit fields.', max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='normalized_unit',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='storeproductsnapshot',
+            name='normalized_unit_price',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='storeproductsnapshot',
+            index=models.Index(fields=['city', 'normalized_unit', 'normalized_unit_price'], name='sps_city_unit_price_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built concurrently so PriceReport stays writable on large tables
+    atomic = False
+
+    dependencies = [
+        ('pricing', '0011_normalized_unit_price'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='pricereport',
+            index=models.Index(condition=models.Q(('needs_moderation', True)), fields=['id'], name='pr_pending_queue_idx'),
+        ),
+    ]
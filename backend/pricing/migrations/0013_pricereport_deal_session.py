@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-16 21:15
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+from django.db.models.fields.json import KeyTextTransform
+
+
+CHUNK_SIZE = 2000
+
+
+def link_deal_sessions(apps, schema_editor):
+    """Point each report at the session whose data names it (the newest one when several do)."""
+    DealReportSession = apps.get_model("whatsapp", "DealReportSession")
+    PriceReport = apps.get_model("pricing", "PriceReport")
+    sessions = (
+        DealReportSession.objects.filter(data__has_key="price_report_id")
+        .annotate(report_key=KeyTextTransform("price_report_id", "data"))
+        .order_by("pk")
+    )
+    last_pk = 0
+    while True:
+        chunk = list(sessions.filter(pk__gt=last_pk).values_list("pk", "report_key")[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        # Ids were stored both as ints and as strings
+        links = {int(key): session_pk for session_pk, key in chunk if key and key.isdigit()}
+        # One transaction per chunk keeps row locks short on large tables
+        with transaction.atomic():
+            PriceReport.objects.bulk_update(
+                [PriceReport(pk=report_pk, deal_session_id=session_pk) for report_pk, session_pk in links.items()],
+                ["deal_session"],
+            )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('pricing', '0012_pricereport_pending_queue_idx'),
+        ('whatsapp', '0021_dealreportsession_report_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricereport',
+            name='deal_session',
+            field=models.ForeignKey(blank=True, help_text='WhatsApp add-deal session the report was created from.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_reports', to='whatsapp.dealreportsession'),
+        ),
+        migrations.RunPython(link_deal_sessions, migrations.RunPython.noop),
+    ]
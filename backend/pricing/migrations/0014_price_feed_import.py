@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-16 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0013_pricereport_deal_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceFeedImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('sha256', models.CharField(help_text='Content hash; the same file resumes or is skipped.', max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='running', max_length=12)),
+                ('rows_done', models.PositiveBigIntegerField(default=0, help_text='Item rows committed (imported or skipped).')),
+                ('reports_created', models.PositiveBigIntegerField(default=0)),
+                ('rows_skipped', models.PositiveBigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -1,10 +1,26 @@
 from __future__ import annotations
 from django.conf import settings
+from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import GinIndex, GistIndex
 from django.db import models
 
+from whatsapp.unit_translations import normalize_unit_price
+
 PRICE_DECIMAL_PLACES = 2
 PRICE_MAX_DIGITS = 7  # up to 99999.99
 
+# PriceReport fields that normalized_unit_price is derived from
+UNIT_PRICE_SOURCE_FIELDS = frozenset(
+    {
+        "price",
+        "units_in_price",
+        "unit_measure_type",
+        "unit_measure_type_he",
+        "unit_measure_type_en",
+        "unit_measure_quantity",
+    }
+)
+
 
 class PriceReport(models.Model):
     """User-submitted observation: product at a store at a price and time.
@@ -12,6 +28,14 @@ class PriceReport(models.Model):
     """
 
     user = models.ForeignKey("whatsapp.WAUser", on_delete=models.SET_NULL, null=True, blank=True)
+    deal_session = models.ForeignKey(
+        "whatsapp.DealReportSession",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="price_reports",
+        help_text="WhatsApp add-deal session the report was created from.",
+    )
     product = models.ForeignKey("catalog.Product", on_delete=models.PROTECT)
     store = models.ForeignKey("stores.Store", on_delete=models.PROTECT)
 
@@ -42,6 +66,20 @@ class PriceReport(models.Model):
         blank=True,
         help_text="Quantity per unit (e.g., 1.50 liters, 2.00 kg).",
     )
+    normalized_unit_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Price per liter, kilogram or unit; derived on save from the price and unit fields.",
+    )
+    normalized_unit = models.CharField(
+        max_length=20,
+        blank=True,
+        editable=False,
+        help_text="Base unit of normalized_unit_price (liter, kilogram or unit).",
+    )
     is_for_club_members_only = models.BooleanField(
         default=False,
         help_text="Whether the deal is restricted to loyalty/club members.",
@@ -93,14 +131,44 @@ class PriceReport(models.Model):
             models.Index(fields=["product", "store", "observed_at"], name="pr_product_store_time_idx"),
             models.Index(fields=["store", "observed_at"], name="pr_store_time_idx"),
             models.Index(fields=["product", "observed_at"], name="pr_product_time_idx"),
+            # Latest approved report per product×store (find-a-deal DISTINCT ON); covers price
+            models.Index(
+                fields=["product", "store", "-observed_at"],
+                include=["price"],
+                condition=models.Q(needs_moderation=False),
+                name="pr_approved_latest_idx",
+            ),
+            # Moderation queue: pending reports in id order (keyset pages)
+            models.Index(fields=["id"], condition=models.Q(needs_moderation=True), name="pr_pending_queue_idx"),
         ]
 
+    def set_normalized_unit_price(self) -> None:
+        """Fill normalized_unit_price/normalized_unit (bulk_create callers must call this)."""
+        self.normalized_unit_price, self.normalized_unit = normalize_unit_price(
+            self.price,
+            self.units_in_price,
+            (self.unit_measure_type_en, self.unit_measure_type_he, self.unit_measure_type),
+            self.unit_measure_quantity,
+        )
+
+    def save(self, *args, **kwargs):
+        self.set_normalized_unit_price()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and UNIT_PRICE_SOURCE_FIELDS.intersection(update_fields):
+            kwargs["update_fields"] = {*update_fields, "normalized_unit_price", "normalized_unit"}
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:  # pragma: no cover
         return f"PriceReport(product={self.product_id}, store={self.store_id}, price={self.price})"
 
 
 class StoreProductSnapshot(models.Model):
-    """Latest known price per product×store (denormalized cache)."""
+    """Latest approved price per product×store: the read model for deal search.
+
+    Product, store and deal attributes of the latest approved report are
+    denormalized here (see ``pricing.snapshots``) so user-facing search reads
+    one row per result from a single index.
+    """
 
     product = models.ForeignKey("catalog.Product", on_delete=models.CASCADE)
     store = models.ForeignKey("stores.Store", on_delete=models.CASCADE)
@@ -108,13 +176,90 @@ class StoreProductSnapshot(models.Model):
     last_observed_at = models.DateTimeField()
     updated_at = models.DateTimeField(auto_now=True)
     confirmation_count = models.PositiveIntegerField(default=0, help_text="Number of approved user reports confirming this price.")
+    last_report = models.ForeignKey(
+        PriceReport,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Approved report the snapshot currently reflects.",
+    )
+
+    # Denormalized product fields
+    product_name_he = models.CharField(max_length=160, blank=True)
+    product_name_en = models.CharField(max_length=160, blank=True)
+    product_brand = models.CharField(max_length=120, blank=True)
+    product_text_raw = models.CharField(max_length=240, blank=True)
+    # Product.search_text plus the reported free text (trigram-indexed with city)
+    search_text = models.TextField(blank=True, default="")
+
+    # Denormalized store fields
+    store_display_name = models.CharField(max_length=200, blank=True)
+    store_city = models.CharField(max_length=120, blank=True)
+    city = models.ForeignKey(
+        "stores.City",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    # Store.location copy for nearest-store (KNN) search; indexed below
+    location = gis_models.PointField(geography=True, srid=4326, null=True, blank=True, spatial_index=False)
+
+    # Deal fields of the latest report
+    units_in_price = models.PositiveSmallIntegerField(default=1)
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        help_text="Price per unit (last_price / units_in_price).",
+    )
+    unit_measure_type_he = models.CharField(max_length=30, blank=True)
+    unit_measure_type_en = models.CharField(max_length=30, blank=True)
+    unit_measure_quantity = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    normalized_unit_price = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    normalized_unit = models.CharField(max_length=20, blank=True)
+    is_for_club_members_only = models.BooleanField(default=False)
 
     class Meta:
         unique_together = [("product", "store")]
         indexes = [
             models.Index(fields=["store", "product"], name="sps_store_product_idx"),
             models.Index(fields=["product", "store"], name="sps_product_store_idx"),
+            # city_id equality and search_text trigram match in one GIN index (btree_gin)
+            GinIndex(fields=["city", "search_text"], opclasses=["int8_ops", "gin_trgm_ops"], name="sps_city_search_idx"),
+            GistIndex(fields=["location"], name="sps_location_gist_idx"),
+            # "Cheapest per liter/kg/unit in a city" reads this index in order
+            models.Index(
+                fields=["city", "normalized_unit", "normalized_unit_price"], name="sps_city_unit_price_idx"
+            ),
         ]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"Snapshot(product={self.product_id}, store={self.store_id}, price={self.last_price})"
+
+
+class PriceFeedImport(models.Model):
+    """Progress of one chain price file through ``manage.py import_price_feed`` (resumable)."""
+
+    class Status(models.TextChoices):
+        RUNNING = "running", "running"
+        DONE = "done", "done"
+        FAILED = "failed", "failed"
+
+    file_name = models.CharField(max_length=255)
+    sha256 = models.CharField(max_length=64, unique=True, help_text="Content hash; the same file resumes or is skipped.")
+    status = models.CharField(max_length=12, choices=Status.choices, default=Status.RUNNING)
+    rows_done = models.PositiveBigIntegerField(default=0, help_text="Item rows committed (imported or skipped).")
+    reports_created = models.PositiveBigIntegerField(default=0)
+    rows_skipped = models.PositiveBigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"PriceFeedImport({self.file_name}, {self.status})"
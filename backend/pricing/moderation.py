@@ -0,0 +1,166 @@
+"""Bulk approval and rejection of price reports (admin moderation actions).
+
+However many reports are selected, a moderation action runs in one
+transaction and a fixed number of queries:
+
+* ``lock``: lock the selected reports and read which of them change state;
+* ``update``: one ``UPDATE`` of the moderation fields;
+* ``snapshots``: newly approved reports are folded into their snapshots
+  with one ``INSERT ... ON CONFLICT`` (``snapshots.upsert_approvals``);
+  rejecting approved reports rebuilds the affected products' snapshots;
+* ``notify``: approval messages are handed to the background sender
+  (``whatsapp.outbox.send_texts_later``) rather than sent in the request.
+
+Per-phase wall times are logged, recorded as ``moderation.<phase>_ms``
+metrics and returned in ``ModerationResult.timings_ms``.
+
+``pending_queue`` reads the moderation queue a page at a time: pending
+reports in id order after a keyset cursor (``pr_pending_queue_idx``), each
+with the deal session it came from (``PriceReport.deal_session``) joined in
+the same query, so a page costs the same whatever the backlog.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+import structlog
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone, translation
+from django.utils.translation import gettext
+
+from whatsapp import metrics
+from whatsapp.outbox import send_texts_later
+
+from . import snapshots
+from .models import PriceReport
+
+
+logger = structlog.get_logger(__name__)
+
+REASON_MAX_LENGTH = 240
+
+
+def _queue_page_size() -> int:
+    return max(1, int(getattr(settings, "PRICING_MODERATION_QUEUE_PAGE_SIZE", 50)))
+
+
+@dataclass
+class ModerationResult:
+    count: int = 0
+    changed: int = 0
+    notified: int = 0
+    timings_ms: dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.timings_ms[name] = round(elapsed, 2)
+            metrics.observe(f"moderation.{name}_ms", elapsed)
+
+
+def approval_message(report: PriceReport) -> tuple[str, str] | None:
+    """(recipient, text) telling the reporter their deal was approved, if they can be reached."""
+    user = report.user
+    if not user or not getattr(user, "wa_number", ""):
+        return None
+    with translation.override(getattr(user, "locale", "en")):
+        message = gettext(
+            "Your deal for %(product)s at %(store)s (%(price)s₪) was approved! "
+            "Thanks for helping everyone save."
+        ) % {
+            "product": report.product_text_raw or report.product.name_he,
+            "store": report.store.display_name or report.store.name,
+            "price": report.price,
+        }
+    return user.wa_number, message
+
+
+def _lock_selected(queryset: QuerySet) -> tuple[list[int], QuerySet]:
+    """Lock the selected reports (in id order) and return their ids and a queryset over them."""
+    selected = PriceReport.objects.filter(pk__in=queryset.values("pk")).order_by("pk")
+    ids = list(selected.select_for_update().values_list("pk", flat=True))
+    return ids, PriceReport.objects.filter(pk__in=ids)
+
+
+def approve_reports(queryset: QuerySet, moderator) -> ModerationResult:
+    """Approve the selected reports; snapshots count only reports that were not approved yet."""
+    result = ModerationResult()
+    with transaction.atomic():
+        with result.phase("lock"):
+            ids, selected = _lock_selected(queryset)
+            newly_approved = list(
+                selected.exclude(snapshots.APPROVED).select_related("product", "store", "store__city_obj", "user")
+            )
+        with result.phase("update"):
+            selected.update(
+                needs_moderation=False, moderated_at=timezone.now(), moderated_by=moderator, moderation_reason=""
+            )
+        with result.phase("snapshots"):
+            snapshots.upsert_approvals(newly_approved)
+        with result.phase("notify"):
+            result.notified = send_texts_later(
+                [message for message in map(approval_message, newly_approved) if message]
+            )
+    result.count, result.changed = len(ids), len(newly_approved)
+    logger.info("reports_approved", count=result.count, changed=result.changed, **result.timings_ms)
+    return result
+
+
+def reject_reports(queryset: QuerySet, moderator, reason: str) -> ModerationResult:
+    """Reject the selected reports; previously approved ones are withdrawn from the snapshots."""
+    result = ModerationResult()
+    with transaction.atomic():
+        with result.phase("lock"):
+            ids, selected = _lock_selected(queryset)
+            withdrawn_products = set(
+                selected.filter(snapshots.APPROVED).values_list("product_id", flat=True).distinct()
+            )
+        with result.phase("update"):
+            result.changed = selected.update(
+                needs_moderation=False,
+                moderated_at=timezone.now(),
+                moderated_by=moderator,
+                moderation_reason=reason[:REASON_MAX_LENGTH],
+            )
+        with result.phase("snapshots"):
+            if withdrawn_products:
+                snapshots.rebuild(product_ids=sorted(withdrawn_products))
+    result.count = len(ids)
+    logger.info("reports_rejected", count=result.count, **result.timings_ms)
+    return result
+
+
+@dataclass
+class QueuePage:
+    entries: list[dict]
+    # Cursor of the next page (``after``), or None on the last page
+    next_after: Optional[int] = None
+
+
+def pending_queue(after: Optional[int] = None, size: Optional[int] = None) -> QueuePage:
+    """One page of pending reports (oldest first) with their originating session data, in one query."""
+    size = size or _queue_page_size()
+    pending = PriceReport.objects.filter(needs_moderation=True)
+    if after:
+        pending = pending.filter(pk__gt=after)
+    reports = list(
+        pending.select_related("product", "store", "store__chain", "store__city_obj", "user", "deal_session")
+        .order_by("pk")[: size + 1]
+    )
+    next_after = reports[size - 1].pk if len(reports) > size else None
+    return QueuePage(
+        entries=[
+            {"report": report, "session_data": report.deal_session.data if report.deal_session else {}}
+            for report in reports[:size]
+        ],
+        next_after=next_after,
+    )
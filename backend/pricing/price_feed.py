@@ -0,0 +1,348 @@
+"""Bulk import of chain price files (the price-transparency XML/CSV feeds).
+
+A file (``PriceFull``-style XML with ``<Item>``/``<Product>`` rows, or CSV
+with the same column names; gzip is read transparently) is streamed item by
+item and imported in chunks. Per chunk:
+
+* stores come from an in-memory map of ``Store.external_ids["price_feed"]``
+  (``"<chain id>:<store id>"``), loaded once per file; unknown stores are
+  skipped, or created for ``--chain`` with ``--create-stores``;
+* products are matched by barcode (``ItemCode``) through an in-memory map,
+  with one query for the codes not seen yet; unknown ones are created with
+  ``bulk_create`` (concurrent workers may race on a code: conflicts are
+  ignored and the codes read back);
+* ``PriceReport`` rows are inserted with ``bulk_create`` as approved reports
+  (``source="price_feed"``) and folded into ``StoreProductSnapshot`` with
+  ``snapshots.upsert_approvals``;
+* ``PriceFeedImport.rows_done`` advances in the same transaction, so an
+  interrupted import resumes after its last committed chunk and a finished
+  file (same content hash) is not imported twice.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import hashlib
+import io
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import IO, Iterable, Iterator, Optional
+
+import structlog
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from catalog.models import Product
+from stores.models import Store, StoreChain
+from whatsapp.unit_translations import resolve_unit_translation
+
+from . import snapshots
+from .models import PRICE_DECIMAL_PLACES, PRICE_MAX_DIGITS, PriceFeedImport, PriceReport
+
+
+logger = structlog.get_logger(__name__)
+
+# Store.external_ids key holding "<chain id>:<store id>" (no leading zeros) of the chain's feeds
+FEED_STORE_KEY = "price_feed"
+SOURCE = "price_feed"
+DEFAULT_CHUNK_SIZE = 2000
+
+_BARCODE_RE = re.compile(r"^\d{8,14}$")
+_ITEM_TAGS = frozenset({"item", "product"})
+_HEADER_TAGS = frozenset({"chainid", "storeid"})
+_MAX_PRICE = Decimal(10) ** (PRICE_MAX_DIGITS - PRICE_DECIMAL_PLACES)
+_MAX_QUANTITY = Decimal("10000")  # unit_measure_quantity is max_digits=6, decimal_places=2
+_CENTS = Decimal("0.01")
+_PRODUCT_FIELDS = ("id", "barcode", "name_he", "name_en", "brand", "search_text")
+
+
+@dataclass
+class FeedItem:
+    chain_id: str
+    store_id: str
+    code: str
+    name: str
+    manufacturer: str
+    unit: str
+    quantity: str
+    price: str
+    updated_at: str
+
+
+@dataclass
+class ImportResult:
+    file_name: str
+    status: str = PriceFeedImport.Status.RUNNING
+    rows: int = 0
+    reports_created: int = 0
+    rows_skipped: int = 0
+    products_created: int = 0
+    stores_created: int = 0
+    resumed_from: int = 0
+    elapsed_s: float = 0.0
+    error: str = ""
+
+
+def _normalize_id(value: str) -> str:
+    value = (value or "").strip()
+    return value.lstrip("0") or value
+
+
+def feed_store_key(chain_id: str, store_id: str) -> str:
+    return f"{_normalize_id(chain_id)}:{_normalize_id(store_id)}"
+
+
+def _field(fields: dict, *names: str) -> str:
+    for name in names:
+        value = fields.get(name)
+        if value:
+            return value
+    return ""
+
+
+def _item(fields: dict, header: dict) -> FeedItem:
+    return FeedItem(
+        chain_id=_field(header, "chainid"),
+        store_id=_field(header, "storeid"),
+        code=_field(fields, "itemcode", "barcode"),
+        name=_field(fields, "itemname", "itemnm", "manufactureritemdescription"),
+        manufacturer=_field(fields, "manufacturername"),
+        unit=_field(fields, "unitqty"),
+        quantity=_field(fields, "quantity"),
+        price=_field(fields, "itemprice"),
+        updated_at=_field(fields, "priceupdatedate"),
+    )
+
+
+def _tag(element: ET.Element) -> str:
+    return element.tag.rsplit("}", 1)[-1].lower()
+
+
+def iter_xml_items(stream: IO[bytes]) -> Iterator[FeedItem]:
+    header: dict[str, str] = {}
+    parents: list[ET.Element] = []
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        tag = _tag(element)
+        if tag in _ITEM_TAGS:
+            yield _item({_tag(child): (child.text or "").strip() for child in element}, header)
+            # Drop parsed rows so memory stays flat
+            if parents:
+                parents[-1].remove(element)
+        elif tag in _HEADER_TAGS and not (parents and _tag(parents[-1]) in _ITEM_TAGS):
+            header[tag] = (element.text or "").strip()
+
+
+def iter_csv_items(stream: IO[bytes]) -> Iterator[FeedItem]:
+    for row in csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")):
+        fields = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+        yield _item(fields, fields)
+
+
+def iter_items(path: str) -> Iterator[FeedItem]:
+    name = path[:-3] if path.endswith(".gz") else path
+    with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as stream:
+        yield from (iter_csv_items if name.lower().endswith(".csv") else iter_xml_items)(stream)
+
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as stream:
+        return hashlib.file_digest(stream, "sha256").hexdigest()
+
+
+def _decimal(value: str, limit: Decimal) -> Optional[Decimal]:
+    try:
+        number = Decimal(value.replace(",", "")).quantize(_CENTS)
+    except (InvalidOperation, AttributeError):
+        return None
+    return number if 0 < number < limit else None
+
+
+def _observed_at(value: str, default):
+    moment = parse_datetime(value.strip()) if value else None
+    if moment is None:
+        return default
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _feed_stores(keys: Optional[Iterable[str]] = None) -> dict[str, Store]:
+    stores = Store.objects.filter(external_ids__has_key=FEED_STORE_KEY).select_related("city_obj")
+    if keys is not None:
+        stores = stores.filter(**{f"external_ids__{FEED_STORE_KEY}__in": list(keys)})
+    return {store.external_ids[FEED_STORE_KEY]: store for store in stores}
+
+
+class FeedImporter:
+    def __init__(
+        self,
+        *,
+        store_id: Optional[int] = None,
+        chain_id: Optional[int] = None,
+        create_stores: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.store = Store.objects.select_related("city_obj").get(pk=store_id) if store_id else None
+        self.chain = StoreChain.objects.get(pk=chain_id) if chain_id else None
+        self.create_stores = create_stores
+        self.chunk_size = chunk_size
+        self.stores = {} if self.store else _feed_stores()
+        self.products: dict[str, Product] = {}
+
+    def import_file(self, path: str, force: bool = False) -> ImportResult:
+        started = time.perf_counter()
+        result = ImportResult(file_name=os.path.basename(path))
+        record, _created = PriceFeedImport.objects.get_or_create(
+            sha256=file_sha256(path), defaults={"file_name": result.file_name[:255]}
+        )
+        if record.status == PriceFeedImport.Status.DONE and not force:
+            result.status = "skipped"
+            return result
+        if record.status == PriceFeedImport.Status.DONE:
+            record.rows_done = record.reports_created = record.rows_skipped = 0
+        record.status, record.last_error, record.finished_at = PriceFeedImport.Status.RUNNING, "", None
+        record.save(update_fields=["rows_done", "reports_created", "rows_skipped", "status", "last_error", "finished_at"])
+        result.resumed_from = record.rows_done
+        observed_default = timezone.now()
+        try:
+            # Rows committed by an earlier run are parsed again but not imported
+            for chunk in _chunks(islice(iter_items(path), record.rows_done, None), self.chunk_size):
+                self._import_chunk(record, chunk, observed_default, result)
+        except Exception as exc:
+            result.status, result.error = PriceFeedImport.Status.FAILED, repr(exc)
+            PriceFeedImport.objects.filter(pk=record.pk).update(status=result.status, last_error=result.error)
+            logger.exception("price_feed_failed", file=result.file_name, rows=result.rows)
+        else:
+            result.status = PriceFeedImport.Status.DONE
+            PriceFeedImport.objects.filter(pk=record.pk).update(status=result.status, finished_at=timezone.now())
+        result.elapsed_s = round(time.perf_counter() - started, 2)
+        logger.info(
+            "price_feed_imported",
+            file=result.file_name,
+            status=result.status,
+            rows=result.rows,
+            reports=result.reports_created,
+            skipped=result.rows_skipped,
+            elapsed_s=result.elapsed_s,
+        )
+        return result
+
+    def _import_chunk(self, record: PriceFeedImport, chunk: list[FeedItem], observed_default, result: ImportResult):
+        self._resolve_stores(chunk, result)
+        priced = []
+        for item in chunk:
+            store = self.store or self.stores.get(feed_store_key(item.chain_id, item.store_id))
+            price = _decimal(item.price, _MAX_PRICE)
+            if store is not None and price is not None:
+                priced.append((item, store, price))
+        self._resolve_products([item for item, _store, _price in priced], result)
+        now = timezone.now()
+        reports = []
+        for item, store, price in priced:
+            product = self.products.get(item.code)
+            if product is None:
+                continue
+            unit = resolve_unit_translation(item.unit)
+            report = PriceReport(
+                product=product,
+                store=store,
+                price=price,
+                units_in_price=1,
+                unit_measure_type=unit["en"][:30],
+                unit_measure_type_he=unit["he"][:30],
+                unit_measure_type_en=unit["en"][:30],
+                unit_measure_quantity=_decimal(item.quantity, _MAX_QUANTITY),
+                observed_at=_observed_at(item.updated_at, observed_default),
+                product_text_raw=item.name[:240],
+                locale="he",
+                source=SOURCE,
+                needs_moderation=False,
+                moderated_at=now,
+            )
+            report.set_normalized_unit_price()
+            reports.append(report)
+        skipped = len(chunk) - len(reports)
+        with transaction.atomic():
+            PriceReport.objects.bulk_create(reports)
+            snapshots.upsert_approvals(reports)
+            PriceFeedImport.objects.filter(pk=record.pk).update(
+                rows_done=F("rows_done") + len(chunk),
+                reports_created=F("reports_created") + len(reports),
+                rows_skipped=F("rows_skipped") + skipped,
+            )
+        result.rows += len(chunk)
+        result.reports_created += len(reports)
+        result.rows_skipped += skipped
+
+    def _resolve_stores(self, chunk: list[FeedItem], result: ImportResult) -> None:
+        if self.store:
+            return
+        missing = {feed_store_key(item.chain_id, item.store_id) for item in chunk} - self.stores.keys()
+        if not missing or not (self.create_stores and self.chain):
+            return
+        with transaction.atomic():
+            # Workers create a chain's stores one at a time
+            StoreChain.objects.select_for_update().filter(pk=self.chain.pk).exists()
+            self.stores.update(_feed_stores(missing))
+            new = []
+            for key in sorted(missing - self.stores.keys()):
+                name = f"{self.chain.name} {key.split(':', 1)[1]}"
+                store = Store(chain=self.chain, name=name, name_he=name, name_en=name, external_ids={FEED_STORE_KEY: key})
+                store.set_search_fields()
+                new.append(store)
+            Store.objects.bulk_create(new)
+        for store in new:
+            self.stores[store.external_ids[FEED_STORE_KEY]] = store
+        result.stores_created += len(new)
+
+    def _load_products(self, codes: set[str]) -> None:
+        for product in Product.objects.filter(barcode__in=codes).only(*_PRODUCT_FIELDS):
+            self.products[product.barcode] = product
+
+    def _resolve_products(self, items: list[FeedItem], result: ImportResult) -> None:
+        codes = {item.code for item in items if _BARCODE_RE.match(item.code)} - self.products.keys()
+        if not codes:
+            return
+        self._load_products(codes)
+        new: dict[str, Product] = {}
+        for item in items:
+            if item.code not in codes or item.code in self.products or item.code in new or not item.name:
+                continue
+            unit = resolve_unit_translation(item.unit)
+            product = Product(
+                name_he=item.name[:160],
+                name_en=item.name[:160],
+                brand=item.manufacturer[:120],
+                barcode=item.code,
+                default_unit_type=unit["en"][:30],
+                default_unit_type_he=unit["he"][:30],
+                default_unit_type_en=unit["en"][:30],
+                default_unit_quantity=_decimal(item.quantity, _MAX_QUANTITY),
+            )
+            product.set_search_fields()
+            new[item.code] = product
+        if new:
+            # Another worker may insert the same barcode first: keep whichever row won
+            Product.objects.bulk_create(new.values(), ignore_conflicts=True)
+            self._load_products(set(new))
+            result.products_created += len(new)
+
+
+def import_file(path: str, *, force: bool = False, **options) -> ImportResult:
+    """Import one file (entry point for the command's worker processes)."""
+    return FeedImporter(**options).import_file(path, force=force)
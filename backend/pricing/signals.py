@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from catalog.models import Product
+from stores.models import City, Store
+
+from . import snapshots
+
+# Only these edits change what StoreProductSnapshot denormalizes
+# (Product.search_text is derived from the product fields listed here)
+_PRODUCT_FIELDS = {"name_he", "name_en", "brand", "variant"}
+_STORE_FIELDS = {"name", "display_name", "city", "city_he", "city_en", "city_obj", "location"}
+_CITY_FIELDS = {"name_he", "name_en", "slug"}
+
+
+def _touches(update_fields, fields: set[str]) -> bool:
+    return update_fields is None or bool(fields.intersection(update_fields))
+
+
+@receiver(post_save, sender=Product)
+def _refresh_product_snapshots(sender, instance: Product, created: bool, update_fields=None, **kwargs) -> None:
+    if not created and _touches(update_fields, _PRODUCT_FIELDS):
+        snapshots.refresh_product(instance)
+
+
+@receiver(post_save, sender=Store)
+def _refresh_store_snapshots(sender, instance: Store, created: bool, update_fields=None, **kwargs) -> None:
+    if not created and _touches(update_fields, _STORE_FIELDS):
+        snapshots.refresh_store(instance)
+
+
+@receiver(post_save, sender=City)
+def _refresh_city_snapshots(sender, instance: City, created: bool, update_fields=None, **kwargs) -> None:
+    if not created and _touches(update_fields, _CITY_FIELDS):
+        snapshots.refresh_city(instance)
@@ -0,0 +1,263 @@
+"""Maintenance of the ``StoreProductSnapshot`` read model.
+
+One row per product×store holds the latest approved report together with the
+product/store attributes deal search displays. Rows are written:
+
+* on approval (``upsert_approvals``) and rejection (``rebuild`` of the
+  affected products), inside the moderation transaction (``pricing.moderation``);
+* per chunk of a chain price-file import (``upsert_approvals``, ``pricing.price_feed``);
+* on report fixes that move or change an approved report (``refresh_pair``);
+* when products, stores or cities are edited (``refresh_product`` /
+  ``refresh_store`` / ``refresh_city``, via ``pricing.signals``);
+* in bulk by ``rebuild`` (``rebuild_store_product_snapshots`` command).
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable, Optional
+
+import structlog
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.sql import InsertQuery
+
+from catalog.models import Product, build_product_search_text
+from stores.models import City, Store
+
+from .models import PriceReport, StoreProductSnapshot
+
+
+logger = structlog.get_logger(__name__)
+
+# Approved = moderated without a rejection reason
+APPROVED = Q(needs_moderation=False, moderation_reason="")
+
+UNIT_PRICE_QUANT = Decimal("0.0001")
+
+# Columns rewritten from the latest approved report (everything but the key and the count)
+SNAPSHOT_FIELDS = (
+    "last_report",
+    "last_price",
+    "last_observed_at",
+    "product_name_he",
+    "product_name_en",
+    "product_brand",
+    "product_text_raw",
+    "search_text",
+    "store_display_name",
+    "store_city",
+    "city",
+    "location",
+    "units_in_price",
+    "unit_price",
+    "unit_measure_type_he",
+    "unit_measure_type_en",
+    "unit_measure_quantity",
+    "normalized_unit_price",
+    "normalized_unit",
+    "is_for_club_members_only",
+)
+
+
+def _store_city(store: Store) -> str:
+    if store.city_obj_id and store.city_obj:
+        return store.city_obj.display_name
+    return store.city or store.city_en or store.city_he or ""
+
+
+def snapshot_fields(report: PriceReport) -> dict:
+    """Denormalized snapshot values for ``report`` (product and store must be loaded)."""
+    product, store = report.product, report.store
+    units = report.units_in_price or 1
+    return {
+        "last_report": report,
+        "last_price": report.price,
+        "last_observed_at": report.observed_at,
+        "product_name_he": product.name_he,
+        "product_name_en": product.name_en,
+        "product_brand": product.brand,
+        "product_text_raw": report.product_text_raw,
+        "search_text": build_product_search_text(product.search_text, report.product_text_raw),
+        "store_display_name": store.display_name or store.name,
+        "store_city": _store_city(store),
+        "city": store.city_obj,
+        "location": store.location,
+        "units_in_price": units,
+        "unit_price": (Decimal(report.price) / units).quantize(UNIT_PRICE_QUANT),
+        "unit_measure_type_he": report.unit_measure_type_he,
+        "unit_measure_type_en": report.unit_measure_type_en or report.unit_measure_type,
+        "unit_measure_quantity": report.unit_measure_quantity,
+        "normalized_unit_price": report.normalized_unit_price,
+        "normalized_unit": report.normalized_unit,
+        "is_for_club_members_only": report.is_for_club_members_only,
+    }
+
+
+def upsert_approvals(reports: Iterable[PriceReport]) -> int:
+    """Fold newly approved reports into their snapshots with one ``INSERT ... ON CONFLICT``.
+
+    Per product×store the latest report becomes current unless the snapshot
+    already holds a newer one, and the confirmation count grows by the
+    number of reports. Product and store must be loaded (``select_related``).
+    Returns the number of snapshots written.
+    """
+    latest: dict[tuple[int, int], PriceReport] = {}
+    counts: dict[tuple[int, int], int] = {}
+    for report in reports:
+        key = (report.product_id, report.store_id)
+        counts[key] = counts.get(key, 0) + 1
+        current = latest.get(key)
+        if current is None or (report.observed_at, report.pk) > (current.observed_at, current.pk):
+            latest[key] = report
+    if not latest:
+        return 0
+    # Key order: concurrent upserts (e.g. parallel feed imports) lock rows in the same order
+    rows = [
+        StoreProductSnapshot(
+            product_id=key[0], store_id=key[1], confirmation_count=counts[key], **snapshot_fields(report)
+        )
+        for key, report in sorted(latest.items())
+    ]
+    meta = StoreProductSnapshot._meta
+    query = InsertQuery(StoreProductSnapshot)
+    query.insert_values([field for field in meta.concrete_fields if not field.primary_key], rows)
+    ((sql, params),) = query.get_compiler(connection=connection).as_sql()
+
+    table = connection.ops.quote_name(meta.db_table)
+    quote = connection.ops.quote_name
+    newer = f"{table}.{quote('last_observed_at')} IS NULL OR EXCLUDED.{quote('last_observed_at')} >= {table}.{quote('last_observed_at')}"
+    assignments = [
+        f"{quote('confirmation_count')} = {table}.{quote('confirmation_count')} + EXCLUDED.{quote('confirmation_count')}",
+        f"{quote('updated_at')} = EXCLUDED.{quote('updated_at')}",
+    ]
+    for name in SNAPSHOT_FIELDS:
+        column = quote(meta.get_field(name).column)
+        assignments.append(f"{column} = CASE WHEN {newer} THEN EXCLUDED.{column} ELSE {table}.{column} END")
+    sql += (
+        f" ON CONFLICT ({quote('product_id')}, {quote('store_id')}) DO UPDATE SET "
+        + ", ".join(assignments)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    return len(rows)
+
+
+def refresh_pair(product_id: int, store_id: int) -> Optional[StoreProductSnapshot]:
+    """Recompute one snapshot from its approved reports (deleted when none are left)."""
+    approved = PriceReport.objects.filter(APPROVED, product_id=product_id, store_id=store_id)
+    latest = (
+        approved.select_related("product", "store", "store__city_obj")
+        .order_by("-observed_at", "-pk")
+        .first()
+    )
+    if latest is None:
+        StoreProductSnapshot.objects.filter(product_id=product_id, store_id=store_id).delete()
+        return None
+    with transaction.atomic():
+        snapshot, _created = StoreProductSnapshot.objects.update_or_create(
+            product_id=product_id,
+            store_id=store_id,
+            defaults={**snapshot_fields(latest), "confirmation_count": approved.count()},
+        )
+    return snapshot
+
+
+def refresh_store(store: Store) -> int:
+    return StoreProductSnapshot.objects.filter(store=store).update(
+        store_display_name=store.display_name or store.name,
+        store_city=_store_city(store),
+        city_id=store.city_obj_id,
+        location=store.location,
+    )
+
+
+def refresh_city(city: City) -> int:
+    return StoreProductSnapshot.objects.filter(city=city).update(store_city=city.display_name)
+
+
+def refresh_product(product: Product) -> int:
+    snapshots = list(StoreProductSnapshot.objects.filter(product=product))
+    for snapshot in snapshots:
+        snapshot.product_name_he = product.name_he
+        snapshot.product_name_en = product.name_en
+        snapshot.product_brand = product.brand
+        snapshot.search_text = build_product_search_text(product.search_text, snapshot.product_text_raw)
+    StoreProductSnapshot.objects.bulk_update(
+        snapshots, ["product_name_he", "product_name_en", "product_brand", "search_text"]
+    )
+    return len(snapshots)
+
+
+def _chunks(values: Iterable[int], size: int):
+    chunk: list[int] = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def rebuild(product_ids: Optional[Iterable[int]] = None, chunk_size: int = 1000) -> dict:
+    """Rebuild snapshots from approved reports, ``chunk_size`` products at a time.
+
+    Each chunk is one ``DISTINCT ON (product_id, store_id)`` read (served by
+    ``pr_approved_latest_idx``), one grouped count, one upsert and one delete
+    of pairs that no longer have an approved report.
+    """
+    if product_ids is None:
+        product_ids = Product.objects.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=chunk_size)
+    stats = {"products": 0, "upserted": 0, "deleted": 0}
+    for chunk in _chunks(product_ids, chunk_size):
+        approved = PriceReport.objects.filter(APPROVED, product_id__in=chunk)
+        counts = {
+            (row["product_id"], row["store_id"]): row["n"]
+            for row in approved.order_by().values("product_id", "store_id").annotate(n=Count("id"))
+        }
+        latest = (
+            approved.select_related("product", "store", "store__city_obj")
+            .order_by("product_id", "store_id", "-observed_at", "-pk")
+            .distinct("product_id", "store_id")
+        )
+        rows = [
+            StoreProductSnapshot(
+                product_id=report.product_id,
+                store_id=report.store_id,
+                confirmation_count=counts.get((report.product_id, report.store_id), 1),
+                **snapshot_fields(report),
+            )
+            for report in latest
+        ]
+        if rows:
+            StoreProductSnapshot.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["product", "store"],
+                update_fields=[*SNAPSHOT_FIELDS, "confirmation_count", "updated_at"],
+            )
+        deleted, _ = (
+            StoreProductSnapshot.objects.filter(product_id__in=chunk)
+            .exclude(
+                Exists(
+                    PriceReport.objects.filter(
+                        APPROVED, product_id=OuterRef("product_id"), store_id=OuterRef("store_id")
+                    )
+                )
+            )
+            .delete()
+        )
+        stats["products"] += len(chunk)
+        stats["upserted"] += len(rows)
+        stats["deleted"] += deleted
+    logger.info("snapshots_rebuilt", **stats)
+    return stats
+
+
+def sync_normalized_unit_prices() -> int:
+    """Copy normalized unit prices from each snapshot's last report (after a backfill)."""
+    last_report = PriceReport.objects.filter(pk=OuterRef("last_report_id"))
+    return StoreProductSnapshot.objects.filter(last_report__isnull=False).update(
+        normalized_unit_price=Subquery(last_report.values("normalized_unit_price")[:1]),
+        normalized_unit=Subquery(last_report.values("normalized_unit")[:1]),
+    )
@@ -3,10 +3,14 @@ from __future__ import annotations
 from unittest import mock
 
 from decimal import Decimal
+from io import StringIO
 
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test import TestCase, RequestFactory
 from django.urls import reverse
 
@@ -14,6 +18,7 @@ from catalog.models import Product
 from stores.models import Store, City
 from whatsapp.models import WAUser, DealReportSession
 from pricing.models import PriceReport, StoreProductSnapshot
+from pricing import moderation
 from pricing.admin import PriceReportAdmin
 
 
@@ -47,7 +52,7 @@ class PriceReportAdminTests(TestCase):
             observed_at="2025-01-01T00:00:00Z",
         )
 
-    @mock.patch("pricing.admin.send_whatsapp_text")
+    @mock.patch("pricing.moderation.send_texts_later")
     def test_mark_reports_approved_sets_fields_and_updates_snapshot(self, mock_send):
         report = self._create_report()
         request = self._make_request({})
@@ -63,7 +68,64 @@ class PriceReportAdminTests(TestCase):
         self.assertEqual(report.moderation_reason, "")
         snapshot = StoreProductSnapshot.objects.get(product=self.product, store=self.store)
         self.assertEqual(snapshot.confirmation_count, 1)
+        self.assertEqual(snapshot.last_report, report)
+        self.assertEqual(snapshot.product_name_en, "Milk")
+        self.assertEqual(snapshot.store_display_name, "Test Store")
+        self.assertEqual(snapshot.store_city, "Test City")
+        self.assertEqual(snapshot.unit_price, Decimal("4.9000"))
+        self.assertEqual(snapshot.search_text, "milk")
         mock_send.assert_called_once()
+        (messages,) = mock_send.call_args[0]
+        self.assertEqual([to for to, _body in messages], ["9721111111"])
+
+    @mock.patch("pricing.moderation.send_texts_later")
+    def test_bulk_approval_query_count_does_not_grow_with_the_selection(self, mock_send):
+        other_store = Store.objects.create(name="Other Store", city="Test City")
+
+        def approve(count: int) -> int:
+            reports = []
+            for i in range(count):
+                report = self._create_report()
+                PriceReport.objects.filter(pk=report.pk).update(
+                    store=other_store if i % 2 else self.store, price=f"{5 + i}.00"
+                )
+                reports.append(report.pk)
+            with CaptureQueriesContext(connection) as ctx:
+                self.model_admin.mark_reports_approved(self._make_request({}), PriceReport.objects.filter(pk__in=reports))
+            return len(ctx.captured_queries)
+
+        self.assertEqual(approve(2), approve(20))
+        snapshot = StoreProductSnapshot.objects.get(product=self.product, store=self.store)
+        self.assertEqual(snapshot.confirmation_count, 11)
+        self.assertEqual(snapshot.last_report_id, PriceReport.objects.filter(store=self.store).latest("pk").pk)
+        (messages,) = mock_send.call_args[0]
+        self.assertEqual(len(messages), 20)
+
+    def test_moderation_queue_pages_with_session_data_in_one_query(self):
+        reports = [self._create_report() for _ in range(3)]
+        for report, data in ((reports[0], {"step": "old"}), (reports[2], {"price_report_id": reports[2].pk})):
+            session = DealReportSession.objects.create(user=self.wa_user, data=data)
+            PriceReport.objects.filter(pk=report.pk).update(deal_session=session)
+
+        with self.assertNumQueries(1):
+            first = moderation.pending_queue(size=2)
+            self.assertEqual(str(first.entries[0]["report"].store), "Test Store, Test City")
+        self.assertEqual([entry["report"].pk for entry in first.entries], [reports[0].pk, reports[1].pk])
+        self.assertEqual(first.entries[0]["session_data"]["step"], "old")
+        self.assertEqual(first.entries[1]["session_data"], {})
+        self.assertEqual(first.next_after, reports[1].pk)
+
+        second = moderation.pending_queue(after=first.next_after, size=2)
+        self.assertEqual([entry["report"].pk for entry in second.entries], [reports[2].pk])
+        self.assertEqual(second.entries[0]["session_data"]["price_report_id"], reports[2].pk)
+        self.assertIsNone(second.next_after)
+
+        self.client.force_login(self.admin_user)
+        response = self.client.get(
+            reverse("admin:pricing_pricereport_changelist"), {"moderation_queue": "1", "after": reports[0].pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["report"].pk for entry in response.context["queue"]], [r.pk for r in reports[1:]])
 
     def test_mark_reports_rejected_requires_reason_and_sets_fields(self):
         report = self._create_report()
@@ -87,7 +149,7 @@ class PriceReportAdminTests(TestCase):
         self.assertIn("Incomplete", report.moderation_reason)
         self.assertEqual(StoreProductSnapshot.objects.count(), 0)
 
-    @mock.patch("pricing.admin.send_whatsapp_text")
+    @mock.patch("pricing.moderation.send_texts_later")
     def test_approval_increments_existing_snapshot(self, mock_send):
         snapshot = StoreProductSnapshot.objects.create(
             product=self.product,
@@ -105,12 +167,83 @@ class PriceReportAdminTests(TestCase):
         self.assertEqual(snapshot.confirmation_count, 3)
         mock_send.assert_called_once()
 
+    @mock.patch("pricing.moderation.send_texts_later")
+    def test_rejecting_an_approved_report_withdraws_it_from_the_snapshot(self, _mock_send):
+        older = self._create_report()
+        older.observed_at = "2024-12-01T00:00:00Z"
+        older.price = "3.50"
+        older.save()
+        report = self._create_report()
+        self.model_admin.mark_reports_approved(
+            self._make_request({}), PriceReport.objects.filter(pk__in=[older.pk, report.pk])
+        )
+        self.model_admin.mark_reports_rejected(
+            self._make_request({"rejection_reason": "Wrong price"}), PriceReport.objects.filter(pk=report.pk)
+        )
+        snapshot = StoreProductSnapshot.objects.get(product=self.product, store=self.store)
+        self.assertEqual(snapshot.last_report, older)
+        self.assertEqual(snapshot.last_price, Decimal("3.50"))
+        self.assertEqual(snapshot.confirmation_count, 1)
+
+        self.model_admin.mark_reports_rejected(
+            self._make_request({"rejection_reason": "Wrong store"}), PriceReport.objects.filter(pk=older.pk)
+        )
+        self.assertFalse(StoreProductSnapshot.objects.exists())
+
+    @mock.patch("pricing.moderation.send_texts_later")
+    def test_fixing_an_approved_report_moves_its_snapshot(self, _mock_send):
+        report = self._create_report()
+        self.model_admin.mark_reports_approved(self._make_request({}), PriceReport.objects.filter(pk=report.pk))
+        new_store = Store.objects.create(name="Correct Store", city="Old City")
+        self.client.force_login(self.admin_user)
+        self.client.post(
+            reverse("admin:pricing_pricereport_fix", args=[report.pk]),
+            {"store": new_store.pk, "product": self.product.pk, "product_text_raw": "Milk 3%"},
+        )
+        self.assertFalse(StoreProductSnapshot.objects.filter(store=self.store).exists())
+        snapshot = StoreProductSnapshot.objects.get(store=new_store)
+        self.assertEqual(snapshot.product_text_raw, "Milk 3%")
+        self.assertEqual(snapshot.store_display_name, "Correct Store")
+
+        new_store.display_name = "Correct Store - Center"
+        new_store.save()
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.store_display_name, "Correct Store - Center")
+
+    def test_rebuild_command_restores_snapshots(self):
+        report = self._create_report()
+        PriceReport.objects.filter(pk=report.pk).update(needs_moderation=False)
+        StoreProductSnapshot.objects.create(
+            product=Product.objects.create(name_he="Stale"), store=self.store, last_price="1.00",
+            last_observed_at="2025-01-01T00:00:00Z",
+        )
+        call_command("rebuild_store_product_snapshots", stdout=StringIO())
+        snapshot = StoreProductSnapshot.objects.get()
+        self.assertEqual((snapshot.product_id, snapshot.last_report_id), (self.product.pk, report.pk))
+
+    def test_backfill_unit_prices_command(self):
+        report = self._create_report()
+        PriceReport.objects.filter(pk=report.pk).update(
+            needs_moderation=False, unit_measure_type_en="Liter", unit_measure_quantity="2"
+        )
+        call_command("rebuild_store_product_snapshots", stdout=StringIO())
+        self.assertIsNone(StoreProductSnapshot.objects.get().normalized_unit_price)
+
+        call_command("backfill_unit_prices", stdout=StringIO())
+
+        report.refresh_from_db()
+        self.assertEqual((report.normalized_unit_price, report.normalized_unit), (Decimal("2.4500"), "liter"))
+        snapshot = StoreProductSnapshot.objects.get()
+        self.assertEqual((snapshot.normalized_unit_price, snapshot.normalized_unit), (Decimal("2.4500"), "liter"))
+
     def test_fix_view_updates_store_city_and_session(self):
         report = self._create_report()
         session = DealReportSession.objects.create(
             user=self.wa_user,
             data={"price_report_id": str(report.pk), "store_name": "Typo Store"},
         )
+        report.deal_session = session
+        report.save(update_fields=["deal_session"])
         self.client.force_login(self.admin_user)
         new_store = Store.objects.create(name="Correct Store", city="Old City")
         city = City.objects.create(name_he="ראש העין", name_en="Rosh HaAyin")
@@ -138,6 +271,7 @@ class PriceReportAdminTests(TestCase):
         self.assertEqual(report.unit_measure_type_en, "Liter")
         self.assertEqual(report.unit_measure_type_he, "ליטר")
         self.assertEqual(report.unit_measure_quantity, Decimal("2"))
+        self.assertEqual(report.normalized_unit_price, Decimal("2.4500"))
         self.assertEqual(report.product_text_raw, "Milk 3%")
         self.assertEqual(session.data["store_name"], new_store.name)
         self.assertEqual(session.data["city"], new_store.city)
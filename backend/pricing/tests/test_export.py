@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import csv
+import json
+import tempfile
+import unittest
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.models import Product
+from pricing import export
+from pricing.models import PriceReport
+from stores.models import City, Store, StoreChain
+
+
+class PriceExportTests(TestCase):
+    def setUp(self) -> None:
+        self.city = City.objects.create(name_he="ראש העין", name_en="Rosh HaAyin")
+        other_city = City.objects.create(name_he="חולון", name_en="Holon")
+        chain = StoreChain.objects.create(name="Shufersal", slug="shufersal")
+        self.store = Store.objects.create(name="Givat Tal", chain=chain, city_obj=self.city)
+        other_store = Store.objects.create(name="Corner Shop", city_obj=other_city)
+        self.product = Product.objects.create(name_he="חלב", name_en="Milk", brand="Tnuva")
+        self.approved = self._report(self.store, "4.90", "2025-01-10T08:00:00Z", needs_moderation=False)
+        self._report(other_store, "5.20", "2025-01-11T08:00:00Z", needs_moderation=False)
+        self._report(self.store, "3.10", "2025-01-12T08:00:00Z", needs_moderation=True)
+        self._report(self.store, "1.00", "2025-01-13T08:00:00Z", needs_moderation=False, moderation_reason="spam")
+
+    def _report(self, store, price, observed_at, **fields) -> PriceReport:
+        return PriceReport.objects.create(
+            product=self.product, store=store, price=price, observed_at=observed_at, **fields
+        )
+
+    def _export(self, *args) -> str:
+        out = StringIO()
+        call_command("export_prices", *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_csv_export_contains_only_approved_reports_with_joined_columns(self):
+        rows = list(csv.DictReader(StringIO(self._export())))
+
+        self.assertEqual([row["price"] for row in rows], ["4.90", "5.20"])
+        self.assertEqual(rows[0]["chain"], "Shufersal")
+        self.assertEqual(rows[0]["city_en"], "Rosh HaAyin")
+        self.assertEqual(rows[0]["product_brand"], "Tnuva")
+        self.assertEqual(rows[0]["observed_at"], "2025-01-10T08:00:00+00:00")
+        self.assertEqual(rows[1]["chain"], "")
+
+    def test_filters_by_city_chain_and_date_range(self):
+        for args in (
+            ("--city", "Rosh HaAyin"),
+            ("--city", str(self.city.pk)),
+            ("--chain", "shufersal"),
+            ("--since", "2025-01-10", "--until", "2025-01-11"),
+        ):
+            lines = self._export("--format", "jsonl", *args).splitlines()
+            self.assertEqual([json.loads(line)["id"] for line in lines], [self.approved.pk], args)
+        self.assertEqual(self._export("--format", "jsonl", "--city", "Atlantis"), "")
+
+    def test_snapshot_dataset(self):
+        call_command("rebuild_store_product_snapshots", stdout=StringIO())
+        rows = list(csv.DictReader(StringIO(self._export("--dataset", "snapshots", "--chain", "Shufersal"))))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["last_price"], "4.90")
+        self.assertEqual(rows[0]["last_report_id"], str(self.approved.pk))
+
+    @unittest.skipIf(export.pyarrow is None, "pyarrow is not installed")
+    def test_parquet_export_writes_typed_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "reports.parquet"
+            self._export("--format", "parquet", "--output", str(path), "--chunk-size", "1")
+            table = export.pyarrow.parquet.read_table(path)
+
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.schema.field("price").type, export.pyarrow.decimal128(7, 2))
+
+    def test_admin_endpoint_streams_for_staff_only(self):
+        url = reverse("admin:pricing_pricereport_export")
+        User = get_user_model()
+        self.client.force_login(User.objects.create_user(username="reader", password="pwd"))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(User.objects.create_superuser(username="staff", password="pwd"))
+        response = self.client.get(url, {"format": "jsonl", "chain": "shufersal"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["price"] for line in lines], ["4.90"])
+        self.assertEqual(self.client.get(url, {"since": "yesterday"}).status_code, 400)
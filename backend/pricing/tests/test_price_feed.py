@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import gzip
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog.models import Product
+from pricing import price_feed
+from pricing.models import PriceFeedImport, PriceReport, StoreProductSnapshot
+from stores.models import Store, StoreChain
+
+CHAIN_ID = "7290027600007"
+
+PRICE_FULL_XML = f"""<?xml version="1.0" encoding="utf-8"?>
+<root>
+  <ChainId>{CHAIN_ID}</ChainId>
+  <SubChainId>001</SubChainId>
+  <StoreId>012</StoreId>
+  <Items Count="4">
+    <Item>
+      <PriceUpdateDate>2025-01-05 08:30</PriceUpdateDate>
+      <ItemCode>7290000042442</ItemCode>
+      <ItemName>חלב 3% 1 ליטר</ItemName>
+      <ManufacturerName>תנובה</ManufacturerName>
+      <UnitQty>ליטר</UnitQty>
+      <Quantity>1.00</Quantity>
+      <ItemPrice>6.90</ItemPrice>
+    </Item>
+    <Item>
+      <PriceUpdateDate>2025-01-05 08:30</PriceUpdateDate>
+      <ItemCode>7290000066318</ItemCode>
+      <ItemName>גבינה לבנה 5%</ItemName>
+      <ManufacturerName>תנובה</ManufacturerName>
+      <UnitQty>גרמים</UnitQty>
+      <Quantity>250.00</Quantity>
+      <ItemPrice>5.00</ItemPrice>
+    </Item>
+    <Item>
+      <ItemCode>1234</ItemCode>
+      <ItemName>עגבניות</ItemName>
+      <UnitQty>קילוגרם</UnitQty>
+      <ItemPrice>7.90</ItemPrice>
+    </Item>
+    <Item>
+      <ItemCode>7290000000015</ItemCode>
+      <ItemName>שקית</ItemName>
+      <ItemPrice>0.00</ItemPrice>
+    </Item>
+  </Items>
+</root>
+"""
+
+
+class PriceFeedImportTests(TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.chain = StoreChain.objects.create(name="Shufersal", slug="shufersal")
+        self.store = Store.objects.create(
+            name="Givat Tal", chain=self.chain, external_ids={price_feed.FEED_STORE_KEY: f"{CHAIN_ID}:12"}
+        )
+        self.milk = Product.objects.create(name_he="חלב 3%", barcode="7290000042442")
+
+    def _write(self, name: str, content: str) -> str:
+        path = Path(self.tmp.name) / name
+        if name.endswith(".gz"):
+            with gzip.open(path, "wt", encoding="utf-8") as stream:
+                stream.write(content)
+        else:
+            path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    def _import(self, *args) -> str:
+        out = StringIO()
+        call_command("import_price_feed", *args, stdout=out)
+        return out.getvalue()
+
+    def test_imports_approved_reports_products_and_snapshots(self):
+        path = self._write("PriceFull.xml", PRICE_FULL_XML)
+        self._import(path, "--chunk-size", "3")
+
+        reports = {report.product.barcode: report for report in PriceReport.objects.select_related("product")}
+        self.assertEqual(set(reports), {"7290000042442", "7290000066318"})
+        milk = reports["7290000042442"]
+        self.assertEqual(milk.product, self.milk)
+        self.assertEqual(milk.store, self.store)
+        self.assertFalse(milk.needs_moderation)
+        self.assertEqual(milk.source, price_feed.SOURCE)
+        self.assertEqual(milk.normalized_unit_price, Decimal("6.9000"))
+        cheese = reports["7290000066318"]
+        self.assertEqual(cheese.product.brand, "תנובה")
+        self.assertEqual(cheese.normalized_unit, "kilogram")
+        self.assertEqual(cheese.normalized_unit_price, Decimal("20.0000"))
+        self.assertTrue(cheese.product.search_text)
+        self.assertEqual(StoreProductSnapshot.objects.get(product=self.milk).last_price, Decimal("6.90"))
+        self.assertFalse(Product.objects.filter(barcode="7290000000015").exists())
+
+        record = PriceFeedImport.objects.get()
+        self.assertEqual(record.status, PriceFeedImport.Status.DONE)
+        self.assertEqual((record.rows_done, record.reports_created, record.rows_skipped), (4, 2, 2))
+
+        self.assertIn("skipped", self._import(path))
+        self.assertEqual(PriceReport.objects.count(), 2)
+
+    def test_interrupted_file_resumes_after_the_committed_rows(self):
+        path = self._write("PriceFull.xml", PRICE_FULL_XML)
+        PriceFeedImport.objects.create(file_name="PriceFull.xml", sha256=price_feed.file_sha256(path), rows_done=1)
+
+        self._import(path)
+
+        self.assertEqual(list(PriceReport.objects.values_list("product__barcode", flat=True)), ["7290000066318"])
+        self.assertEqual(PriceFeedImport.objects.get().rows_done, 4)
+
+    def test_gzipped_csv_creates_missing_chain_stores(self):
+        path = self._write(
+            "prices.csv.gz",
+            "ChainId,StoreId,ItemCode,ItemName,UnitQty,Quantity,ItemPrice\n"
+            f"{CHAIN_ID},077,7290000042442,חלב 3%,ליטר,1,7.10\n",
+        )
+        self._import(path, "--chain", "shufersal", "--create-stores")
+
+        store = Store.objects.get(external_ids__price_feed=f"{CHAIN_ID}:77")
+        self.assertEqual(store.chain, self.chain)
+        self.assertTrue(store.search_text)
+        self.assertEqual(PriceReport.objects.get().store, store)
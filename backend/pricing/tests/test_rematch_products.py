@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog.models import Product
+from pricing.models import PriceReport, StoreProductSnapshot
+from stores.models import Store
+
+
+class RematchReportProductsTests(TestCase):
+    def setUp(self) -> None:
+        self.store = Store.objects.create(name="Test Store", city="Test City")
+
+    def _report(self, product: Product, text: str) -> PriceReport:
+        return PriceReport.objects.create(
+            product=product,
+            store=self.store,
+            price="4.90",
+            observed_at="2025-01-01T00:00:00Z",
+            needs_moderation=False,
+            product_text_raw=text,
+        )
+
+    def test_moves_reports_to_the_matched_product(self):
+        milk = Product.objects.create(name_he="Milk", name_en="Milk")
+        report = self._report(milk, "Tnuva Milk 3%")
+        tnuva = Product.objects.create(name_he="חלב תנובה 3%", name_en="Tnuva Milk 3%", brand="Tnuva")
+        call_command("rebuild_store_product_snapshots", stdout=StringIO())
+
+        call_command("rematch_report_products", stdout=StringIO())
+        report.refresh_from_db()
+        self.assertEqual(report.product_id, milk.pk)
+
+        call_command("rematch_report_products", "--apply", stdout=StringIO())
+        report.refresh_from_db()
+        self.assertEqual(report.product_id, tnuva.pk)
+        self.assertEqual(StoreProductSnapshot.objects.get().product_id, tnuva.pk)
+
+    def test_keeps_reports_on_their_brand_when_names_collide(self):
+        # Same name, lower pk, another brand: must not take Tnuva's reports
+        tara = Product.objects.create(name_he="חלב 3%", name_en="Milk 3%", brand="Tara")
+        tnuva = Product.objects.create(name_he="חלב 3%", name_en="Milk 3%", brand="Tnuva")
+        tara_report = self._report(tara, "חלב 3%")
+        tnuva_report = self._report(tnuva, "חלב 3%")
+
+        call_command("rematch_report_products", "--apply", stdout=StringIO())
+
+        tara_report.refresh_from_db()
+        tnuva_report.refresh_from_db()
+        self.assertEqual(tara_report.product_id, tara.pk)
+        self.assertEqual(tnuva_report.product_id, tnuva.pk)
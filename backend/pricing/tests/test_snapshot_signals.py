@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from django.test import TestCase
+
+from catalog.models import Product
+
+
+class ProductSnapshotSignalTests(TestCase):
+    def setUp(self) -> None:
+        self.product = Product.objects.create(name_he="חלב", name_en="Milk")
+
+    @mock.patch("pricing.snapshots.refresh_product")
+    def test_unit_only_save_leaves_snapshots_alone(self, mock_refresh):
+        self.product.default_unit_type_en = "Liter"
+        self.product.default_unit_type = "Liter"
+        self.product.save(update_fields=["default_unit_type_en", "default_unit_type"])
+        mock_refresh.assert_not_called()
+
+    @mock.patch("pricing.snapshots.refresh_product")
+    def test_brand_save_refreshes_snapshots_once(self, mock_refresh):
+        self.product.brand = "Tnuva"
+        self.product.save(update_fields=["brand"])
+        mock_refresh.assert_called_once_with(self.product)
+        self.product.refresh_from_db()
+        self.assertIn("tnuva", self.product.search_text)
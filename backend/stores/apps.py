@@ -5,3 +5,6 @@ class StoresConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "stores"
     verbose_name = "Stores"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401 - invalidates the in-memory city index on City/Store edits
@@ -0,0 +1,317 @@
+"""Process-wide in-memory index for resolving city names to ``City`` rows.
+
+Israel has about 1,200 localities, so every ``City`` fits comfortably in
+memory. The index maps normalized keys (Hebrew and English names, slug, the
+free-text city names stores were saved with, and a few common
+abbreviations) to city ids. Lookups that miss every key fall back to a
+bounded edit-distance search, so "Tel Aviv", "tel-aviv", "ת\"א" and "Tel Avv"
+all resolve to the same id without a query.
+
+The index is loaded lazily in one query. ``City``/``Store`` saves invalidate
+it (see ``stores.signals``): locally right away, and in other processes via a
+version key in the Django cache or, with a per-process cache, after
+``STORES_CITY_INDEX_TTL`` seconds, and once more when the transaction that
+made the edit commits. Inside a transaction that has itself written a
+``City``/``Store`` the index is loaded per call (it must see those rows, which
+other transactions must not); every other transaction uses the shared index.
+"""
+from __future__ import annotations
+
+import copy
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+import structlog
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import City
+
+
+logger = structlog.get_logger(__name__)
+
+_VERSION_KEY = "stores:city_index:version"
+FUZZY_CACHE_SIZE = 2048
+
+# Abbreviations and alternate names -> canonical city name (applied when that
+# city exists and no city is itself named like the alias)
+COMMON_CITY_ALIASES = {
+    "ת\"א": "תל אביב",
+    "תל אביב יפו": "תל אביב",
+    "tlv": "Tel Aviv",
+    "Tel Aviv-Yafo": "Tel Aviv",
+    "Tel Aviv Jaffa": "Tel Aviv",
+    "ב\"ש": "באר שבע",
+    "Beer Sheva": "Beersheba",
+    "ראשל\"צ": "ראשון לציון",
+    "פ\"ת": "פתח תקווה",
+    "פתח תקוה": "פתח תקווה",
+    "Petach Tikva": "Petah Tikva",
+    "jlm": "Jerusalem",
+    "י-ם": "ירושלים",
+    "Modiin-Maccabim-Reut": "Modiin",
+    "מודיעין מכבים רעות": "מודיעין",
+}
+
+
+def normalize_city_key(value: Optional[str]) -> str:
+    """Lowercase letters and digits only: drops spaces, hyphens, quotes and niqqud."""
+    text = unicodedata.normalize("NFKC", value or "").casefold()
+    return "".join(ch for ch in text if ch.isdigit() or "a" <= ch <= "z" or "א" <= ch <= "ת")
+
+
+def _max_distance(key: str) -> int:
+    if len(key) <= 3:
+        return 0
+    return 1 if len(key) <= 6 else 2
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or ``limit + 1`` as soon as it must exceed ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+@dataclass
+class CityIndex:
+    cities: dict[int, City]
+    by_key: dict[str, list[int]] = field(default_factory=dict)
+    keys_by_length: dict[int, list[str]] = field(default_factory=dict)
+    _fuzzy_cache: dict[str, list[int]] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def build(cls, cities: Iterable[City], aliases: Iterable[tuple[str, int]] = ()) -> "CityIndex":
+        index = cls(cities={city.pk: city for city in cities})
+        for city in index.cities.values():
+            for value in (city.name_he, city.name_en, city.slug):
+                index._add(value, city.pk)
+        for alias, city_id in aliases:
+            if city_id in index.cities:
+                index._add(alias, city_id)
+        for alias, target in COMMON_CITY_ALIASES.items():
+            if normalize_city_key(alias) in index.by_key:
+                continue  # a city (or store text) already owns that name
+            for city_id in list(index.by_key.get(normalize_city_key(target), ())):
+                index._add(alias, city_id)
+        for key in index.by_key:
+            index.keys_by_length.setdefault(len(key), []).append(key)
+        return index
+
+    def _add(self, value: Optional[str], city_id: int) -> None:
+        key = normalize_city_key(value)
+        if not key:
+            return
+        ids = self.by_key.setdefault(key, [])
+        if city_id not in ids:
+            ids.append(city_id)
+
+    def exact_ids(self, name: Optional[str]) -> list[int]:
+        return list(self.by_key.get(normalize_city_key(name), ()))
+
+    def fuzzy_ids(self, name: Optional[str]) -> list[int]:
+        """Ids of the closest keys within the edit-distance budget for ``name``'s length."""
+        key = normalize_city_key(name)
+        limit = _max_distance(key)
+        if not limit:
+            return []
+        cached = self._fuzzy_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        best = limit + 1
+        ids: list[int] = []
+        for length in range(len(key) - limit, len(key) + limit + 1):
+            for candidate in self.keys_by_length.get(length, ()):
+                distance = bounded_edit_distance(key, candidate, min(limit, best))
+                if distance > limit:
+                    continue
+                if distance < best:
+                    best, ids = distance, []
+                if distance == best:
+                    ids.extend(i for i in self.by_key[candidate] if i not in ids)
+        if len(self._fuzzy_cache) >= FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.clear()
+        self._fuzzy_cache[key] = ids
+        return list(ids)
+
+    def knows(self, name: Optional[str], city_id: int) -> bool:
+        """Whether ``name`` already resolves exactly to ``city_id``."""
+        return city_id in self.by_key.get(normalize_city_key(name), ())
+
+    def ids(self, name: Optional[str]) -> list[int]:
+        """Exact matches, else the nearest fuzzy matches (ascending id)."""
+        return sorted(self.exact_ids(name) or self.fuzzy_ids(name))
+
+    def get(self, city_id) -> Optional[City]:
+        try:
+            city = self.cities.get(int(city_id))
+        except (TypeError, ValueError):
+            return None
+        return copy.copy(city) if city else None
+
+    def resolve(self, name: Optional[str]) -> Optional[City]:
+        ids = self.ids(name)
+        return self.get(ids[0]) if ids else None
+
+    def candidates(self, name: Optional[str], limit: int = 5) -> list[City]:
+        """Exact matches; else cities whose names contain ``name``; else fuzzy matches."""
+        key = normalize_city_key(name)
+        if not key:
+            return []
+        ids = self.exact_ids(name)
+        if not ids:
+            ids = sorted(
+                {
+                    city.pk
+                    for city in self.cities.values()
+                    if key in normalize_city_key(city.name_he) or key in normalize_city_key(city.name_en)
+                },
+                key=lambda pk: (self.cities[pk].name_en, self.cities[pk].name_he),
+            )[:limit]
+        if not ids:
+            ids = self.fuzzy_ids(name)[:limit]
+        return [self.get(pk) for pk in ids]
+
+
+def load_city_index() -> CityIndex:
+    """One query: every city with the distinct free-text city names of its stores."""
+    rows = City.objects.annotate(
+        store_city=ArrayAgg("stores__city", distinct=True, default=[]),
+        store_city_he=ArrayAgg("stores__city_he", distinct=True, default=[]),
+        store_city_en=ArrayAgg("stores__city_en", distinct=True, default=[]),
+    )
+    cities = list(rows)
+    aliases = [
+        (alias, city.pk)
+        for city in cities
+        for alias in (*city.store_city, *city.store_city_he, *city.store_city_en)
+        if alias
+    ]
+    return CityIndex.build(cities, aliases)
+
+
+class _State:
+    lock = threading.Lock()
+    index: Optional[CityIndex] = None
+    pinned: Optional[CityIndex] = None
+    version = None
+    loaded_at = 0.0
+
+
+# Whether this thread's open transaction wrote a City/Store (connections are per thread)
+_local = threading.local()
+
+
+def _written_in_transaction() -> bool:
+    if not getattr(_local, "dirty", False):
+        return False
+    if connection.in_atomic_block:
+        return True
+    _local.dirty = False  # that transaction ended: committed (already invalidated) or rolled back
+    return False
+
+
+def _ttl() -> float:
+    return float(getattr(settings, "STORES_CITY_INDEX_TTL", 300))
+
+
+def get_city_index() -> CityIndex:
+    if _State.pinned is not None:
+        return _State.pinned
+    version = cache.get(_VERSION_KEY)
+    index = _State.index
+    if index is not None and version == _State.version and time.monotonic() - _State.loaded_at < _ttl():
+        return index
+    if _written_in_transaction():
+        return load_city_index()
+    with _State.lock:
+        started = time.perf_counter()
+        index = load_city_index()
+        _State.index, _State.version, _State.loaded_at = index, version, time.monotonic()
+        logger.info(
+            "city_index_loaded",
+            cities=len(index.cities),
+            keys=len(index.by_key),
+            ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+    return index
+
+
+def invalidate() -> None:
+    """Drop this process's index and bump the shared version for the others.
+
+    Inside a transaction this is repeated on commit, since an index loaded
+    meanwhile (here or elsewhere) cannot have seen the uncommitted edit.
+    """
+    _drop()
+    if connection.in_atomic_block and not getattr(_local, "dirty", False):
+        _local.dirty = True
+        transaction.on_commit(_committed)
+
+
+def _committed() -> None:
+    _local.dirty = False
+    _drop()
+
+
+def _drop() -> None:
+    _State.index = None
+    cache.set(_VERSION_KEY, time.time_ns(), None)
+
+
+@contextmanager
+def pinned_index(index: Optional[CityIndex] = None):
+    """Serve one index (loaded now by default) inside the block, even within a transaction.
+
+    For benchmarks over seeded, rolled-back data.
+    """
+    _State.pinned = index or load_city_index()
+    try:
+        yield _State.pinned
+    finally:
+        _State.pinned = None
+
+
+def store_city_changed(store) -> None:
+    """Invalidate unless the loaded index already maps the store's city texts to its city."""
+    index = _State.index
+    if index is not None and store.city_obj_id:
+        texts = [value for value in (store.city, store.city_he, store.city_en) if value]
+        if all(index.knows(value, store.city_obj_id) for value in texts):
+            return
+    invalidate()
+
+
+# Resolution helpers used by the WhatsApp flows
+
+
+def resolve_city(name: Optional[str]) -> Optional[City]:
+    return get_city_index().resolve(name)
+
+
+def city_ids(name: Optional[str]) -> list[int]:
+    return get_city_index().ids(name)
+
+
+def city_candidates(name: Optional[str], limit: int = 5) -> list[City]:
+    return get_city_index().candidates(name, limit)
+
+
+def get_city(city_id) -> Optional[City]:
+    return get_city_index().get(city_id)
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.8 on 2026-10-16 21:00
+
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+_NON_WORD = re.compile(r"[^0-9a-zא-ת]+")
+
+
+def _search_text(*values):
+    words = []
+    for value in values:
+        text = unicodedata.normalize("NFKC", value or "").casefold()
+        text = "".join(ch for ch in text if not ("֑" <= ch <= "ׇ"))
+        for word in _NON_WORD.sub(" ", text).split():
+            if word not in words:
+                words.append(word)
+    return " ".join(words)
+
+
+def populate_search_text(apps, schema_editor):
+    Store = apps.get_model("stores", "Store")
+    fields = ("id", "name", "name_he", "name_en", "display_name", "name_aliases_he", "name_aliases_en")
+    batch = []
+    for store in Store.objects.only(*fields).iterator(chunk_size=2000):
+        store.search_text = _search_text(
+            store.name,
+            store.name_he,
+            store.name_en,
+            store.display_name,
+            *(store.name_aliases_he or []),
+            *(store.name_aliases_en or []),
+        )
+        batch.append(store)
+        if len(batch) >= 2000:
+            Store.objects.bulk_update(batch, ["search_text"])
+            batch = []
+    if batch:
+        Store.objects.bulk_update(batch, ["search_text"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0005_store_name_aliases_en_store_name_aliases_he_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='store',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='store',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name_search_terms'], name='store_search_terms_gin_idx', opclasses=['jsonb_path_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='store',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='store_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
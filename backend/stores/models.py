@@ -1,7 +1,9 @@
 from __future__ import annotations
 import re
+import unicodedata
 
 from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.utils.text import slugify
 
@@ -25,6 +27,21 @@ def normalize_store_text(value: str | None) -> str:
     return re.sub(r"[^0-9a-z\u0590-\u05FF]+", "", text)
 
 
+_NON_WORD = re.compile(r"[^0-9a-z\u05D0-\u05EA]+")
+
+
+def build_store_search_text(*values: str | None) -> str:
+    """Unique normalized words of ``values`` (casefolded, niqqud and punctuation removed)."""
+    words: list[str] = []
+    for value in values:
+        text = unicodedata.normalize("NFKC", value or "").casefold()
+        text = "".join(ch for ch in text if not ("\u0591" <= ch <= "\u05C7"))
+        for word in _NON_WORD.sub(" ", text).split():
+            if word not in words:
+                words.append(word)
+    return " ".join(words)
+
+
 class City(models.Model):
     """Canonical city with bilingual names."""
     name_he = models.CharField(max_length=120, blank=True)
@@ -108,6 +125,8 @@ class Store(models.Model):
     name_aliases_he = models.JSONField(default=list, blank=True)
     name_aliases_en = models.JSONField(default=list, blank=True)
     name_search_terms = models.JSONField(default=list, blank=True)
+    # Names and aliases as normalized words, for trigram matching (see stores.search)
+    search_text = models.TextField(blank=True, default="", editable=False)
 
     address = models.CharField(max_length=255, blank=True)
     city = models.CharField(max_length=120, blank=True)
@@ -137,6 +156,8 @@ class Store(models.Model):
         indexes = [
             models.Index(fields=["city", "name"], name="store_city_name_idx"),
             models.Index(fields=["chain", "city"], name="store_chain_city_idx"),
+            GinIndex(fields=["name_search_terms"], opclasses=["jsonb_path_ops"], name="store_search_terms_gin_idx"),
+            GinIndex(fields=["search_text"], opclasses=["gin_trgm_ops"], name="store_search_trgm_idx"),
         ]
 
     def __str__(self) -> str:  # pragma: no cover
@@ -171,19 +192,19 @@ class Store(models.Model):
         if not self.city and (self.city_en or self.city_he):
             self.city = self.city_en or self.city_he
 
+        self.set_search_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "name_search_terms", "search_text"}
+        super().save(*args, **kwargs)
+
+    def set_search_fields(self) -> None:
+        """Fill name_search_terms/search_text (bulk_create callers must call this)."""
         self.name_aliases_he = _clean_aliases(self.name_aliases_he)
         self.name_aliases_en = _clean_aliases(self.name_aliases_en)
-        self.name_search_terms = _build_search_terms(
-            [
-                self.name,
-                self.name_he,
-                self.name_en,
-                self.display_name,
-            ]
-            + self.name_aliases_he
-            + self.name_aliases_en
-        )
-        super().save(*args, **kwargs)
+        names = [self.name, self.name_he, self.name_en, self.display_name, *self.name_aliases_he, *self.name_aliases_en]
+        self.name_search_terms = _build_search_terms(names)
+        self.search_text = build_store_search_text(*names)
 
 
 _HEBREW_DOUBLE_MAP = {
@@ -0,0 +1,90 @@
+"""Store-name search over ``Store.name_search_terms`` and ``Store.search_text``.
+
+``name_search_terms`` (JSONB array of normalized names and aliases, with the
+Hebrew double-letter variants) carries a ``jsonb_path_ops`` GIN index for
+exact-name containment; ``search_text`` (the same names as words) carries a
+``gin_trgm_ops`` index for substring and typo-tolerant matches. A search is a
+single ranked query: exact names first, then stores whose name or address
+mentions the branch detail, then by trigram word similarity.
+"""
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Case, IntegerField, Q, QuerySet, Value, When
+
+from .models import Store, _expand_normalized_variants, build_store_search_text, normalize_store_text
+
+# Candidates offered to the user when a store name is ambiguous
+STORE_CANDIDATES = 5
+
+
+def _exact_match(term: str) -> Q:
+    match = Q()
+    for variant in sorted(_expand_normalized_variants(term)):
+        match |= Q(name_search_terms__contains=[variant])
+    return match
+
+
+def _text_match(words: str) -> Q:
+    match = Q(search_text__contains=words) | Q(search_text__trigram_word_similar=words)
+    first = words.split()[0]
+    if first != words and len(first) >= 3:
+        match |= Q(search_text__contains=first)
+    return match
+
+
+def ranked_stores(
+    name: Optional[str],
+    *,
+    city_ids: Optional[Sequence[int]] = None,
+    detail: Optional[str] = None,
+    active_only: bool = True,
+) -> QuerySet[Store]:
+    """Stores matching ``name``, best match first.
+
+    ``city_ids`` restricts the search to stores of those cities (an empty
+    list matches nothing); ``detail`` (branch, street) ranks stores that
+    mention it above the others with the same name.
+    """
+    term = normalize_store_text(name)
+    words = build_store_search_text(name)
+    if not term or not words or (city_ids is not None and not city_ids):
+        return Store.objects.none()
+    exact = _exact_match(term)
+    qs = Store.objects.filter(exact | _text_match(words))
+    if active_only:
+        qs = qs.filter(is_active=True)
+    if city_ids is not None:
+        qs = qs.filter(city_obj_id=city_ids[0]) if len(city_ids) == 1 else qs.filter(city_obj_id__in=city_ids)
+    detail = (detail or "").strip()
+    if detail:
+        detail_rank = Case(
+            When(
+                Q(display_name__icontains=detail) | Q(name__icontains=detail) | Q(address__icontains=detail),
+                then=Value(1),
+            ),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    else:
+        detail_rank = Value(0, output_field=IntegerField())
+    qs = qs.annotate(
+        exact_rank=Case(When(exact, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        detail_rank=detail_rank,
+        rank=TrigramWordSimilarity(words, "search_text"),
+    ).order_by("-exact_rank", "-detail_rank", "-rank", "pk")
+    return qs
+
+
+def search_stores(
+    name: Optional[str],
+    *,
+    city_ids: Optional[Sequence[int]] = None,
+    detail: Optional[str] = None,
+    limit: int = STORE_CANDIDATES,
+    active_only: bool = True,
+) -> list[Store]:
+    """The top ``limit`` of ``ranked_stores``, in one query."""
+    return list(ranked_stores(name, city_ids=city_ids, detail=detail, active_only=active_only)[:limit])
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import city_index
+from .models import City, Store
+
+# Store fields that feed the city index (free-text city names as aliases)
+_STORE_CITY_FIELDS = {"city", "city_he", "city_en", "city_obj"}
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def _invalidate_city_index(sender, instance: City, **kwargs) -> None:
+    city_index.invalidate()
+
+
+@receiver(post_save, sender=Store)
+def _store_city_changed(sender, instance: Store, update_fields=None, **kwargs) -> None:
+    if update_fields is None or _STORE_CITY_FIELDS.intersection(update_fields):
+        city_index.store_city_changed(instance)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from stores import city_index
+from stores.city_index import CityIndex, bounded_edit_distance, load_city_index, normalize_city_key
+from stores.models import City, Store
+
+
+def _index(*aliases) -> CityIndex:
+    cities = [
+        City(pk=1, name_he="תל אביב", name_en="Tel Aviv", slug="tel-aviv"),
+        City(pk=2, name_he="חיפה", name_en="Haifa", slug="haifa"),
+        City(pk=3, name_he="ראש העין", name_en="Rosh HaAyin", slug="rosh-haayin"),
+        City(pk=4, name_he="רמת גן", name_en="Ramat Gan", slug="ramat-gan"),
+        City(pk=5, name_he="רמת השרון", name_en="Ramat HaSharon", slug="ramat-hasharon"),
+    ]
+    return CityIndex.build(cities, aliases)
+
+
+class CityIndexTests(SimpleTestCase):
+    def test_normalized_keys(self):
+        self.assertEqual(normalize_city_key(" Tel-Aviv "), "telaviv")
+        self.assertEqual(normalize_city_key("ת\"א"), "תא")
+        self.assertEqual(normalize_city_key("רָמַת גַּן"), "רמתגן")
+
+    def test_bilingual_slug_and_alias_lookups(self):
+        index = _index(("TLV Center", 1))
+        for name in ("Tel Aviv", "tel aviv", "TEL-AVIV", "תל אביב", "ת\"א", "Tel Aviv-Yafo", "TLV Center"):
+            with self.subTest(name=name):
+                self.assertEqual(index.ids(name), [1])
+        self.assertEqual(index.resolve("rosh-haayin").name_he, "ראש העין")
+
+    def test_fuzzy_lookup_within_edit_budget(self):
+        index = _index()
+        self.assertEqual(index.ids("Tel Avv"), [1])
+        self.assertEqual(index.ids("Hifa"), [2])
+        self.assertEqual(index.ids("ראש העיו"), [3])
+        self.assertEqual(index.ids("Jerusalem"), [])
+        # Short names must match exactly
+        self.assertEqual(index.ids("abc"), [])
+
+    def test_candidates_fall_back_to_substring_matches(self):
+        index = _index()
+        self.assertEqual([city.pk for city in index.candidates("Ramat")], [4, 5])
+        self.assertEqual([city.pk for city in index.candidates("Haifa")], [2])
+        self.assertEqual(index.candidates(""), [])
+
+    def test_returned_cities_are_copies(self):
+        index = _index()
+        index.resolve("Haifa").name_en = "Changed"
+        self.assertEqual(index.resolve("Haifa").name_en, "Haifa")
+
+    def test_bounded_edit_distance(self):
+        self.assertEqual(bounded_edit_distance("haifa", "hifa", 2), 1)
+        self.assertEqual(bounded_edit_distance("haifa", "jerusalem", 2), 3)
+
+
+class CityIndexLoadTests(TestCase):
+    def test_load_includes_store_city_texts_in_one_query(self):
+        city = City.objects.create(name_he="מודיעין", name_en="Modiin")
+        Store.objects.create(name="Shop", city="Modiin Center", city_obj=city)
+        with self.assertNumQueries(1):
+            index = load_city_index()
+        self.assertEqual(index.ids("modiin center"), [city.pk])
+        self.assertEqual(index.ids("מודיעין מכבים רעות"), [city.pk])
+
+    def test_resolution_sees_new_cities(self):
+        self.assertIsNone(city_index.resolve_city("Eilat"))
+        city = City.objects.create(name_he="אילת", name_en="Eilat")
+        self.assertEqual(city_index.resolve_city("אילת").pk, city.pk)
+
+    def test_city_and_store_saves_invalidate(self):
+        city = City.objects.create(name_he="חולון", name_en="Holon")
+        store = Store.objects.create(name="Shop", city="Holon", city_obj=city)
+        with mock.patch.object(city_index, "invalidate") as invalidate:
+            city.name_en = "Holon City"
+            city.save()
+            store.save(update_fields=["name"])
+            self.assertEqual(invalidate.call_count, 1)
+            store.city = "Holon South"
+            store.save(update_fields=["city"])
+            self.assertEqual(invalidate.call_count, 2)
+
+    def test_transaction_reuses_the_index_until_it_writes_cities(self):
+        City.objects.create(name_he="נתניה", name_en="Netanya")
+        # As if the row above had been committed by an earlier transaction
+        city_index._local.dirty = False
+        city_index._State.index = None
+        with self.assertNumQueries(1):
+            city_index.resolve_city("Netanya")
+            city_index.resolve_city("נתניה")
+
+        eilat = City.objects.create(name_he="אילת", name_en="Eilat")
+        with self.assertNumQueries(1):
+            self.assertEqual(city_index.resolve_city("Eilat").pk, eilat.pk)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from django.test import SimpleTestCase, TestCase
+
+from stores.models import City, Store, build_store_search_text
+from stores.search import search_stores
+
+
+class StoreSearchTextTests(SimpleTestCase):
+    def test_words_are_normalized_and_unique(self):
+        self.assertEqual(build_store_search_text("AM:PM", "am pm Dizengoff"), "am pm dizengoff")
+        self.assertEqual(build_store_search_text("שׁוּפֶרְסַל דיל"), "שופרסל דיל")
+
+
+class SearchStoresTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name_he="ראש העין", name_en="Rosh HaAyin")
+        self.other_city = City.objects.create(name_he="חיפה", name_en="Haifa")
+
+    def _store(self, name, display_name=None, city=None, **extra):
+        return Store.objects.create(
+            name=name, display_name=display_name or name, city_obj=city or self.city, **extra
+        )
+
+    def test_exact_name_ranks_first_then_similar_names(self):
+        similar = self._store("שופרסל דיל", "שופרסל דיל גבעת טל")
+        exact = self._store("שופרסל", "שופרסל")
+        self._store("רמי לוי")
+        results = search_stores("שופרסל", city_ids=[self.city.pk])
+        self.assertEqual([store.pk for store in results], [exact.pk, similar.pk])
+
+    def test_detail_ranks_matching_branch_first(self):
+        first = self._store("Victory", "Victory Center")
+        branch = self._store("Victory", "Victory Givat Tal", address="Givat Tal 3")
+        results = search_stores("victory", city_ids=[self.city.pk], detail="Givat Tal")
+        self.assertEqual([store.pk for store in results], [branch.pk, first.pk])
+
+    def test_typo_matches_by_trigram_similarity(self):
+        store = self._store("Yohananof")
+        self.assertEqual(search_stores("Yohananov", city_ids=[self.city.pk]), [store])
+
+    def test_scoped_to_cities_and_active_stores(self):
+        self._store("Tiv Taam", city=self.other_city)
+        closed = self._store("Tiv Taam", is_active=False)
+        self.assertEqual(search_stores("tiv taam", city_ids=[self.city.pk]), [])
+        self.assertEqual(search_stores("tiv taam", city_ids=[self.city.pk], active_only=False), [closed])
+        self.assertEqual(search_stores("tiv taam", city_ids=[]), [])
+
+    def test_one_query_and_limit(self):
+        for i in range(8):
+            self._store("Osher Ad", f"Osher Ad {i}")
+        with self.assertNumQueries(1):
+            results = search_stores("osher ad", city_ids=[self.city.pk], limit=3)
+        self.assertEqual(len(results), 3)
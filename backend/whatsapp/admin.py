@@ -1,8 +1,11 @@
 from django.contrib import admin
+from django.db.models import Prefetch
 from django.urls import reverse
 from django.utils.html import format_html
 from pricing.models import PriceReport
-from .models import WAUser, DealReportSession
+from .ingest import replay_events
+from .models import WAUser, DealReportSession, DeadLetterMessage, OutboundMessage, WebhookEvent
+from .outbox import requeue_dead_letters
 
 
 @admin.register(WAUser)
@@ -48,20 +51,65 @@ class DealReportSessionAdmin(admin.ModelAdmin):
     product_link.short_description = "Product"
 
     def price_report_link(self, obj: DealReportSession) -> str:
-        report_id = (obj.data or {}).get("price_report_id")
-        if not report_id:
+        report = self._get_price_report(obj)
+        if not report:
             return "—"
-        url = reverse("admin:pricing_pricereport_change", args=[report_id])
-        return format_html('<a href="{}">#{}</a>', url, report_id)
+        url = reverse("admin:pricing_pricereport_change", args=[report.pk])
+        return format_html('<a href="{}">#{}</a>', url, report.pk)
 
     price_report_link.short_description = "Price Report"
 
+    def get_queryset(self, request):
+        reports = PriceReport.objects.select_related("product", "store__chain", "store__city_obj").order_by("-pk")
+        return super().get_queryset(request).prefetch_related(Prefetch("price_reports", queryset=reports))
+
     def _get_price_report(self, obj: DealReportSession):
-        if hasattr(obj, "_cached_price_report"):
-            return obj._cached_price_report
-        report_id = (obj.data or {}).get("price_report_id")
-        if not report_id:
-            obj._cached_price_report = None
-        else:
-            obj._cached_price_report = PriceReport.objects.filter(pk=report_id).select_related("store", "product").first()
-        return obj._cached_price_report
+        # Newest report created from the session; prefetched for the whole page
+        return next(iter(obj.price_reports.all()), None)
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "sender", "status", "attempts", "received_at", "next_attempt_at", "processed_at", "messages_processed")
+    list_filter = ("status",)
+    search_fields = ("sender",)
+    readonly_fields = ("payload", "received_at", "locked_at", "locked_by", "processed_at", "last_error")
+    actions = ["replay_selected"]
+
+    @admin.action(description="Replay selected webhook events")
+    def replay_selected(self, request, queryset):
+        count = replay_events(
+            statuses=(WebhookEvent.Status.DONE, WebhookEvent.Status.FAILED),
+            ids=queryset.values_list("pk", flat=True),
+        )
+        self.message_user(request, f"Re-queued {count} event(s).")
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "wa_number", "status", "attempts", "last_status", "created_at", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("wa_number",)
+    readonly_fields = (
+        "payload",
+        "fallback_payload",
+        "created_at",
+        "locked_at",
+        "locked_by",
+        "sent_at",
+        "last_status",
+        "last_error",
+    )
+
+
+@admin.register(DeadLetterMessage)
+class DeadLetterMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "wa_number", "attempts", "last_status", "created_at", "failed_at")
+    search_fields = ("wa_number",)
+    readonly_fields = ("outbound_id", "payload", "fallback_payload", "last_status", "last_error", "created_at", "failed_at")
+    actions = ["requeue_selected"]
+
+    @admin.action(description="Re-queue selected messages")
+    def requeue_selected(self, request, queryset):
+        count = requeue_dead_letters(ids=queryset.values_list("pk", flat=True))
+        self.message_user(request, f"Re-queued {count} message(s).")
@@ -5,3 +5,6 @@ class WhatsappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'whatsapp'
     verbose_name = 'WhatsApp Integration'
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401 - connects cache write-through receivers
@@ -0,0 +1,322 @@
+"""Helpers and sample data shared by the ``bench_*`` management commands."""
+from __future__ import annotations
+
+import re
+import time
+import unicodedata
+from typing import Callable, Iterable, Sequence
+
+from . import metrics
+from . import text_normalization as tn
+
+
+def time_calls(func: Callable, inputs: Sequence, repeat: int = 1) -> list[float]:
+    """Call ``func`` on every input ``repeat`` times; returns per-call latency in microseconds."""
+    samples: list[float] = []
+    for _ in range(repeat):
+        for value in inputs:
+            started = time.perf_counter()
+            func(value)
+            samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+
+def latency_summary(samples: Iterable[float]) -> dict[str, float]:
+    data = list(samples)
+    summary = metrics.summarize(data)
+    summary["mean"] = round(sum(data) / len(data), 3) if data else 0.0
+    return summary
+
+
+def legacy_normalize_for_match(s: str) -> str:
+    """``normalize_for_match`` as it was before the single-table rewrite (reference)."""
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKC", s)
+    s = "".join(ch for ch in s if ch not in tn._ZW_CHARS and ch not in tn._BIDI_CHARS)
+    s = "".join(ch for ch in s if not (tn._NIQQUD_START <= ord(ch) <= tn._NIQQUD_END))
+    s = s.translate({ord(ch): "'" for ch in tn._QUOTES})
+    s = s.translate({ord(ch): "-" for ch in tn._DASHES})
+    s = s.casefold()
+    s = tn._RE_REPEAT_SAFE.sub(r"\1\1", s)
+    s = re.sub(r"[^0-9A-Za-z\u0590-\u05FF\s-]", "", s)
+    return tn._RE_MULTISPACE.sub(" ", s).strip()
+
+
+# Typical inbound messages labelled with the locale a human would pick.
+LANGUAGE_SAMPLES: tuple[tuple[str, str], ...] = (
+    ("שלום", "he"),
+    ("כן", "he"),
+    ("לא", "he"),
+    ("הוסף דיל", "he"),
+    ("מצא דיל", "he"),
+    ("חלב תנובה 3% 1 ליטר", "he"),
+    ("שופרסל דיל גבעת טל", "he"),
+    ("ראש העין", "he"),
+    ("תל אביב", "he"),
+    ("דלג", "he"),
+    ("בטל", "he"),
+    ("מבצע 2 ב-10 ש\"ח", "he"),
+    ("קוטג' 5% 250 גרם", "he"),
+    ("במבה אסם", "he"),
+    ("רק לחברי מועדון", "he"),
+    ("שָׁלוֹם עֲלֵיכֶם", "he"),
+    ("‏שלום‏", "he"),
+    ("איפה הכי זול לקנות ביצים?", "he"),
+    ("תודה רבה!", "he"),
+    ("מה המחיר של קולה זירו בוויקטורי", "he"),
+    ("hello", "en"),
+    ("hi", "en"),
+    ("yes", "en"),
+    ("no", "en"),
+    ("add a deal", "en"),
+    ("find a deal", "en"),
+    ("Milk 3% 1L", "en"),
+    ("Tel Aviv", "en"),
+    ("Shufersal Deal", "en"),
+    ("skip", "en"),
+    ("cancel", "en"),
+    ("Where can I buy cheap eggs?", "en"),
+    ("Thanks a lot!", "en"),
+    ("Coca Cola Zero 1.5 liter", "en"),
+    ("only for club members", "en"),
+    ("Hello there this is a language detection test written in English.", "en"),
+    ("12.90", "en"),
+    ("3", "en"),
+    ("👍", "en"),
+    ("🛒🛒", "en"),
+    ("Shufersal דיל", "en"),
+    ("קולה Zero", "he"),
+    ("Osem במבה", "he"),
+    ("Привет", "en"),
+    ("مرحبا", "en"),
+)
+
+
+# Chat-shaped messages for the normalization benchmark: short replies and
+# buttons, product/store names with quotes and dashes, bidi marks, niqqud,
+# emoji and a few longer free-form messages.
+NORMALIZE_SAMPLES: tuple[str, ...] = tuple(text for text, _label in LANGUAGE_SAMPLES) + (
+    "כןןן",
+    "yesss!!",
+    "לא יודע",
+    "don’t know",
+    "n/a",
+    "unit_type:grams",
+    "city_pick:42",
+    "קוקה־קולה 1.5 ל׳",
+    "קוטג׳ תנובה 5%",
+    "במבה ״אסם״ 80 גרם",
+    "Coca–Cola Zero — 6×1.5L",
+    "‏שופרסל דיל‏ ‪Ramat Gan‬",
+    "​hello​",
+    "SHUFERSAL   DEAL  ",
+    "חָלָב תְּנוּבָה",
+    "Milk 🥛 3% 1L 👍👍",
+    "ראיתי היום בשופרסל דיל ברמת גן מבצע על חלב תנובה 3% שני קרטונים ב-12 ש\"ח, "
+    "רק לחברי מועדון, עד 4 יחידות לקנייה",
+    "Saw a great deal today at Rami Levy in Modiin: Tnuva cottage 5% 250g, "
+    "three for 15 NIS, club members only, limit 6 per cart!!!",
+    "מה המחיר הכי זול לקולה זירו בתל אביב? מישהו ראה מבצע השבוע?",
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run_rolled_back(func: Callable[[], dict]) -> dict:
+    """Run ``func`` in a transaction that is always rolled back (for seeded DB benchmarks)."""
+    from django.db import transaction
+
+    outcome: dict = {}
+    try:
+        with transaction.atomic():
+            outcome.update(func())
+            raise _Rollback
+    except _Rollback:
+        pass
+    return outcome
+
+
+# (name_he, name_en, longitude, latitude) of city centres for a nationwide store set
+NATIONWIDE_CITIES: tuple[tuple[str, str, float, float], ...] = (
+    ("תל אביב", "Tel Aviv", 34.7818, 32.0853),
+    ("ירושלים", "Jerusalem", 35.2137, 31.7683),
+    ("חיפה", "Haifa", 34.9896, 32.7940),
+    ("ראשון לציון", "Rishon LeZion", 34.8044, 31.9730),
+    ("פתח תקווה", "Petah Tikva", 34.8878, 32.0840),
+    ("אשדוד", "Ashdod", 34.6553, 31.8044),
+    ("נתניה", "Netanya", 34.8532, 32.3215),
+    ("באר שבע", "Beersheba", 34.7913, 31.2520),
+    ("חולון", "Holon", 34.7742, 32.0158),
+    ("רמת גן", "Ramat Gan", 34.8248, 32.0684),
+    ("מודיעין", "Modiin", 35.0104, 31.8980),
+    ("ראש העין", "Rosh HaAyin", 34.9566, 32.0956),
+    ("נצרת", "Nazareth", 35.3035, 32.6996),
+    ("טבריה", "Tiberias", 35.5312, 32.7922),
+    ("אילת", "Eilat", 34.9482, 29.5577),
+)
+
+
+def seed_deal_dataset(
+    *,
+    products: int,
+    stores: int,
+    reports: int,
+    hot_share: float = 0.3,
+    cities: Sequence[tuple] = (("תל אביב", "Tel Aviv"), ("חיפה", "Haifa"), ("ירושלים", "Jerusalem")),
+    seed: int = 1,
+    batch_size: int = 5000,
+) -> dict:
+    """Bulk-insert a synthetic catalog, stores and price reports.
+
+    ``hot_share`` of the reports go to one popular product ("Tnuva Milk 3%")
+    so that per-product queries see a realistic skew. When ``cities`` entries
+    carry a (longitude, latitude) centre, stores get a location scattered
+    within ~10 km of it. Returns the created cities, the hot product and the
+    store ids.
+    """
+    import random
+    from datetime import timedelta
+    from decimal import Decimal
+
+    from django.contrib.gis.geos import Point
+    from django.db import connection
+    from django.utils import timezone
+
+    from catalog.models import Product, build_product_search_text
+    from pricing.models import PriceReport
+    from stores.models import City, Store
+
+    rng = random.Random(seed)
+    city_objs = [City.objects.create(name_he=entry[0], name_en=entry[1]) for entry in cities]
+    brands = ["Tnuva", "Strauss", "Tara", "Osem", "Elite", "Coca Cola", "Yotvata", "Sugat"]
+    nouns = [("חלב", "Milk"), ("גבינה", "Cheese"), ("יוגורט", "Yogurt"), ("קפה", "Coffee"), ("אורז", "Rice"), ("שוקולד", "Chocolate")]
+    hot = Product.objects.create(name_he="חלב תנובה 3%", name_en="Tnuva Milk 3%", brand="Tnuva")
+    catalog = [hot]
+    for i in range(products - 1):
+        brand = rng.choice(brands)
+        he, en = rng.choice(nouns)
+        catalog.append(Product(name_he=f"{he} {brand} {i}", name_en=f"{brand} {en} {i}", brand=brand))
+    # bulk_create skips save(); fill the denormalized search column explicitly
+    for product in catalog[1:]:
+        product.search_text = build_product_search_text(product.name_he, product.name_en, product.brand, product.variant)
+    Product.objects.bulk_create(catalog[1:], batch_size=batch_size)
+    product_ids = list(Product.objects.values_list("id", flat=True))
+
+    store_objs = []
+    for i in range(stores):
+        city = city_objs[i % len(city_objs)]
+        centre = cities[i % len(cities)][2:]
+        location = None
+        if centre:
+            lon, lat = centre
+            location = Point(lon + rng.uniform(-0.1, 0.1), lat + rng.uniform(-0.09, 0.09), srid=4326)
+        store_objs.append(
+            Store(
+                name=f"Bench Store {i}",
+                name_he=f"Bench Store {i}",
+                name_en=f"Bench Store {i}",
+                display_name=f"Bench Store {i}",
+                city=city.name_en,
+                city_en=city.name_en,
+                city_he=city.name_he,
+                city_obj=city,
+                location=location,
+            )
+        )
+    for store in store_objs:
+        store.set_search_fields()
+    Store.objects.bulk_create(store_objs, batch_size=batch_size)
+    store_ids = list(Store.objects.filter(name__startswith="Bench Store ").values_list("id", flat=True))
+
+    now = timezone.now()
+    batch: list = []
+    for _ in range(reports):
+        product_id = hot.pk if rng.random() < hot_share else rng.choice(product_ids)
+        batch.append(
+            PriceReport(
+                product_id=product_id,
+                store_id=rng.choice(store_ids),
+                price=Decimal(rng.randint(300, 3000)) / 100,
+                observed_at=now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+                needs_moderation=rng.random() < 0.1,
+            )
+        )
+        if len(batch) >= batch_size:
+            PriceReport.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        PriceReport.objects.bulk_create(batch)
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE catalog_product, stores_store, pricing_pricereport")
+    return {"cities": city_objs, "hot_product": hot, "store_ids": store_ids}
+
+
+# (name_he, name_en) of chains for a realistic store-name distribution
+STORE_CHAINS: tuple[tuple[str, str], ...] = (
+    ("שופרסל דיל", "Shufersal Deal"),
+    ("שופרסל שלי", "Shufersal Sheli"),
+    ("רמי לוי", "Rami Levy"),
+    ("ויקטורי", "Victory"),
+    ("יוחננוף", "Yohananof"),
+    ("אושר עד", "Osher Ad"),
+    ("טיב טעם", "Tiv Taam"),
+    ("יינות ביתן", "Yenot Bitan"),
+    ("מגה בעיר", "Mega Bair"),
+    ("חצי חינם", "Hatzi Hinam"),
+    ("סופר פארם", "Super-Pharm"),
+    ("AM:PM", "AM:PM"),
+)
+
+STREETS = ("הרצל", "ויצמן", "ז'בוטינסקי", "בן גוריון", "רוטשילד", "סוקולוב", "ביאליק", "העצמאות")
+
+
+def seed_store_dataset(
+    *,
+    stores: int,
+    cities: Sequence[tuple] = NATIONWIDE_CITIES,
+    seed: int = 1,
+    batch_size: int = 5000,
+) -> dict:
+    """Bulk-insert ``stores`` chain branches ("<chain> <street>") spread over ``cities``.
+
+    Returns the created cities.
+    """
+    import random
+
+    from django.db import connection
+
+    from stores.models import City, Store
+
+    rng = random.Random(seed)
+    city_objs = [City.objects.create(name_he=entry[0], name_en=entry[1]) for entry in cities]
+    batch: list = []
+    for i in range(stores):
+        city = city_objs[i % len(city_objs)]
+        chain_he, chain_en = rng.choice(STORE_CHAINS)
+        street = rng.choice(STREETS)
+        store = Store(
+            name=chain_he,
+            name_he=chain_he,
+            name_en=chain_en,
+            display_name=f"{chain_he} {street} {i}",
+            address=f"{street} {rng.randint(1, 120)}",
+            city=city.name_he,
+            city_he=city.name_he,
+            city_en=city.name_en,
+            city_obj=city,
+        )
+        store.set_search_fields()
+        batch.append(store)
+        if len(batch) >= batch_size:
+            Store.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Store.objects.bulk_create(batch)
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE stores_store")
+    return {"cities": city_objs}
@@ -4,17 +4,20 @@ from typing import Optional, Sequence
 import structlog
 
 from dataclasses import dataclass
-from django.db.models import Q
 from django.utils import translation, timezone
-from django.utils.text import slugify
 from django.utils.translation import gettext as _
 
+from catalog.matching import match_product
 from catalog.models import Product
-from stores.models import Store, City, normalize_store_text
+from stores import city_index
+from stores.models import Store, City
+from stores.search import ranked_stores, search_stores
 from pricing.models import PriceReport
 
+from . import metrics, session_store, user_cache
 from .models import DealReportSession, WAUser
 from .unit_translations import (
+    parse_quantity_unit,
     resolve_unit_translation,
     select_unit_for_locale,
     get_unit_by_slug,
@@ -41,7 +44,6 @@ QUESTION_SEQUENCE = [
 logger = structlog.get_logger(__name__)
 
 MAX_STORE_CHOICES = 5
-HEBREW_DOUBLE_FORMS = (("וו", "ו"), ("יי", "י"))
 
 UNIT_TYPE_CHOICES = {
     "grams": {"slug": "gram", "en": "Gram", "he": "גרם"},
@@ -49,6 +51,13 @@ UNIT_TYPE_CHOICES = {
     "packages": {"slug": "package", "en": "Package", "he": "חבילה"},
 }
 
+# Accepted replies for each unit type, normalized once
+_UNIT_TYPE_REPLIES = {
+    candidate: key
+    for key, meta in UNIT_TYPE_CHOICES.items()
+    for candidate in (normalize_for_match(meta["en"]), meta["en"].lower(), meta["he"], key)
+}
+
 UNIT_CATEGORY_BUTTONS = (
     ("units", "Units"),
     ("weight", "Weight"),
@@ -78,30 +87,23 @@ def _city_query_values(data: dict) -> list[str]:
     return values
 
 
+def _city_by_id(city_id) -> Optional[City]:
+    # Cities created since the index was loaded are read from the DB
+    return city_index.get_city(city_id) or City.objects.filter(pk=city_id).first()
+
+
 def _city_from_session(data: dict) -> Optional[City]:
     city_id = data.get("city_id")
     if city_id:
-        return City.objects.filter(pk=city_id).first()
+        return _city_by_id(city_id)
     return None
 
 
-def _build_city_filter(values: Sequence[str]) -> Q:
-    condition = Q()
-    for city in values:
-        condition |= (
-            Q(city__iexact=city)
-            | Q(city_he__iexact=city)
-            | Q(city_en__iexact=city)
-            | Q(city_obj__name_he__iexact=city)
-            | Q(city_obj__name_en__iexact=city)
-        )
-    return condition
-
-
 def start_add_deal_flow(user: WAUser, locale: str) -> FlowMessage:
     DealReportSession.objects.filter(user=user, is_active=True).update(
         is_active=False, step=DealReportSession.Steps.CANCELED
     )
+    user_cache.forget_sessions(user.pk)
     # Start the flow by asking for the city first
     session = DealReportSession.objects.create(
         user=user, step=DealReportSession.Steps.CITY
@@ -114,55 +116,74 @@ def handle_deal_flow_response(
     locale: str,
     message_text: Optional[str],
     message_text_norm: Optional[str] = None,
+    message_id: str = "",
+    session: Optional[DealReportSession] = None,
 ) -> None | str | FlowMessage:
-    session = (
-        DealReportSession.objects.filter(user=user, is_active=True)
-        .order_by("-updated_at")
-        .first()
-    )
+    """Advance the user's active deal report flow; ``session`` may be preloaded."""
+    if session is None:
+        session = user_cache.get_active_session(user, user_cache.DEAL)
     if not session:
         return None
 
     text = (message_text or "").strip()
     # Use pre-normalized text from webhook if provided; otherwise normalize here
     text_norm = message_text_norm if message_text_norm is not None else normalize_for_match(text)
+    store = session_store.get_store()
+    token = store.load(session)
+    before = (session.step, session.data, session.is_active)
     with translation.override(locale):
-        if not text:
-            return _("Please send a reply so I can continue.")
-
-        if is_keyword_norm(text_norm, "cancel", locale):
-            session.is_active = False
-            session.step = DealReportSession.Steps.CANCELED
-            session.save(update_fields=["is_active", "step", "updated_at"])
-            return _(
-                "Okay, I canceled that deal. Tap “Add a deal” anytime to start again."
-            )
-
-        handler = _STEP_HANDLERS.get(session.step)
-        if not handler:
-            session.is_active = False
-            session.step = DealReportSession.Steps.COMPLETE
-            session.save(update_fields=["is_active", "step", "updated_at"])
-            return _("Thanks! You can start a new deal anytime.")
-
-        next_prompt = handler(session, text, text_norm)
-        if isinstance(next_prompt, str):
-            return next_prompt
-        if isinstance(next_prompt, FlowMessage):
-            return next_prompt
-
-        # If handler returned None, we already advanced and should ask next question
-        if session.step in QUESTION_SEQUENCE:
-            return _question_prompt(session, locale)
+        reply = _respond(session, text, text_norm, locale)
+        # One write per message, and only if this message changed the flow
+        if (session.step, session.data, session.is_active) != before:
+            try:
+                store.save(session, token)
+            except session_store.StaleSession:
+                metrics.incr("deal_session.conflict")
+                logger.info("deal_session_conflict", session_id=session.pk, step=before[0])
+                return _("I already got an answer to that question. Please reply to the latest one.")
+        if reply is not None:
+            return reply
 
         summary = _format_summary(session.data, locale)
         try:
-            _persist_price_report(session, user)
+            _persist_price_report(session, user, message_id=message_id)
         except Exception:
             logger.exception("persist_price_report_failed", session_id=session.pk)
         return FlowMessage(summary)
 
 
+def _respond(
+    session: DealReportSession, text: str, text_norm: str, locale: str
+) -> None | str | FlowMessage:
+    """Apply one reply to ``session`` in memory; ``None`` means the flow is complete."""
+    if not text:
+        return _("Please send a reply so I can continue.")
+
+    if is_keyword_norm(text_norm, "cancel", locale):
+        session.is_active = False
+        session.step = DealReportSession.Steps.CANCELED
+        return _(
+            "Okay, I canceled that deal. Tap “Add a deal” anytime to start again."
+        )
+
+    handler = _STEP_HANDLERS.get(session.step)
+    if not handler:
+        session.is_active = False
+        session.step = DealReportSession.Steps.COMPLETE
+        return _("Thanks! You can start a new deal anytime.")
+
+    next_prompt = handler(session, text, text_norm)
+    if isinstance(next_prompt, str):
+        return next_prompt
+    if isinstance(next_prompt, FlowMessage):
+        return next_prompt
+
+    # If handler returned None, we already advanced and should ask next question
+    if session.step in QUESTION_SEQUENCE:
+        return _question_prompt(session, locale)
+    return None
+
+
 def _unit_type_buttons(locale: str) -> list[dict]:
     buttons = []
     for key, meta in UNIT_TYPE_CHOICES.items():
@@ -191,9 +212,7 @@ def _get_user_city_object(user: WAUser) -> Optional[City]:
     if not city:
         city = _create_city_from_name(city_name)
     if city:
-        WAUser.objects.filter(pk=user.pk).update(city_obj=city, city=city.display_name)
-        user.city_obj = city
-        user.city = city.display_name
+        user_cache.update_user(user, city_obj=city, city=city.display_name)
     return city
 
 
@@ -205,12 +224,7 @@ def _assign_user_city(session: DealReportSession, city: Optional[City]) -> None:
         and (session.user.city or "").strip() == city.display_name
     ):
         return
-    WAUser.objects.filter(pk=session.user.pk).update(
-        city_obj=city,
-        city=city.display_name,
-    )
-    session.user.city_obj = city
-    session.user.city = city.display_name
+    user_cache.update_user(session.user, city_obj=city, city=city.display_name)
 
 
 def _set_city_data(session: DealReportSession, city: City) -> None:
@@ -255,19 +269,7 @@ def _create_city_from_name(name: str) -> City:
 
 
 def _find_city_candidates(name: str) -> list[City]:
-    if not name:
-        return []
-    slug = slugify(name, allow_unicode=True)
-    exact = City.objects.filter(
-        Q(name_he__iexact=name) | Q(name_en__iexact=name) | Q(slug__iexact=slug)
-    )
-    if exact.exists():
-        return list(exact)
-    return list(
-        City.objects.filter(
-            Q(name_he__icontains=name) | Q(name_en__icontains=name)
-        ).order_by("name_en", "name_he")[:5]
-    )
+    return city_index.city_candidates(name)
 
 
 def _resolve_city_selection(session: DealReportSession, locale: str) -> Optional[FlowMessage]:
@@ -424,7 +426,6 @@ def _advance(session: DealReportSession, target_step: str | None = None) -> None
     except (ValueError, IndexError):
         session.step = DealReportSession.Steps.COMPLETE
         session.is_active = False
-    session.save(update_fields=["step", "is_active", "data", "updated_at"])
 
 
 def _update_data(session: DealReportSession, **updates) -> None:
@@ -482,7 +483,7 @@ def _handle_city(
 
     if cleaned.startswith("city_pick:"):
         city_id = cleaned.split(":", 1)[1]
-        city_obj = City.objects.filter(pk=city_id).first()
+        city_obj = _city_by_id(city_id)
         if not city_obj:
             return _("Please tell me which city this store is in.")
         _set_city_data(session, city_obj)
@@ -633,18 +634,9 @@ def _handle_unit_type(session: DealReportSession, text: str, _text_norm: str) ->
     if cleaned.startswith("unit_type:"):
         selection = cleaned.split(":", 1)[1]
     else:
-        norm = normalize_for_match(cleaned)
-        lower = cleaned.lower()
-        for key, meta in UNIT_TYPE_CHOICES.items():
-            candidates = {
-                normalize_for_match(meta["en"]),
-                meta["en"].lower(),
-                meta["he"],
-                key,
-            }
-            if norm in candidates or lower in candidates:
-                selection = key
-                break
+        selection = _UNIT_TYPE_REPLIES.get(normalize_for_match(cleaned)) or _UNIT_TYPE_REPLIES.get(
+            cleaned.lower()
+        )
     if selection not in UNIT_TYPE_CHOICES:
         return _("Please choose grams, litres, or packages.")
     meta = UNIT_TYPE_CHOICES[selection]
@@ -674,7 +666,11 @@ def _handle_unit_quantity(session: DealReportSession, text: str, _text_norm: str
         try:
             quantity = Decimal(cleaned)
         except (InvalidOperation, ValueError):
-            return _("Please reply with a numeric quantity (e.g., 1, 1.5, 2).")
+            # Accept the quantity with the chosen unit attached, e.g. "1.5 ליטר" or "500g"
+            parsed = parse_quantity_unit(text)
+            if not parsed or not parsed.unit or parsed.unit["slug"] != slug:
+                return _("Please reply with a numeric quantity (e.g., 1, 1.5, 2).")
+            quantity = parsed.quantity
         if quantity <= 0:
             return _("Quantity must be greater than zero.")
         _update_data(session, unit_quantity=str(quantity.quantize(Decimal("0.01"))))
@@ -815,7 +811,7 @@ _STEP_HANDLERS = {
 
 
 def _persist_price_report(
-    session: DealReportSession, user: WAUser
+    session: DealReportSession, user: WAUser, message_id: str = ""
 ) -> Optional[PriceReport]:
     data = session.data or {}
     if data.get("price_report_id"):
@@ -868,6 +864,7 @@ def _persist_price_report(
 
     price_report = PriceReport.objects.create(
         user=user,
+        deal_session=session,
         product=product,
         store=store,
         price=price_value,
@@ -883,11 +880,12 @@ def _persist_price_report(
         product_text_raw=data.get("product_name", ""),
         locale=getattr(user, "locale", "en"),
         source="whatsapp",
+        wa_message_id=(message_id or "")[:128],
         needs_moderation=True,
     )
     data["price_report_id"] = price_report.id
     session.data = data
-    session.save(update_fields=["data"])
+    session_store.get_store().checkpoint(session)
 
     if product:
         updated = False
@@ -954,6 +952,15 @@ def _get_or_create_store(data: dict) -> Store:
     )
 
 
+def _store_city_ids(city_id, city_values: Sequence[str]) -> Optional[list[int]]:
+    """City ids to search stores in: the chosen city, else what the city texts resolve to."""
+    if city_id:
+        return [int(city_id)]
+    if city_values:
+        return sorted({pk for value in city_values for pk in city_index.city_ids(value)})
+    return None
+
+
 def _match_store(
     name: str,
     city_he: Optional[str] = None,
@@ -961,120 +968,38 @@ def _match_store(
     detail: Optional[str] = None,
     city_id: Optional[str] = None,
 ) -> Store | None:
-    qs = Store.objects.all()
+    """The active store a report is saved against, or ``None`` to create one.
+
+    Fuzzy ranking only feeds the suggestions: saving needs an exact
+    (normalized) name or alias and, when a branch detail was given, a store
+    that mentions it, so a report never lands on another branch.
+    """
     city_values = [
         value for value in (_normalize_text(city_he), _normalize_text(city_en)) if value
     ]
-    city_filter = _build_city_filter(city_values) if city_values else None
-    if city_id:
-        qs = qs.filter(city_obj_id=city_id)
-    elif city_filter:
-        qs = qs.filter(city_filter)
-    normalized_name = normalize_store_text(name)
-    base_filter = Q(name__iexact=name) | Q(display_name__iexact=name)
-    if normalized_name:
-        base_filter |= Q(name_search_terms__contains=[normalized_name])
-    matches = qs.filter(base_filter)
-    if detail:
-        detail_filter = (
-            Q(display_name__icontains=detail)
-            | Q(name__icontains=detail)
-            | Q(address__icontains=detail)
-        )
-        detailed = matches.filter(detail_filter)
-        if detailed.exists():
-            return detailed.first()
-    store = matches.first()
-    if store:
-        return store
-    chunks = _chunk_variants(name)
-    if chunks:
-        partial_filter = Q()
-        for chunk in chunks:
-            partial_filter |= Q(name__icontains=chunk) | Q(
-                display_name__icontains=chunk
-            )
-        qs_partial = Store.objects.filter(partial_filter)
-        if city_filter:
-            qs_partial = qs_partial.filter(city_filter)
-        return qs_partial.first()
-    return None
+    best = ranked_stores(
+        name,
+        city_ids=_store_city_ids(city_id, city_values),
+        detail=detail,
+    ).first()
+    if best is None or not best.exact_rank:
+        return None
+    if detail and not best.detail_rank:
+        return None
+    return best
 
 
 def _find_store_candidates(name: str, data: dict) -> list[Store]:
-    base_qs = Store.objects.filter(is_active=True)
-    city_values = _city_query_values(data)
-    city_id = data.get("city_id")
-    if city_id:
-        base_qs = base_qs.filter(city_obj_id=city_id)
-    elif city_values:
-        base_qs = base_qs.filter(_build_city_filter(city_values))
-
-    normalized_name = normalize_store_text(name)
-    base_filter = Q(name__iexact=name) | Q(display_name__iexact=name)
-    if normalized_name:
-        base_filter |= Q(name_search_terms__contains=[normalized_name])
-    exact_qs = base_qs.filter(base_filter)
-
-    detail = _normalize_text(data.get("store_detail"))
-    if detail and exact_qs.exists():
-        detail_filter = (
-            Q(display_name__icontains=detail)
-            | Q(name__icontains=detail)
-            | Q(address__icontains=detail)
-        )
-        narrowed = exact_qs.filter(detail_filter)
-        if narrowed.exists():
-            exact_qs = narrowed
-
-    candidates: list[Store] = []
-    added_ids: set[int] = set()
-    for store in exact_qs:
-        candidates.append(store)
-        added_ids.add(store.id)
-        if len(candidates) >= MAX_STORE_CHOICES:
-            return candidates
-
-    chunks = _chunk_variants(name)
-    if chunks:
-        partial_filter = Q()
-        for chunk in chunks:
-            partial_filter |= Q(name__icontains=chunk) | Q(
-                display_name__icontains=chunk
-            )
-        partial_qs = base_qs.filter(partial_filter)
-        for store in partial_qs:
-            if store.id in added_ids:
-                continue
-            candidates.append(store)
-            added_ids.add(store.id)
-            if len(candidates) >= MAX_STORE_CHOICES:
-                break
-
-    return candidates
-
-
-def _chunk_variants(value: str) -> set[str]:
-    if not value:
-        return set()
-    chunk = value[:3] if len(value) >= 3 else value
-    variants = {chunk} if chunk else set()
-    for source, target in HEBREW_DOUBLE_FORMS:
-        next_variants = set(variants)
-        for option in variants:
-            if source in option:
-                next_variants.add(option.replace(source, target))
-        variants = next_variants
-    return {variant for variant in variants if variant}
+    return search_stores(
+        name,
+        city_ids=_store_city_ids(data.get("city_id"), _city_query_values(data)),
+        detail=_normalize_text(data.get("store_detail")),
+        limit=MAX_STORE_CHOICES,
+    )
 
 
 def _match_city(name: Optional[str]) -> Optional[City]:
-    value = _normalize_text(name)
-    if not value:
-        return None
-    return City.objects.filter(
-        Q(name_he__iexact=value) | Q(name_en__iexact=value)
-    ).first()
+    return city_index.resolve_city(_normalize_text(name))
 
 
 def _get_or_create_product(data: dict) -> Product:
@@ -1095,36 +1020,7 @@ def _get_or_create_product(data: dict) -> Product:
 
 
 def _match_product(name: str, brand: Optional[str] = None) -> Product | None:
-    if brand:
-        product = Product.objects.filter(
-            name_he__iexact=name, brand__iexact=brand
-        ).first()
-        if product:
-            return product
-        product = Product.objects.filter(
-            name_en__iexact=name, brand__iexact=brand
-        ).first()
-        if product:
-            return product
-
-    product = Product.objects.filter(name_he__iexact=name).first()
-    if product:
-        return product
-    product = Product.objects.filter(name_en__iexact=name).first()
-    if product:
-        return product
-
-    prefix = name[:3]
-    if len(prefix) >= 3:
-        qs = Product.objects.filter(name_he__icontains=prefix)
-        if brand:
-            branded = qs.filter(brand__iexact=brand).first()
-            if branded:
-                return branded
-        product = qs.first()
-        if product:
-            return product
-    return None
+    return match_product(name, brand)
 
 
 def _build_deal_notes(limit_qty) -> str:
@@ -0,0 +1,126 @@
+"""De-duplication of redelivered webhook messages by WhatsApp message id.
+
+Meta redelivers a webhook when we answer slowly, so the same message ``id``
+can arrive several times, possibly in different worker processes. A bounded
+per-process LRU answers the common case without a query; the
+``ProcessedMessage`` table (unique on ``message_id``) is the shared source of
+truth. A row is claimed before the message is handled and completed once
+its reply was sent or queued; a failure releases the id again. A retried
+webhook event skips completed ids but handles claimed-only ones, left
+behind by a worker that died mid-message. Rows older than
+``WHATSAPP_DEDUP_TTL_HOURS`` are pruned with
+``manage.py prune_processed_messages``.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import structlog
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import ProcessedMessage
+
+
+logger = structlog.get_logger(__name__)
+
+
+class _LRU:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return True
+            return False
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._data[key] = None
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_seen = _LRU(int(getattr(settings, "WHATSAPP_DEDUP_LRU_SIZE", 10000)))
+
+
+def _ttl() -> timedelta:
+    return timedelta(hours=int(getattr(settings, "WHATSAPP_DEDUP_TTL_HOURS", 72)))
+
+
+def claim_message(message_id: str) -> bool:
+    """Record ``message_id`` as processed. Returns False if it was seen before."""
+    if not message_id:
+        return True
+    if message_id in _seen:
+        metrics.incr("webhook.duplicates_dropped")
+        metrics.incr("webhook.duplicates_dropped.lru")
+        logger.info("webhook_duplicate_dropped", message_id=message_id, source="lru")
+        return False
+    try:
+        with transaction.atomic():
+            ProcessedMessage.objects.create(message_id=message_id[:128])
+    except IntegrityError:
+        _seen.add(message_id)
+        metrics.incr("webhook.duplicates_dropped")
+        metrics.incr("webhook.duplicates_dropped.db")
+        logger.info("webhook_duplicate_dropped", message_id=message_id, source="db")
+        return False
+    _seen.add(message_id)
+    return True
+
+
+def reclaim_message(message_id: str) -> bool:
+    """Claim ``message_id`` for a retried event. Returns False only if it was completed."""
+    if not message_id:
+        return True
+    row, _created = ProcessedMessage.objects.get_or_create(message_id=message_id[:128])
+    _seen.add(message_id)
+    if row.completed_at is not None:
+        metrics.incr("webhook.duplicates_dropped")
+        metrics.incr("webhook.duplicates_dropped.db")
+        logger.info("webhook_duplicate_dropped", message_id=message_id, source="retry")
+        return False
+    return True
+
+
+def complete_message(message_id: str) -> None:
+    """Record that ``message_id`` got its reply."""
+    if not message_id:
+        return
+    ProcessedMessage.objects.filter(message_id=message_id[:128]).update(completed_at=timezone.now())
+
+
+def release_message(message_id: str) -> None:
+    """Forget a claimed id so a redelivery is processed again (used on failure)."""
+    if not message_id:
+        return
+    _seen.discard(message_id)
+    ProcessedMessage.objects.filter(message_id=message_id[:128]).delete()
+
+
+def prune_expired() -> int:
+    cutoff = timezone.now() - _ttl()
+    deleted, _ = ProcessedMessage.objects.filter(processed_at__lt=cutoff).delete()
+    return deleted
+
+
+def clear_local_cache() -> None:
+    _seen.clear()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import time
 import structlog
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Callable, Optional, Tuple
 
 from django.utils import timezone
@@ -19,18 +20,16 @@ from .search_flow import (
 )
 from .utils import (
     normalize_locale,
-    is_add_command,
-    is_find_command,
     get_intro_message,
     get_intro_buttons,
     get_language_prompt,
-    parse_language_choice,
     detect_locale,
     compute_wa_hash,
 )
+from . import metrics, user_cache
 from .unit_translations import get_unit_label_for_locale
 from .models import WAUser
-from .text_normalization import normalize_for_match
+from .text_normalization import MessageIntents, NO_INTENTS, match_intents, normalize_for_match
 
 
 logger = structlog.get_logger(__name__)
@@ -56,6 +55,16 @@ class UserMessageContext:
     lang_choice: str | None
     current_locale: str
     created: bool
+    message_id: str = ""
+    # Keyword/command/language intents of body_text_norm, matched once at entry
+    intents: MessageIntents = NO_INTENTS
+    # Active DealReportSession/DealLookupSession, loaded on first use (one query)
+    _sessions: Optional[dict] = field(default=None, repr=False)
+
+    def active_session(self, kind: str):
+        if self._sessions is None:
+            self._sessions = user_cache.load_active_sessions(self.user)
+        return self._sessions.get(kind)
 
 
 def _build_user_context(
@@ -85,10 +94,6 @@ def _build_user_context(
             button_reply = interactive.get("button_reply") or {}
             button_reply_id = button_reply.get("id")
 
-    # Language choice intent from the raw text (do not apply locale change here)
-    lang_choice = parse_language_choice(body_text)
-    logger.info("language_choice", choice=lang_choice)
-
     # Only auto-detect language for non-numeric messages; numbers shouldn't flip locale
     stripped = (body_text or "").strip()
     is_numeric_only = bool(stripped) and stripped.isdigit()
@@ -117,15 +122,19 @@ def _build_user_context(
     if display_name:
         defaults["display_name"] = display_name[:255]
 
-    # Create or fetch the user
-    obj, created = WAUser.objects.get_or_create(wa_id_hash=wa_hash, defaults=defaults)
+    # Fetch the user from the context cache, or create/fetch it from the DB
+    obj = user_cache.get_user(wa_hash)
+    created = False
+    if obj is None:
+        obj, created = WAUser.objects.get_or_create(wa_id_hash=wa_hash, defaults=defaults)
+        # Keep contact fields up to date
+        wa_last4 = wa_norm[-4:] if len(wa_norm) >= 4 else None
+        if obj.wa_number != wa_norm or obj.wa_last4 != wa_last4:
+            user_cache.update_user(obj, wa_number=wa_norm, wa_last4=wa_last4)
+        user_cache.store_user(obj)
 
-    # Keep contact fields up to date
-    WAUser.objects.filter(pk=obj.pk).update(
-        last_seen=timezone.now(),
-        wa_number=wa_norm,
-        wa_last4=wa_norm[-4:] if len(wa_norm) >= 4 else None,
-    )
+    # Coalesced: written in one batched UPDATE at most every WHATSAPP_LAST_SEEN_FLUSH_SECONDS
+    user_cache.touch(obj, timezone.now())
 
     # Determine the effective locale
     # If the user already has a stored locale, prefer it; otherwise use non-numeric detection (or default to en)
@@ -162,6 +171,13 @@ def _build_user_context(
 
     # Normalize once at entry; downstream logic should use this normalized form
     body_text_norm = normalize_for_match(body_text)
+    # All keyword/command intents in one trie pass (cached, so flow helpers calling
+    # is_keyword_norm on the same text reuse it)
+    intents = match_intents(body_text_norm)
+
+    # Language choice intent only from typed text (do not apply locale change here)
+    lang_choice = intents.language if message_type == "text" else None
+    logger.info("language_choice", choice=lang_choice)
 
     return UserMessageContext(
         user=obj,
@@ -174,17 +190,19 @@ def _build_user_context(
         lang_choice=lang_choice,
         current_locale=current_locale,
         created=created,
+        message_id=str(msg.get("id") or ""),
+        intents=intents,
     )
 
 
 def _state_start_add(ctx: "UserMessageContext", _msg: dict) -> Optional[StatePayload]:
-    if ctx.button_reply_id == "add_deal" or is_add_command(ctx.body_text_norm):
+    if ctx.button_reply_id == "add_deal" or ctx.intents.command == "add":
         return start_add_deal_flow(ctx.user, ctx.current_locale)
     return None
 
 
 def _state_start_find(ctx: "UserMessageContext", _msg: dict) -> Optional[StatePayload]:
-    if ctx.button_reply_id == "find_deal" or is_find_command(ctx.body_text_norm):
+    if ctx.button_reply_id == "find_deal" or ctx.intents.command == "find":
         return start_find_deal_flow(ctx.user, ctx.current_locale)
     return None
 
@@ -193,7 +211,12 @@ def _state_deal_flow_cont(
     ctx: "UserMessageContext", _msg: dict
 ) -> Optional[StatePayload]:
     return handle_deal_flow_response(
-        ctx.user, ctx.current_locale, ctx.body_text, ctx.body_text_norm
+        ctx.user,
+        ctx.current_locale,
+        ctx.body_text,
+        ctx.body_text_norm,
+        message_id=ctx.message_id,
+        session=ctx.active_session(user_cache.DEAL),
     )
 
 
@@ -202,7 +225,7 @@ def _state_lang_chosen(ctx: "UserMessageContext", _msg: dict) -> Optional[StateP
         return None
     new_locale = normalize_locale(ctx.lang_choice)
     if new_locale != ctx.current_locale:
-        WAUser.objects.filter(pk=ctx.user.pk).update(locale=new_locale)
+        user_cache.update_user(ctx.user, locale=new_locale)
         ctx.current_locale = new_locale
     intro = get_intro_message(ctx.current_locale)
     buttons = get_intro_buttons(ctx.current_locale)
@@ -216,7 +239,13 @@ def _state_new_user(ctx: "UserMessageContext", _msg: dict) -> Optional[StatePayl
 
 
 def _state_find_text(ctx: "UserMessageContext", _msg: dict) -> Optional[StatePayload]:
-    return handle_find_deal_text(ctx.user, ctx.current_locale, ctx.body_text, ctx.body_text_norm)
+    return handle_find_deal_text(
+        ctx.user,
+        ctx.current_locale,
+        ctx.body_text,
+        ctx.body_text_norm,
+        session=ctx.active_session(user_cache.LOOKUP),
+    )
 
 
 def _state_find_location(
@@ -224,7 +253,10 @@ def _state_find_location(
 ) -> Optional[StatePayload]:
     if ctx.message_type == "location":
         return handle_find_deal_location(
-            ctx.user, ctx.current_locale, msg.get("location") or {}
+            ctx.user,
+            ctx.current_locale,
+            msg.get("location") or {},
+            session=ctx.active_session(user_cache.LOOKUP),
         )
     return None
 
@@ -262,3 +294,45 @@ HANDLERS: Tuple[Tuple[str, HandlerFunc], ...] = (
     ("FIND_TEXT", _state_find_text),
     ("FIND_LOCATION", _state_find_location),
 )
+
+# Handlers that only apply while the user has an active flow of this kind
+HANDLER_FLOWS: dict[str, str] = {
+    "DEAL_FLOW_CONT": user_cache.DEAL,
+    "FIND_TEXT": user_cache.LOOKUP,
+    "FIND_LOCATION": user_cache.LOOKUP,
+}
+
+
+def dispatch(
+    ctx: UserMessageContext, msg: dict
+) -> Tuple[Optional[str], Optional[StatePayload]]:
+    """Run HANDLERS in order and return (state, reply) of the first match.
+
+    The user's active flows are loaded once (see ``active_session``) and
+    flow-specific handlers are skipped when no such flow is active, so a
+    message costs at most one session query instead of one per handler.
+    """
+    started = time.perf_counter()
+    state: Optional[str] = None
+    reply: Optional[StatePayload] = None
+    try:
+        for state_name, handler in HANDLERS:
+            flow = HANDLER_FLOWS.get(state_name)
+            if flow and ctx.active_session(flow) is None:
+                continue
+            reply = handler(ctx, msg)
+            if reply:
+                state = state_name
+                break
+            logger.info("handler_no_response", state=state_name, wa_hash=ctx.wa_hash)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        metrics.observe("webhook.dispatch_ms", elapsed_ms)
+        metrics.incr(f"webhook.handler.{state or 'NONE'}")
+        logger.info(
+            "handler_dispatched",
+            state=state,
+            elapsed_ms=round(elapsed_ms, 3),
+            wa_hash=ctx.wa_hash,
+        )
+    return state, reply
@@ -0,0 +1,213 @@
+"""Durable ingestion queue for Meta webhook payloads.
+
+The webhook view verifies the signature, stores the payload as a
+``WebhookEvent`` row and acknowledges immediately. Worker processes started
+with ``manage.py process_webhook_queue`` claim events with
+``SELECT ... FOR UPDATE SKIP LOCKED`` and run the regular handler chain.
+
+Delivery is at-least-once: an event whose worker died keeps its lock only
+until ``WHATSAPP_WEBHOOK_LOCK_TIMEOUT`` expires and is then claimed again.
+A failed event is retried with exponential backoff until
+``WHATSAPP_WEBHOOK_MAX_ATTEMPTS`` is reached.
+Events of one sender are never processed concurrently or out of order.
+"""
+from __future__ import annotations
+
+import random
+import time
+from datetime import timedelta
+from typing import Iterable, Optional
+
+import structlog
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, Min, OuterRef, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import WebhookEvent
+from .processing import first_sender, process_webhook_payload
+
+
+logger = structlog.get_logger(__name__)
+
+UNFINISHED_STATUSES = (WebhookEvent.Status.PENDING, WebhookEvent.Status.PROCESSING)
+
+
+def _max_attempts() -> int:
+    return int(getattr(settings, "WHATSAPP_WEBHOOK_MAX_ATTEMPTS", 5))
+
+
+def _lock_timeout() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "WHATSAPP_WEBHOOK_LOCK_TIMEOUT", 300)))
+
+
+def backoff_delay(attempts: int) -> float:
+    """Seconds to wait before retrying an event (exponential, jittered, capped).
+
+    The jitter only spreads the upper half of the window so a retry is never
+    immediate: the sender's later events wait behind it either way.
+    """
+    base = float(getattr(settings, "WHATSAPP_WEBHOOK_BACKOFF_BASE", 2.0))
+    cap = float(getattr(settings, "WHATSAPP_WEBHOOK_BACKOFF_MAX", 300.0))
+    ceiling = min(cap, base * (2 ** max(0, attempts - 1)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def is_async_enabled() -> bool:
+    return bool(getattr(settings, "WHATSAPP_WEBHOOK_ASYNC", False))
+
+
+def enqueue_payload(payload: dict) -> Optional[WebhookEvent]:
+    """Persist a verified payload. Payloads without messages (status callbacks) are skipped."""
+    sender = first_sender(payload)
+    if not sender:
+        metrics.incr("webhook.events_skipped")
+        return None
+    event = WebhookEvent.objects.create(payload=payload, sender=sender)
+    metrics.incr("webhook.events_enqueued")
+    logger.info("webhook_event_enqueued", event_id=event.pk)
+    return event
+
+
+def claim_events(worker_id: str, limit: int = 20) -> list[WebhookEvent]:
+    """Lock up to ``limit`` ready events for this worker.
+
+    An event is ready when it is pending and due (or its processing lock
+    expired) and no older unfinished event exists for the same sender.
+    """
+    now = timezone.now()
+    stale_before = now - _lock_timeout()
+    older_unfinished = WebhookEvent.objects.filter(
+        sender=OuterRef("sender"),
+        id__lt=OuterRef("id"),
+        status__in=UNFINISHED_STATUSES,
+    )
+    with transaction.atomic():
+        ids = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(
+                Q(status=WebhookEvent.Status.PENDING, next_attempt_at__lte=now)
+                | Q(status=WebhookEvent.Status.PROCESSING, locked_at__lt=stale_before)
+            )
+            .filter(~Exists(older_unfinished))
+            .order_by("id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        WebhookEvent.objects.filter(pk__in=ids).update(
+            status=WebhookEvent.Status.PROCESSING,
+            locked_at=now,
+            locked_by=worker_id[:64],
+            attempts=F("attempts") + 1,
+        )
+    return list(WebhookEvent.objects.filter(pk__in=ids).order_by("id"))
+
+
+def process_event(event: WebhookEvent) -> bool:
+    """Process a claimed event and record the outcome. Returns True on success."""
+    started = time.perf_counter()
+    try:
+        processed = process_webhook_payload(
+            event.payload, fallback_on_error=False, retrying=event.attempts > 1
+        )
+    except Exception as exc:
+        _record_failure(event, exc)
+        return False
+    now = timezone.now()
+    WebhookEvent.objects.filter(pk=event.pk, locked_by=event.locked_by).update(
+        status=WebhookEvent.Status.DONE,
+        processed_at=now,
+        messages_processed=processed,
+        locked_at=None,
+        last_error="",
+    )
+    metrics.incr("webhook.events_processed")
+    metrics.observe("webhook.process_ms", (time.perf_counter() - started) * 1000)
+    metrics.observe("webhook.queue_latency_ms", (now - event.received_at).total_seconds() * 1000)
+    return True
+
+
+def _record_failure(event: WebhookEvent, exc: Exception) -> None:
+    exhausted = event.attempts >= _max_attempts()
+    status = WebhookEvent.Status.FAILED if exhausted else WebhookEvent.Status.PENDING
+    delay = 0.0 if exhausted else backoff_delay(event.attempts)
+    WebhookEvent.objects.filter(pk=event.pk).update(
+        status=status,
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        locked_at=None,
+        last_error=f"{type(exc).__name__}: {exc}"[:2000],
+    )
+    metrics.incr("webhook.events_failed" if exhausted else "webhook.events_retried")
+    logger.exception(
+        "webhook_event_failed",
+        event_id=event.pk,
+        attempts=event.attempts,
+        exhausted=exhausted,
+        delay_s=round(delay, 3),
+    )
+
+
+def drain(worker_id: str, batch_size: int = 20) -> int:
+    """Claim and process one batch. Returns the number of claimed events."""
+    events = claim_events(worker_id, limit=batch_size)
+    for event in events:
+        process_event(event)
+    return len(events)
+
+
+def replay_events(
+    *,
+    statuses: Iterable[str] = (WebhookEvent.Status.FAILED,),
+    since=None,
+    ids: Optional[Iterable[int]] = None,
+) -> int:
+    """Put finished events back on the queue (at-least-once replay)."""
+    qs = WebhookEvent.objects.filter(status__in=list(statuses))
+    if since is not None:
+        qs = qs.filter(received_at__gte=since)
+    if ids is not None:
+        qs = qs.filter(pk__in=list(ids))
+    count = qs.update(
+        status=WebhookEvent.Status.PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+        locked_at=None,
+        locked_by="",
+        processed_at=None,
+    )
+    logger.info("webhook_events_replayed", count=count)
+    return count
+
+
+def purge_processed(older_than: timedelta) -> int:
+    cutoff = timezone.now() - older_than
+    deleted, _ = WebhookEvent.objects.filter(
+        status=WebhookEvent.Status.DONE, processed_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def queue_stats(latency_window: int = 500) -> dict:
+    """Queue depth, age of the oldest pending event and recent end-to-end latency."""
+    counts = dict(
+        WebhookEvent.objects.values_list("status").annotate(total=Count("id")).order_by()
+    )
+    oldest = WebhookEvent.objects.filter(status=WebhookEvent.Status.PENDING).aggregate(
+        oldest=Min("received_at")
+    )["oldest"]
+    recent = WebhookEvent.objects.filter(status=WebhookEvent.Status.DONE).order_by("-processed_at").values_list(
+        "received_at", "processed_at"
+    )[:latency_window]
+    latencies = [
+        (processed - received).total_seconds() * 1000 for received, processed in recent if processed
+    ]
+    return {
+        "depth": counts.get(WebhookEvent.Status.PENDING, 0),
+        "processing": counts.get(WebhookEvent.Status.PROCESSING, 0),
+        "failed": counts.get(WebhookEvent.Status.FAILED, 0),
+        "done": counts.get(WebhookEvent.Status.DONE, 0),
+        "oldest_pending_age_s": round((timezone.now() - oldest).total_seconds(), 3) if oldest else 0.0,
+        "latency_ms": metrics.summarize(latencies),
+    }
@@ -0,0 +1,121 @@
+"""Hebrew/English locale detection for inbound messages.
+
+Users write Hebrew or English, so most messages can be classified by the
+share of Hebrew vs. Latin letters alone. ``langdetect`` (probabilistic
+n-gram scoring) is only imported and consulted when neither script clearly
+dominates. Results are memoized per normalized text.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+
+import structlog
+
+from .text_normalization import strip_invisible, strip_niqqud
+
+
+logger = structlog.get_logger(__name__)
+
+LANG_PROB_THRESHOLD = 0.85
+# Share of script letters above which the text is classified without langdetect
+SCRIPT_DOMINANCE = 0.8
+CACHE_SIZE = 4096
+
+_RE_MULTISPACE = re.compile(r"\s+")
+
+
+def _is_hebrew(ch: str) -> bool:
+    return "א" <= ch <= "ת" or "יִ" <= ch <= "ﭏ"
+
+
+def _is_latin(ch: str) -> bool:
+    return ch.isascii() or "À" <= ch <= "ɏ"
+
+
+def _detection_key(text: str) -> str:
+    """Normalize text for detection (and as the memoization key)."""
+    s = unicodedata.normalize("NFKC", text or "")
+    s = strip_niqqud(strip_invisible(s))
+    return _RE_MULTISPACE.sub(" ", s).strip().casefold()
+
+
+def script_counts(text: str) -> tuple[int, int, int]:
+    """Return (hebrew, latin, other) letter counts."""
+    hebrew = latin = other = 0
+    for ch in text:
+        if not ch.isalpha():
+            continue
+        if _is_hebrew(ch):
+            hebrew += 1
+        elif _is_latin(ch):
+            latin += 1
+        else:
+            other += 1
+    return hebrew, latin, other
+
+
+_langdetect = None
+
+
+def _load_langdetect():
+    """Import langdetect on first use; most messages never need it."""
+    global _langdetect
+    if _langdetect is None:
+        import langdetect
+
+        langdetect.DetectorFactory.seed = 0
+        _langdetect = langdetect
+    return _langdetect
+
+
+def _detect_with_langdetect(sample: str) -> str:
+    langdetect = _load_langdetect()
+    try:
+        candidates = langdetect.detect_langs(sample)
+        if candidates:
+            best = max(candidates, key=lambda c: c.prob)
+            if best.prob >= LANG_PROB_THRESHOLD:
+                if best.lang.startswith("he"):
+                    return "he"
+                if best.lang.startswith("en"):
+                    return "en"
+    except langdetect.LangDetectException:
+        logger.debug("langdetect_failed", exc_info=True)
+    except Exception:
+        logger.exception("langdetect_unexpected_error")
+    return "en"
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _detect_key(key: str) -> str:
+    hebrew, latin, other = script_counts(key)
+    total = hebrew + latin + other
+    if not total:
+        # Digits, emoji and punctuation only
+        return "en"
+    if hebrew / total >= SCRIPT_DOMINANCE:
+        return "he"
+    if not hebrew:
+        # Latin or another script: langdetect could only ever answer "en" here
+        return "en"
+    if latin / total >= SCRIPT_DOMINANCE:
+        return "en"
+    return _detect_with_langdetect(key)
+
+
+def detect_locale(text: str) -> str:
+    """Detect 'he' or 'en' for a message; defaults to 'en'."""
+    key = _detection_key(text)
+    if not key:
+        return "en"
+    return _detect_key(key)
+
+
+def detect_locale_langdetect(text: str) -> str:
+    """Previous behaviour (langdetect on every message); kept for benchmarks."""
+    sample = (text or "").strip()
+    if not sample:
+        return "en"
+    return _detect_with_langdetect(sample)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from pricing import snapshots
+from pricing.models import PriceReport
+from stores import city_index
+from whatsapp import search_flow
+from whatsapp.benchmarking import latency_summary, run_rolled_back, seed_deal_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large synthetic dataset (rolled back afterwards) and compare deal search "
+        "over the StoreProductSnapshot read model with the previous Python dedupe loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=5000)
+        parser.add_argument("--stores", type=int, default=300)
+        parser.add_argument("--reports", type=int, default=500_000)
+        parser.add_argument("--hot-share", type=float, default=0.3, help="Share of reports on one popular product.")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--explain", action="store_true", help="Include EXPLAIN ANALYZE of the new query.")
+
+    def handle(self, *args, **options):
+        report = run_rolled_back(lambda: self._run(options))
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+
+    def _run(self, options) -> dict:
+        started = time.perf_counter()
+        seed_deal_dataset(
+            products=options["products"],
+            stores=options["stores"],
+            reports=options["reports"],
+            hot_share=options["hot_share"],
+        )
+        seed_s = time.perf_counter() - started
+        started = time.perf_counter()
+        rebuild_stats = snapshots.rebuild()
+        rebuild_s = time.perf_counter() - started
+        # Seeded cities are uncommitted: keep one city index for the whole run
+        with city_index.pinned_index():
+            query = ("Tnuva Milk", None, "Tel Aviv")
+
+            legacy_rows: list[int] = []
+            current_rows: list[int] = []
+
+            def legacy():
+                legacy_rows.append(_legacy_fetch(*query))
+
+            def current():
+                current_rows.append(len(search_flow._deals_queryset(*query, limit=search_flow.RESULT_LIMIT)))
+
+            legacy_ms = _time_ms(legacy, options["repeat"])
+            current_ms = _time_ms(current, options["repeat"])
+
+            with CaptureQueriesContext(connection) as ctx:
+                current()
+            result = {
+                "seed_s": round(seed_s, 2),
+                "snapshot_rebuild_s": round(rebuild_s, 2),
+                "snapshots": rebuild_stats["upserted"],
+                "reports": options["reports"],
+                "approved_reports_for_query_product": PriceReport.objects.filter(
+                    needs_moderation=False, product__name_en="Tnuva Milk 3%"
+                ).count(),
+                "latency_ms": {
+                    "python_dedupe": latency_summary(legacy_ms),
+                    "snapshot": latency_summary(current_ms),
+                },
+                "rows_fetched": {
+                    "python_dedupe": max(legacy_rows) if legacy_rows else 0,
+                    "snapshot": max(current_rows) if current_rows else 0,
+                },
+                "queries_per_search": len(ctx.captured_queries),
+            }
+            if options["explain"]:
+                result["explain"] = search_flow._deals_queryset(*query, limit=search_flow.RESULT_LIMIT).explain(
+                    analyze=True, buffers=True
+                )
+            return result
+
+
+def _time_ms(func, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        reset_queries()
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _legacy_fetch(product_query, brand_query, city_query, limit=search_flow.RESULT_LIMIT) -> int:
+    """Previous implementation: stream reports newest-first and dedupe in Python; returns rows read."""
+    from catalog.search import PRODUCT_CANDIDATES, search_products
+
+    candidates = search_products(product_query, brand_query)[:PRODUCT_CANDIDATES]
+    qs = (
+        PriceReport.objects.filter(needs_moderation=False, product__in=candidates.values("id"))
+        .filter(
+            Q(store__city_obj__name_he__iexact=city_query)
+            | Q(store__city_obj__name_en__iexact=city_query)
+            | Q(store__city__iexact=city_query)
+            | Q(store__city_he__iexact=city_query)
+            | Q(store__city_en__iexact=city_query)
+        )
+        .select_related("product", "store", "store__city_obj")
+        .order_by("-observed_at")
+    )
+    seen: set = set()
+    rows = 0
+    for report in qs.iterator(chunk_size=2000):
+        rows += 1
+        key = (report.store_id, report.product_id, (report.product.brand or "").strip().lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        if len(seen) >= limit:
+            break
+    return rows
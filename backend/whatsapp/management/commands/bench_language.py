@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from whatsapp import language
+from whatsapp.benchmarking import LANGUAGE_SAMPLES, latency_summary, time_calls
+
+
+class Command(BaseCommand):
+    help = "Compare latency and accuracy of the script-based locale detector with langdetect-only detection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50, help="Passes over the sample corpus.")
+
+    def handle(self, *args, **options):
+        texts = [text for text, _expected in LANGUAGE_SAMPLES]
+        repeat = options["repeat"]
+
+        # Warm up langdetect's profile load so it is not billed to either side.
+        language.detect_locale_langdetect("warm up")
+
+        legacy = time_calls(language.detect_locale_langdetect, texts, repeat=repeat)
+        language._detect_key.cache_clear()
+        cold = time_calls(language.detect_locale, texts, repeat=1)
+        warm = time_calls(language.detect_locale, texts, repeat=repeat)
+
+        legacy_results = [language.detect_locale_langdetect(text) for text in texts]
+        new_results = [language.detect_locale(text) for text in texts]
+        expected = [label for _text, label in LANGUAGE_SAMPLES]
+
+        def accuracy(results):
+            return round(sum(r == e for r, e in zip(results, expected)) / len(expected), 3)
+
+        report = {
+            "samples": len(texts),
+            "latency_us": {
+                "langdetect_only": latency_summary(legacy),
+                "script_first_uncached": latency_summary(cold),
+                "script_first_cached": latency_summary(warm),
+            },
+            "accuracy": {
+                "langdetect_only": accuracy(legacy_results),
+                "script_first": accuracy(new_results),
+            },
+            "agreement_with_langdetect": accuracy_between(legacy_results, new_results),
+            "disagreements": [
+                {"text": text, "expected": exp, "langdetect_only": old, "script_first": new}
+                for text, exp, old, new in zip(texts, expected, legacy_results, new_results)
+                if old != new or new != exp
+            ],
+            "cache": language._detect_key.cache_info()._asdict(),
+        }
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+def accuracy_between(left: list[str], right: list[str]) -> float:
+    return round(sum(a == b for a, b in zip(left, right)) / len(left), 3) if left else 0.0
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+import random
+import time
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from pricing import snapshots
+from stores import city_index
+from whatsapp import search_flow
+from whatsapp.benchmarking import NATIONWIDE_CITIES, latency_summary, run_rolled_back, seed_deal_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic nationwide store set (rolled back afterwards) and compare "
+        "nearest-store (KNN) deal search with city-name deal search."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=5000)
+        parser.add_argument("--stores", type=int, default=3000)
+        parser.add_argument("--reports", type=int, default=500_000)
+        parser.add_argument("--hot-share", type=float, default=0.3, help="Share of reports on one popular product.")
+        parser.add_argument("--searches", type=int, default=200, help="Random user positions to search from.")
+        parser.add_argument("--radius-km", type=float, default=None)
+        parser.add_argument("--explain", action="store_true", help="Include EXPLAIN ANALYZE of one nearby search.")
+
+    def handle(self, *args, **options):
+        report = run_rolled_back(lambda: self._run(options))
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+
+    def _run(self, options) -> dict:
+        started = time.perf_counter()
+        seed_deal_dataset(
+            products=options["products"],
+            stores=options["stores"],
+            reports=options["reports"],
+            hot_share=options["hot_share"],
+            cities=NATIONWIDE_CITIES,
+        )
+        seed_s = time.perf_counter() - started
+        started = time.perf_counter()
+        snapshots.rebuild()
+        rebuild_s = time.perf_counter() - started
+        # Seeded cities are uncommitted: keep one city index for the whole run
+        with city_index.pinned_index():
+            rng = random.Random(7)
+            positions = []
+            for _ in range(options["searches"]):
+                _he, en, lon, lat = rng.choice(NATIONWIDE_CITIES)
+                positions.append((en, Point(lon + rng.uniform(-0.05, 0.05), lat + rng.uniform(-0.05, 0.05), srid=4326)))
+
+            by_city_ms: list[float] = []
+            nearby_ms: list[float] = []
+            by_city_rows: list[int] = []
+            nearby_rows: list[int] = []
+            for city, point in positions:
+                started = time.perf_counter()
+                by_city_rows.append(len(search_flow._deals_queryset("Tnuva Milk", None, city)))
+                by_city_ms.append((time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                nearby_rows.append(
+                    len(search_flow._nearby_deals_queryset("Tnuva Milk", None, point, radius_km=options["radius_km"]))
+                )
+                nearby_ms.append((time.perf_counter() - started) * 1000)
+
+            with CaptureQueriesContext(connection) as ctx:
+                list(search_flow._nearby_deals_queryset("Tnuva Milk", None, positions[0][1]))
+            result = {
+                "seed_s": round(seed_s, 2),
+                "snapshot_rebuild_s": round(rebuild_s, 2),
+                "stores": options["stores"],
+                "reports": options["reports"],
+                "searches": len(positions),
+                "latency_ms": {
+                    "city_name": latency_summary(by_city_ms),
+                    "nearby_knn": latency_summary(nearby_ms),
+                },
+                "mean_results": {
+                    "city_name": round(sum(by_city_rows) / len(by_city_rows), 2) if by_city_rows else 0,
+                    "nearby_knn": round(sum(nearby_rows) / len(nearby_rows), 2) if nearby_rows else 0,
+                },
+                "queries_per_nearby_search": len(ctx.captured_queries),
+            }
+            if options["explain"]:
+                result["explain"] = search_flow._nearby_deals_queryset(
+                    "Tnuva Milk", None, positions[0][1], radius_km=options["radius_km"]
+                ).explain(analyze=True, buffers=True)
+            return result
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from whatsapp import text_normalization
+from whatsapp.benchmarking import (
+    NORMALIZE_SAMPLES,
+    latency_summary,
+    legacy_normalize_for_match,
+    time_calls,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark normalize_for_match against the previous multi-pass implementation."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200, help="Passes over the sample corpus.")
+
+    def handle(self, *args, **options):
+        texts = list(NORMALIZE_SAMPLES)
+        repeat = options["repeat"]
+
+        mismatches = [
+            {"text": text, "legacy": legacy_normalize_for_match(text), "current": text_normalization._normalize(text)}
+            for text in texts
+            if legacy_normalize_for_match(text) != text_normalization._normalize(text)
+        ]
+
+        legacy = time_calls(legacy_normalize_for_match, texts, repeat=repeat)
+        uncached = time_calls(text_normalization._normalize, texts, repeat=repeat)
+        text_normalization._normalize_cached.cache_clear()
+        cached = time_calls(text_normalization.normalize_for_match, texts, repeat=repeat)
+
+        legacy_summary = latency_summary(legacy)
+        uncached_summary = latency_summary(uncached)
+        cached_summary = latency_summary(cached)
+        report = {
+            "samples": len(texts),
+            "repeat": repeat,
+            "latency_us": {
+                "legacy": legacy_summary,
+                "single_table": uncached_summary,
+                "single_table_cached": cached_summary,
+            },
+            "speedup_mean": {
+                "single_table": _ratio(legacy_summary["mean"], uncached_summary["mean"]),
+                "single_table_cached": _ratio(legacy_summary["mean"], cached_summary["mean"]),
+            },
+            "mismatches": mismatches,
+            "cache": text_normalization._normalize_cached.cache_info()._asdict(),
+        }
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+def _ratio(before: float, after: float) -> float:
+    return round(before / after, 2) if after else 0.0
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import time
+from urllib import request as urllib_request
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from whatsapp.mock_graph import MockGraphServer
+from whatsapp.transport import get_transport
+from whatsapp.utils import _build_request, send_whatsapp_texts, text_payload
+
+
+class Command(BaseCommand):
+    help = "Benchmark outbound sends against the local mock Graph API server."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument("--latency-ms", type=float, default=80.0, help="Simulated Graph API latency.")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--baseline-sample",
+            type=int,
+            default=50,
+            help="Messages sent with the legacy one-connection-per-request path (extrapolated).",
+        )
+
+    def handle(self, *args, **options):
+        count = options["messages"]
+        messages = [(f"9725{i:08d}", f"Benchmark message {i}") for i in range(count)]
+        with MockGraphServer(latency=options["latency_ms"] / 1000) as server, override_settings(
+            WHATSAPP_GRAPH_API_BASE_URL=server.base_url,
+            WHATSAPP_ACCESS_TOKEN="bench-token",
+            WHATSAPP_PHONE_NUMBER_ID="bench",
+            WHATSAPP_HTTP_POOL_SIZE=options["concurrency"],
+            WHATSAPP_SEND_CONCURRENCY=options["concurrency"],
+        ):
+            sample = messages[: options["baseline_sample"]]
+            started = time.perf_counter()
+            for to, body in sample:
+                _legacy_send(server.base_url, _build_request(text_payload(to, body)))
+            legacy_elapsed = time.perf_counter() - started
+            legacy_estimate = legacy_elapsed / max(1, len(sample)) * count
+            legacy_connections = server.connections
+
+            started = time.perf_counter()
+            results = send_whatsapp_texts(messages)
+            pooled_elapsed = time.perf_counter() - started
+            get_transport().close()
+            pooled_connections = server.connections - legacy_connections
+
+        self.stdout.write(
+            json.dumps(
+                {
+                    "messages": count,
+                    "latency_ms": options["latency_ms"],
+                    "legacy_sequential_s_estimated": round(legacy_estimate, 3),
+                    "legacy_connections_per_message": round(legacy_connections / max(1, len(sample)), 2),
+                    "pooled_concurrent_s": round(pooled_elapsed, 3),
+                    "pooled_connections": pooled_connections,
+                    "pooled_failures": results.count(False),
+                    "speedup": round(legacy_estimate / pooled_elapsed, 1) if pooled_elapsed else None,
+                },
+                indent=2,
+            )
+        )
+
+
+def _legacy_send(base_url: str, req) -> bool:
+    """Previous behaviour: urllib.urlopen, one new connection per message."""
+    legacy = urllib_request.Request(f"{base_url}{req.path}", data=req.body, headers=req.headers, method="POST")
+    with urllib_request.urlopen(legacy, timeout=10) as resp:
+        return 200 <= resp.status < 300
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from stores import city_index
+from stores.models import Store, normalize_store_text
+from stores.search import STORE_CANDIDATES, ranked_stores
+from whatsapp import deal_flow
+from whatsapp.benchmarking import (
+    NATIONWIDE_CITIES,
+    STORE_CHAINS,
+    STREETS,
+    latency_summary,
+    run_rolled_back,
+    seed_store_dataset,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic nationwide store set (rolled back afterwards) and compare the "
+        "ranked one-query store-name search with the previous exact/detail/prefix query chain."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stores", type=int, default=50_000)
+        parser.add_argument("--searches", type=int, default=300)
+        parser.add_argument("--explain", action="store_true", help="Include EXPLAIN ANALYZE of one ranked search.")
+
+    def handle(self, *args, **options):
+        report = run_rolled_back(lambda: self._run(options))
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+
+    def _run(self, options) -> dict:
+        started = time.perf_counter()
+        seed_store_dataset(stores=options["stores"])
+        seed_s = time.perf_counter() - started
+        # Seeded cities are uncommitted: keep one city index for the whole run
+        with city_index.pinned_index():
+            rng = random.Random(11)
+            lookups = []
+            for _ in range(options["searches"]):
+                city_he, _en, *_centre = rng.choice(NATIONWIDE_CITIES)
+                chain_he, chain_en = rng.choice(STORE_CHAINS)
+                name = rng.choice((chain_he, chain_en, chain_he[:-1], f"{chain_he} {rng.choice(STREETS)}"))
+                data = {"city": city_he, "city_he": city_he, "store_detail": rng.choice(("", rng.choice(STREETS)))}
+                lookups.append((name, data))
+
+            legacy_ms: list[float] = []
+            ranked_ms: list[float] = []
+            legacy_queries: list[int] = []
+            ranked_queries: list[int] = []
+            for name, data in lookups:
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    _legacy_candidates(name, data)
+                    legacy_ms.append((time.perf_counter() - started) * 1000)
+                legacy_queries.append(len(ctx.captured_queries))
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    deal_flow._find_store_candidates(name, data)
+                    ranked_ms.append((time.perf_counter() - started) * 1000)
+                ranked_queries.append(len(ctx.captured_queries))
+
+            result = {
+                "seed_s": round(seed_s, 2),
+                "stores": options["stores"],
+                "searches": len(lookups),
+                "latency_ms": {
+                    "query_chain": latency_summary(legacy_ms),
+                    "ranked": latency_summary(ranked_ms),
+                },
+                "max_queries_per_search": {
+                    "query_chain": max(legacy_queries, default=0),
+                    "ranked": max(ranked_queries, default=0),
+                },
+            }
+            if options["explain"]:
+                name, data = lookups[0]
+                city_ids = city_index.city_ids(data["city"])
+                result["explain"] = ranked_stores(name, city_ids=city_ids, detail=data["store_detail"])[
+                    :STORE_CANDIDATES
+                ].explain(analyze=True, buffers=True)
+            return result
+
+
+def _legacy_candidates(name: str, data: dict, limit: int = deal_flow.MAX_STORE_CHOICES) -> list[Store]:
+    """Previous implementation: exact names, detail narrowing, then 3-character prefix matches."""
+    ids = sorted({pk for value in deal_flow._city_query_values(data) for pk in city_index.city_ids(value)})
+    base_qs = Store.objects.filter(is_active=True, city_obj_id__in=ids)
+    exact_filter = Q(name__iexact=name) | Q(display_name__iexact=name)
+    normalized = normalize_store_text(name)
+    if normalized:
+        exact_filter |= Q(name_search_terms__contains=[normalized])
+    exact_qs = base_qs.filter(exact_filter)
+    detail = data.get("store_detail")
+    if detail and exact_qs.exists():
+        narrowed = exact_qs.filter(
+            Q(display_name__icontains=detail) | Q(name__icontains=detail) | Q(address__icontains=detail)
+        )
+        if narrowed.exists():
+            exact_qs = narrowed
+    candidates = list(exact_qs[:limit])
+    if len(candidates) < limit:
+        chunk = name[:3]
+        seen = {store.pk for store in candidates}
+        for store in base_qs.filter(Q(name__icontains=chunk) | Q(display_name__icontains=chunk)):
+            if store.pk not in seen:
+                candidates.append(store)
+                seen.add(store.pk)
+                if len(candidates) >= limit:
+                    break
+    return candidates
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from whatsapp import metrics, outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound WhatsApp messages with a pool of dispatcher processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of dispatcher processes (default: WHATSAPP_OUTBOX_WORKERS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=50, help="Messages claimed per round trip.")
+        parser.add_argument("--poll-interval", type=float, default=0.2, help="Sleep (s) when nothing is due.")
+        parser.add_argument("--once", action="store_true", help="Deliver what is due and exit.")
+        parser.add_argument("--stats", action="store_true", help="Print outbox depth/latency and exit.")
+        parser.add_argument(
+            "--requeue-dead",
+            action="store_true",
+            help="Move all dead letters back into the outbox before dispatching.",
+        )
+        parser.add_argument(
+            "--purge-days",
+            type=int,
+            default=None,
+            help="Delete sent messages older than N days and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.stdout.write(json.dumps(outbox.outbox_stats(), indent=2))
+            return
+        if options["purge_days"] is not None:
+            deleted = outbox.purge_sent(timedelta(days=options["purge_days"]))
+            self.stdout.write(f"Deleted {deleted} sent message(s).")
+            return
+        if options["requeue_dead"]:
+            count = outbox.requeue_dead_letters()
+            self.stdout.write(f"Re-queued {count} dead letter(s).")
+
+        workers = options["workers"] or int(getattr(settings, "WHATSAPP_OUTBOX_WORKERS", 2))
+        worker_args = (options["batch_size"], options["poll_interval"], options["once"])
+        if workers <= 1:
+            _dispatch_loop(0, *worker_args)
+            return
+
+        # Children must open their own DB connections and HTTP pools.
+        connections.close_all()
+        ctx = multiprocessing.get_context("fork")
+        procs = [
+            ctx.Process(target=_dispatch_loop, args=(index, *worker_args), daemon=False)
+            for index in range(workers)
+        ]
+        for proc in procs:
+            proc.start()
+        self.stdout.write(f"Started {workers} outbox dispatcher(s).")
+        try:
+            for proc in procs:
+                proc.join()
+        except KeyboardInterrupt:
+            for proc in procs:
+                if proc.is_alive():
+                    os.kill(proc.pid, signal.SIGTERM)
+            for proc in procs:
+                proc.join()
+
+
+def _dispatch_loop(index: int, batch_size: int, poll_interval: float, once: bool) -> None:
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    stopping = False
+
+    def _stop(*_args):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    last_report = time.monotonic()
+    while not stopping:
+        claimed = outbox.drain(worker_id, batch_size=batch_size)
+        if time.monotonic() - last_report >= 60:
+            metrics.log_snapshot("outbox_dispatcher_metrics", worker_id=worker_id, **outbox.outbox_stats())
+            last_report = time.monotonic()
+        if claimed:
+            continue
+        if once:
+            break
+        time.sleep(poll_interval)
+    metrics.log_snapshot("outbox_dispatcher_stopped", worker_id=worker_id)
+    connections.close_all()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Report cold import time per module for a fresh worker process "
+        "(django.setup() plus the URLconf), using python -X importtime."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=25, help="Number of modules to list.")
+        parser.add_argument("--runs", type=int, default=3, help="Fresh processes to sample (median is reported).")
+        parser.add_argument(
+            "--module",
+            action="append",
+            default=[],
+            help="Extra module to import after setup (repeatable), e.g. whatsapp.handlers.",
+        )
+        parser.add_argument(
+            "--prefix",
+            action="append",
+            default=[],
+            help="Only list modules starting with this prefix (repeatable).",
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON instead of a table.")
+
+    def handle(self, *args, **options):
+        modules = [settings.ROOT_URLCONF, *options["module"]]
+        script = "import django; django.setup(); " + "; ".join(f"import {name}" for name in modules)
+
+        cumulative: dict[str, list[int]] = defaultdict(list)
+        self_time: dict[str, list[int]] = defaultdict(list)
+        totals: list[int] = []
+        for _ in range(max(1, options["runs"])):
+            run_cumulative, run_self = _profile(script)
+            totals.append(sum(us for name, us in run_self.items()))
+            for name, us in run_cumulative.items():
+                cumulative[name].append(us)
+                self_time[name].append(run_self[name])
+
+        prefixes = tuple(options["prefix"])
+        rows = [
+            {
+                "module": name,
+                "cumulative_ms": round(statistics.median(values) / 1000, 2),
+                "self_ms": round(statistics.median(self_time[name]) / 1000, 2),
+            }
+            for name, values in cumulative.items()
+            if not prefixes or name.startswith(prefixes)
+        ]
+        rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+        rows = rows[: options["top"]]
+        by_app = _app_totals(self_time)
+        total_ms = round(statistics.median(totals) / 1000, 2)
+
+        if options["json"]:
+            self.stdout.write(json.dumps({"total_ms": total_ms, "apps": by_app, "modules": rows}, indent=2))
+            return
+        self.stdout.write(f"Total import time (median of {len(totals)} run(s)): {total_ms} ms")
+        self.stdout.write("Self time by project app:")
+        for app, ms in by_app.items():
+            self.stdout.write(f"  {app:<24} {ms:>8.2f} ms")
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for row in rows:
+            self.stdout.write(f"{row['cumulative_ms']:>14.2f} {row['self_ms']:>9.2f}  {row['module']}")
+
+
+def _profile(script: str) -> tuple[dict[str, int], dict[str, int]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ),
+        cwd=str(settings.BASE_DIR),
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Profiling process failed:\n{proc.stderr[-2000:]}")
+    cumulative: dict[str, int] = {}
+    self_time: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        own, total, _indent, name = match.groups()
+        cumulative[name] = int(total)
+        self_time[name] = int(own)
+    return cumulative, self_time
+
+
+def _app_totals(self_time: dict[str, list[int]]) -> dict[str, float]:
+    """Median self time summed per project app (and per heavy third-party package)."""
+    local_apps = {app.split(".")[0] for app in settings.INSTALLED_APPS if "." not in app}
+    totals: dict[str, float] = defaultdict(float)
+    for name, values in self_time.items():
+        root = name.split(".")[0]
+        if root in local_apps or root == "config":
+            totals[root] += statistics.median(values) / 1000
+    return {app: round(ms, 2) for app, ms in sorted(totals.items(), key=lambda item: item[1], reverse=True)}
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from whatsapp import ingest, metrics, user_cache
+
+
+class Command(BaseCommand):
+    help = "Drain the async webhook queue with a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of worker processes (default: WHATSAPP_WEBHOOK_WORKERS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=20, help="Events claimed per round trip.")
+        parser.add_argument("--poll-interval", type=float, default=0.5, help="Sleep (s) when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain what is queued and exit.")
+        parser.add_argument("--stats", action="store_true", help="Print queue depth/latency metrics and exit.")
+        parser.add_argument(
+            "--replay-failed",
+            action="store_true",
+            help="Re-queue failed events before processing.",
+        )
+        parser.add_argument(
+            "--replay-since-minutes",
+            type=int,
+            default=None,
+            help="Re-queue failed and processed events received in the last N minutes.",
+        )
+        parser.add_argument(
+            "--purge-days",
+            type=int,
+            default=None,
+            help="Delete processed events older than N days and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.stdout.write(json.dumps(ingest.queue_stats(), indent=2))
+            return
+        if options["purge_days"] is not None:
+            deleted = ingest.purge_processed(timedelta(days=options["purge_days"]))
+            self.stdout.write(f"Deleted {deleted} processed event(s).")
+            return
+        if options["replay_failed"]:
+            count = ingest.replay_events()
+            self.stdout.write(f"Re-queued {count} failed event(s).")
+        if options["replay_since_minutes"] is not None:
+            since = timezone.now() - timedelta(minutes=options["replay_since_minutes"])
+            count = ingest.replay_events(
+                statuses=(ingest.WebhookEvent.Status.FAILED, ingest.WebhookEvent.Status.DONE),
+                since=since,
+            )
+            self.stdout.write(f"Re-queued {count} event(s) received since {since.isoformat()}.")
+
+        workers = options["workers"] or int(getattr(settings, "WHATSAPP_WEBHOOK_WORKERS", 4))
+        worker_args = (options["batch_size"], options["poll_interval"], options["once"])
+        if workers <= 1:
+            _worker_loop(0, *worker_args)
+            return
+
+        # Children must open their own DB connections.
+        connections.close_all()
+        ctx = multiprocessing.get_context("fork")
+        procs = [
+            ctx.Process(target=_worker_loop, args=(index, *worker_args), daemon=False)
+            for index in range(workers)
+        ]
+        for proc in procs:
+            proc.start()
+        self.stdout.write(f"Started {workers} webhook worker(s).")
+        try:
+            for proc in procs:
+                proc.join()
+        except KeyboardInterrupt:
+            for proc in procs:
+                if proc.is_alive():
+                    os.kill(proc.pid, signal.SIGTERM)
+            for proc in procs:
+                proc.join()
+
+
+def _worker_loop(index: int, batch_size: int, poll_interval: float, once: bool) -> None:
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    stopping = False
+
+    def _stop(*_args):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    last_report = time.monotonic()
+    while not stopping:
+        claimed = ingest.drain(worker_id, batch_size=batch_size)
+        if time.monotonic() - last_report >= 60:
+            metrics.log_snapshot("webhook_worker_metrics", worker_id=worker_id, **ingest.queue_stats())
+            last_report = time.monotonic()
+        if claimed:
+            continue
+        if once:
+            break
+        time.sleep(poll_interval)
+    user_cache.flush_last_seen()
+    metrics.log_snapshot("webhook_worker_stopped", worker_id=worker_id)
+    connections.close_all()
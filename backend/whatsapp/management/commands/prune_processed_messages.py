@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from whatsapp import dedup
+
+
+class Command(BaseCommand):
+    help = "Delete webhook de-duplication entries older than WHATSAPP_DEDUP_TTL_HOURS."
+
+    def handle(self, *args, **options):
+        deleted = dedup.prune_expired()
+        self.stdout.write(f"Deleted {deleted} processed message id(s).")
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+import structlog
+
+
+logger = structlog.get_logger(__name__)
+
+# Number of timing samples kept per metric (per process)
+SAMPLE_SIZE = 2048
+
+_lock = threading.Lock()
+_counters: Counter[str] = Counter()
+_samples: dict[str, deque[float]] = {}
+
+
+def incr(name: str, amount: int = 1) -> None:
+    """Increment an in-process counter."""
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(name: str, value: float) -> None:
+    """Record a timing/size sample (kept in a bounded ring buffer)."""
+    with _lock:
+        bucket = _samples.get(name)
+        if bucket is None:
+            bucket = _samples[name] = deque(maxlen=SAMPLE_SIZE)
+        bucket.append(float(value))
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Observe the wall time of the wrapped block in milliseconds."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - started) * 1000)
+
+
+def counter(name: str) -> int:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """Nearest-rank percentile; returns 0.0 for empty input."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(values: Iterable[float]) -> dict[str, float]:
+    data = list(values)
+    return {
+        "count": len(data),
+        "p50": round(percentile(data, 50), 3),
+        "p95": round(percentile(data, 95), 3),
+        "p99": round(percentile(data, 99), 3),
+        "max": round(max(data), 3) if data else 0.0,
+    }
+
+
+def snapshot() -> dict:
+    """Return counters and timing summaries collected in this process."""
+    with _lock:
+        counters = dict(_counters)
+        samples = {name: list(bucket) for name, bucket in _samples.items()}
+    return {
+        "counters": counters,
+        "timings": {name: summarize(values) for name, values in samples.items()},
+    }
+
+
+def log_snapshot(event: str = "metrics_snapshot", **extra) -> None:
+    logger.info(event, **extra, **snapshot())
+
+
+def reset() -> None:
+    """Clear all collected metrics (used by tests and benchmarks)."""
+    with _lock:
+        _counters.clear()
+        _samples.clear()
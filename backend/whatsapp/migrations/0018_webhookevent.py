@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("whatsapp", "0017_alter_dealreportsession_step"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("payload", models.JSONField()),
+                (
+                    "sender",
+                    models.CharField(
+                        blank=True,
+                        help_text="Digits-only sender of the first message; events of one sender are processed in order.",
+                        max_length=32,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "pending"),
+                            ("processing", "processing"),
+                            ("done", "done"),
+                            ("failed", "failed"),
+                        ],
+                        default="pending",
+                        max_length=12,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                ("locked_at", models.DateTimeField(blank=True, null=True)),
+                ("locked_by", models.CharField(blank=True, max_length=64)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+                ("messages_processed", models.PositiveIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "ordering": ["received_at"],
+                "indexes": [
+                    models.Index(fields=["status", "received_at"], name="wa_event_status_recv_idx"),
+                    models.Index(fields=["sender", "status"], name="wa_event_sender_status_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("whatsapp", "0018_webhookevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundMessage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("wa_number", models.CharField(help_text="Digits-only recipient.", max_length=32)),
+                ("payload", models.JSONField()),
+                (
+                    "fallback_payload",
+                    models.JSONField(
+                        blank=True,
+                        help_text="Sent instead of payload if the Graph API rejects it (e.g. buttons -> plain text).",
+                        null=True,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "pending"), ("sending", "sending"), ("sent", "sent")],
+                        default="pending",
+                        max_length=12,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("next_attempt_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("locked_at", models.DateTimeField(blank=True, null=True)),
+                ("locked_by", models.CharField(blank=True, max_length=64)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("last_status", models.PositiveSmallIntegerField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(fields=["status", "next_attempt_at"], name="wa_outbox_status_next_idx"),
+                    models.Index(fields=["wa_number", "status"], name="wa_outbox_number_status_idx"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="DeadLetterMessage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("outbound_id", models.BigIntegerField(help_text="Id of the original OutboundMessage.")),
+                ("wa_number", models.CharField(max_length=32)),
+                ("payload", models.JSONField()),
+                ("fallback_payload", models.JSONField(blank=True, null=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_status", models.PositiveSmallIntegerField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(help_text="When the original message was queued.")),
+                ("failed_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["-failed_at"],
+                "indexes": [
+                    models.Index(fields=["wa_number", "failed_at"], name="wa_deadletter_number_idx"),
+                ],
+            },
+        ),
+    ]
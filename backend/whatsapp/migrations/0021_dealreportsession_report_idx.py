@@ -0,0 +1,19 @@
+import django.db.models.fields.json
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built concurrently so deal sessions stay writable while it builds
+    atomic = False
+
+    dependencies = [
+        ('whatsapp', '0020_processedmessage'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='dealreportsession',
+            index=models.Index(django.db.models.fields.json.KeyTextTransform('price_report_id', 'data'), name='deal_session_report_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Reports now point at their session (PriceReport.deal_session)
+    atomic = False
+
+    dependencies = [
+        ('whatsapp', '0021_dealreportsession_report_idx'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='dealreportsession',
+            name='deal_session_report_idx',
+        ),
+    ]
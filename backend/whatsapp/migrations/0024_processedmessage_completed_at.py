@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("whatsapp", "0023_webhookevent_next_attempt_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="processedmessage",
+            name="completed_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Set once the reply was sent or queued; unset while the message is being handled.",
+                null=True,
+            ),
+        ),
+    ]
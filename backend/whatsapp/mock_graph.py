@@ -0,0 +1,127 @@
+"""Local stand-in for the Graph API ``/<phone_id>/messages`` endpoint.
+
+Used by tests and by ``manage.py bench_outbound``. It speaks HTTP/1.1 with
+keep-alive, records every request, can add artificial latency and can be
+scripted to answer with errors (e.g. 429 with ``Retry-After``) or to drop the
+connection after reading a request.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+# Scripted "status": close the connection without answering
+DROP = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.state_lock:
+            self.server.connections += 1
+
+    def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw.decode("utf-8") or "{}")
+        except ValueError:
+            body = {"_raw": raw.decode("utf-8", "replace")}
+        with self.server.state_lock:
+            self.server.requests.append({"path": self.path, "headers": dict(self.headers), "body": body})
+            scripted = self.server.scripted.popleft() if self.server.scripted else None
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        status, retry_after = scripted or (200, None)
+        if status == DROP:
+            self.close_connection = True
+            return
+        if 200 <= status < 300:
+            payload = {"messages": [{"id": f"wamid.mock.{next(self.server.ids)}"}]}
+        else:
+            payload = {"error": {"code": status, "message": "scripted failure"}}
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - keep test output quiet
+        return
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, latency: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency = latency
+        self.state_lock = threading.Lock()
+        self.requests: list[dict] = []
+        self.scripted: deque = deque()
+        self.connections = 0
+        self.ids = itertools.count(1)
+
+
+class MockGraphServer:
+    """Context manager running the mock endpoint on an ephemeral localhost port."""
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self._server = _Server((host, port), _Handler, latency=latency)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v20.0"
+
+    @property
+    def requests(self) -> list[dict]:
+        with self._server.state_lock:
+            return list(self._server.requests)
+
+    @property
+    def connections(self) -> int:
+        with self._server.state_lock:
+            return self._server.connections
+
+    def fail_next(self, status: int, count: int = 1, retry_after: Optional[float] = None) -> None:
+        """Answer the next ``count`` requests with ``status``."""
+        with self._server.state_lock:
+            self._server.scripted.extend([(status, retry_after)] * count)
+
+    def drop_next(self, count: int = 1) -> None:
+        """Read the next ``count`` requests, then close the connection without answering."""
+        with self._server.state_lock:
+            self._server.scripted.extend([(DROP, None)] * count)
+
+    def start(self) -> "MockGraphServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-graph", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "MockGraphServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import uuid
 from django.db import models
+from django.utils import timezone
 
 
 class WAUser(models.Model):
@@ -122,3 +123,113 @@ class DealLookupSession(models.Model):
         self.step = self.Steps.PRODUCT
         self.data = {}
         self.is_active = True
+
+
+class WebhookEvent(models.Model):
+    """Raw Meta webhook payload accepted by the async ingestion queue."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "pending"
+        PROCESSING = "processing", "processing"
+        DONE = "done", "done"
+        FAILED = "failed", "failed"
+
+    payload = models.JSONField()
+    sender = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text="Digits-only sender of the first message; events of one sender are processed in order.",
+    )
+    status = models.CharField(max_length=12, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    received_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=64, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    messages_processed = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "received_at"], name="wa_event_status_recv_idx"),
+            models.Index(fields=["sender", "status"], name="wa_event_sender_status_idx"),
+        ]
+        ordering = ["received_at"]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"WebhookEvent({self.pk}, {self.status})"
+
+
+class OutboundMessage(models.Model):
+    """Reply waiting in the outbox; delivered in order per recipient."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "pending"
+        SENDING = "sending", "sending"
+        SENT = "sent", "sent"
+
+    wa_number = models.CharField(max_length=32, help_text="Digits-only recipient.")
+    payload = models.JSONField()
+    fallback_payload = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Sent instead of payload if the Graph API rejects it (e.g. buttons -> plain text).",
+    )
+    status = models.CharField(max_length=12, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=64, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="wa_outbox_status_next_idx"),
+            models.Index(fields=["wa_number", "status"], name="wa_outbox_number_status_idx"),
+        ]
+        ordering = ["id"]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"OutboundMessage({self.pk}, {self.status})"
+
+
+class DeadLetterMessage(models.Model):
+    """Outbound message that could not be delivered."""
+
+    outbound_id = models.BigIntegerField(help_text="Id of the original OutboundMessage.")
+    wa_number = models.CharField(max_length=32)
+    payload = models.JSONField()
+    fallback_payload = models.JSONField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(help_text="When the original message was queued.")
+    failed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["wa_number", "failed_at"], name="wa_deadletter_number_idx"),
+        ]
+        ordering = ["-failed_at"]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"DeadLetterMessage({self.pk}, {self.wa_number})"
+
+
+class ProcessedMessage(models.Model):
+    """Inbound WhatsApp message id already handled (webhook de-duplication)."""
+
+    message_id = models.CharField(max_length=128, unique=True)
+    processed_at = models.DateTimeField(default=timezone.now, db_index=True)
+    completed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set once the reply was sent or queued; unset while the message is being handled.",
+    )
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"ProcessedMessage({self.message_id})"
@@ -0,0 +1,312 @@
+"""Persistent outbox for replies to WhatsApp users.
+
+Handlers enqueue ``OutboundMessage`` rows (when ``WHATSAPP_OUTBOX_ENABLED``)
+and ``manage.py dispatch_outbox`` delivers them over the pooled transport.
+
+* Order: a message is only claimed once every earlier message to the same
+  ``wa_number`` has been sent or dead-lettered, so one recipient never sees
+  replies out of order, while different recipients are sent concurrently.
+* Retries: network errors, 429 and 5xx are retried with full-jitter
+  exponential backoff, never sooner than the ``Retry-After`` header asks.
+* Dead letters: other 4xx responses switch to ``fallback_payload`` once (if
+  any); messages that still fail, or exhaust ``WHATSAPP_OUTBOX_MAX_ATTEMPTS``,
+  move to ``DeadLetterMessage``.
+* Several dispatcher processes can run: claims use ``FOR UPDATE SKIP LOCKED``
+  and results are only written by the worker that holds the lock. A message
+  is re-sent only if its worker died after sending and the lock expired.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Iterable, Optional
+
+import structlog
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, Min, OuterRef, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import DeadLetterMessage, OutboundMessage
+from .transport import SendResult, get_transport
+from .utils import _build_request, _log_send_result, send_whatsapp_texts, text_payload
+
+
+logger = structlog.get_logger(__name__)
+
+UNFINISHED_STATUSES = (OutboundMessage.Status.PENDING, OutboundMessage.Status.SENDING)
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, "WHATSAPP_OUTBOX_ENABLED", False))
+
+
+def _max_attempts() -> int:
+    return int(getattr(settings, "WHATSAPP_OUTBOX_MAX_ATTEMPTS", 8))
+
+
+def _lock_timeout() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "WHATSAPP_OUTBOX_LOCK_TIMEOUT", 120)))
+
+
+def backoff_delay(attempts: int, retry_after: Optional[float] = None) -> float:
+    """Seconds to wait before the next attempt (full jitter, capped)."""
+    base = float(getattr(settings, "WHATSAPP_OUTBOX_BACKOFF_BASE", 1.0))
+    cap = float(getattr(settings, "WHATSAPP_OUTBOX_BACKOFF_MAX", 300.0))
+    ceiling = min(cap, base * (2 ** max(0, attempts - 1)))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def enqueue(wa_number: str, payload: dict, fallback_payload: Optional[dict] = None) -> OutboundMessage:
+    message = OutboundMessage.objects.create(
+        wa_number=wa_number,
+        payload=payload,
+        fallback_payload=fallback_payload,
+    )
+    metrics.incr("outbox.enqueued")
+    return message
+
+
+def send_texts_later(messages: Iterable[tuple[str, str]]) -> int:
+    """Hand (recipient, body) texts to a background sender instead of sending inline.
+
+    With the outbox enabled they are queued in one INSERT, in the caller's
+    transaction. Otherwise one background thread sends them as a concurrent
+    batch once the transaction commits. Returns the number handed off.
+    """
+    messages = list(messages)
+    if not messages:
+        return 0
+    if is_enabled():
+        OutboundMessage.objects.bulk_create(
+            [OutboundMessage(wa_number=to, payload=text_payload(to, body)) for to, body in messages]
+        )
+        metrics.incr("outbox.enqueued", len(messages))
+        return len(messages)
+    transaction.on_commit(lambda: _background_sender().submit(_send_texts, messages))
+    return len(messages)
+
+
+_sender_lock = threading.Lock()
+_sender: Optional[ThreadPoolExecutor] = None
+
+
+def _background_sender() -> ThreadPoolExecutor:
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wa-notify")
+        return _sender
+
+
+def _send_texts(messages: list[tuple[str, str]]) -> None:
+    started = time.perf_counter()
+    try:
+        sent = sum(send_whatsapp_texts(messages))
+    except Exception:
+        logger.exception("background_send_failed", count=len(messages))
+        return
+    metrics.observe("outbox.background_send_ms", (time.perf_counter() - started) * 1000)
+    logger.info("background_send_done", count=len(messages), sent=sent)
+
+
+def claim_messages(worker_id: str, limit: int = 50) -> list[OutboundMessage]:
+    """Lock up to ``limit`` due messages, at most one per recipient."""
+    now = timezone.now()
+    stale_before = now - _lock_timeout()
+    earlier_unsent = OutboundMessage.objects.filter(
+        wa_number=OuterRef("wa_number"),
+        id__lt=OuterRef("id"),
+        status__in=UNFINISHED_STATUSES,
+    )
+    with transaction.atomic():
+        ids = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(
+                Q(status=OutboundMessage.Status.PENDING, next_attempt_at__lte=now)
+                | Q(status=OutboundMessage.Status.SENDING, locked_at__lt=stale_before)
+            )
+            .filter(~Exists(earlier_unsent))
+            .order_by("id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        OutboundMessage.objects.filter(pk__in=ids).update(
+            status=OutboundMessage.Status.SENDING,
+            locked_at=now,
+            locked_by=worker_id[:64],
+            attempts=F("attempts") + 1,
+        )
+    return list(OutboundMessage.objects.filter(pk__in=ids).order_by("id"))
+
+
+def _owned(message: OutboundMessage):
+    return OutboundMessage.objects.filter(
+        pk=message.pk, status=OutboundMessage.Status.SENDING, locked_by=message.locked_by
+    )
+
+
+def _mark_sent(message: OutboundMessage, result: SendResult) -> None:
+    now = timezone.now()
+    _owned(message).update(
+        status=OutboundMessage.Status.SENT,
+        sent_at=now,
+        locked_at=None,
+        last_status=result.status,
+        last_error="",
+    )
+    metrics.incr("outbox.sent")
+    metrics.observe("outbox.delivery_latency_ms", (now - message.created_at).total_seconds() * 1000)
+
+
+def _schedule_retry(message: OutboundMessage, result: SendResult) -> None:
+    delay = backoff_delay(message.attempts, result.retry_after)
+    _owned(message).update(
+        status=OutboundMessage.Status.PENDING,
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        locked_at=None,
+        last_status=result.status,
+        last_error=result.error[:2000],
+    )
+    metrics.incr("outbox.retried")
+    logger.warning(
+        "outbox_send_retry",
+        message_id=message.pk,
+        attempts=message.attempts,
+        status=result.status,
+        delay_s=round(delay, 3),
+    )
+
+
+def _use_fallback(message: OutboundMessage, result: SendResult) -> None:
+    _owned(message).update(
+        status=OutboundMessage.Status.PENDING,
+        payload=message.fallback_payload,
+        fallback_payload=None,
+        next_attempt_at=timezone.now(),
+        locked_at=None,
+        last_status=result.status,
+        last_error=result.error[:2000],
+    )
+    metrics.incr("outbox.fallback_used")
+
+
+def _dead_letter(message: OutboundMessage, result: SendResult) -> None:
+    with transaction.atomic():
+        deleted, _ = _owned(message).delete()
+        if not deleted:
+            return
+        DeadLetterMessage.objects.create(
+            outbound_id=message.pk,
+            wa_number=message.wa_number,
+            payload=message.payload,
+            fallback_payload=message.fallback_payload,
+            attempts=message.attempts,
+            last_status=result.status,
+            last_error=result.error[:2000],
+            created_at=message.created_at,
+        )
+    metrics.incr("outbox.dead_lettered")
+    logger.error(
+        "outbox_message_dead_lettered",
+        message_id=message.pk,
+        attempts=message.attempts,
+        status=result.status,
+    )
+
+
+def _record_result(message: OutboundMessage, result: SendResult) -> None:
+    if result.ok:
+        _mark_sent(message, result)
+    elif not result.retryable and message.fallback_payload:
+        _use_fallback(message, result)
+    elif result.retryable and message.attempts < _max_attempts():
+        _schedule_retry(message, result)
+    else:
+        _dead_letter(message, result)
+
+
+def deliver(messages: list[OutboundMessage], max_workers: Optional[int] = None) -> int:
+    """Send claimed messages concurrently and record each outcome. Returns sent count."""
+    if not messages:
+        return 0
+    requests = [_build_request(message.payload) for message in messages]
+    ready = [(message, req) for message, req in zip(messages, requests) if req is not None]
+    workers = max_workers or int(getattr(settings, "WHATSAPP_SEND_CONCURRENCY", 8))
+    started = time.perf_counter()
+    results = get_transport().send_many([req for _message, req in ready], max_workers=workers)
+    metrics.observe("outbox.batch_send_ms", (time.perf_counter() - started) * 1000)
+
+    outcomes = dict(zip((message.pk for message, _req in ready), results))
+    sent = 0
+    for message in messages:
+        # Missing credentials count as a transient failure so nothing is lost.
+        result = outcomes.get(message.pk) or SendResult(ok=False, error="credentials missing")
+        _log_send_result(result)
+        _record_result(message, result)
+        sent += int(result.ok)
+    return sent
+
+
+def drain(worker_id: str, batch_size: int = 50) -> int:
+    """Claim and deliver one batch. Returns the number of claimed messages."""
+    messages = claim_messages(worker_id, limit=batch_size)
+    deliver(messages)
+    return len(messages)
+
+
+def requeue_dead_letters(ids: Optional[Iterable[int]] = None) -> int:
+    """Move dead letters back into the outbox (appended after newer messages)."""
+    qs = DeadLetterMessage.objects.order_by("failed_at", "id")
+    if ids is not None:
+        qs = qs.filter(pk__in=list(ids))
+    count = 0
+    with transaction.atomic():
+        for dead in qs.select_for_update():
+            OutboundMessage.objects.create(
+                wa_number=dead.wa_number,
+                payload=dead.payload,
+                fallback_payload=dead.fallback_payload,
+            )
+            dead.delete()
+            count += 1
+    logger.info("outbox_dead_letters_requeued", count=count)
+    return count
+
+
+def purge_sent(older_than: timedelta) -> int:
+    cutoff = timezone.now() - older_than
+    deleted, _ = OutboundMessage.objects.filter(
+        status=OutboundMessage.Status.SENT, sent_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def outbox_stats(latency_window: int = 500) -> dict:
+    """Outbox depth, dead letters and recent enqueue-to-sent latency."""
+    counts = dict(
+        OutboundMessage.objects.values_list("status").annotate(total=Count("id")).order_by()
+    )
+    oldest = OutboundMessage.objects.filter(status=OutboundMessage.Status.PENDING).aggregate(
+        oldest=Min("created_at")
+    )["oldest"]
+    recent = OutboundMessage.objects.filter(status=OutboundMessage.Status.SENT).order_by("-sent_at").values_list(
+        "created_at", "sent_at"
+    )[:latency_window]
+    latencies = [(sent - created).total_seconds() * 1000 for created, sent in recent if sent]
+    return {
+        "pending": counts.get(OutboundMessage.Status.PENDING, 0),
+        "sending": counts.get(OutboundMessage.Status.SENDING, 0),
+        "sent": counts.get(OutboundMessage.Status.SENT, 0),
+        "dead_letters": DeadLetterMessage.objects.count(),
+        "oldest_pending_age_s": round((timezone.now() - oldest).total_seconds(), 3) if oldest else 0.0,
+        "delivery_latency_ms": metrics.summarize(latencies),
+    }
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import structlog
+from structlog import contextvars as structlog_contextvars
+
+from .deal_flow import FlowMessage
+from .handlers import (
+    dispatch,
+    fallback_payload,
+    summarize_payload,
+    _build_user_context,
+)
+from . import dedup, outbox
+from .utils import (
+    buttons_payload,
+    normalize_wa_id,
+    send_whatsapp_buttons,
+    send_whatsapp_text,
+    text_payload,
+)
+
+
+logger = structlog.get_logger(__name__)
+
+
+def iter_messages(payload: dict):
+    """Yield (msg, contacts, value) for every inbound message in a webhook payload.
+
+    WhatsApp webhook structure: entry -> changes -> value -> messages[]
+    """
+    for entry in payload.get("entry", []) or []:
+        for change in entry.get("changes", []) or []:
+            value = change.get("value", {}) or {}
+            messages = value.get("messages", []) or []
+            if not messages:
+                continue
+            contacts = {c.get("wa_id"): c for c in value.get("contacts", []) or []}
+            for msg in messages:
+                yield msg, contacts, value
+
+
+def first_sender(payload: dict) -> str:
+    """Digits-only sender of the first message in the payload ("" if none)."""
+    for msg, _contacts, _value in iter_messages(payload):
+        sender = normalize_wa_id(str(msg.get("from", "")))
+        if sender:
+            return sender
+    return ""
+
+
+def process_webhook_payload(
+    payload: dict,
+    *,
+    fallback_on_error: bool = True,
+    retrying: bool = False,
+) -> int:
+    """Run the handler chain for every message of a decoded webhook payload.
+
+    Returns the number of messages that produced a reply. Used both by the
+    synchronous webhook view and by the async ingestion workers. With
+    ``fallback_on_error`` a failing handler is answered with the intro/help
+    message; the workers pass False so the error reaches the queue's retry path.
+
+    A message id is claimed before handling and completed once its reply was
+    sent or queued; any failure releases it so a retry is handled again. With
+    ``retrying`` (an event that was claimed before) only completed ids are
+    skipped, since a worker that died mid-message could not release its ids.
+    """
+    processed: int = 0
+    for msg, contacts, value in iter_messages(payload):
+        structlog_contextvars.clear_contextvars()
+        wa_raw = str(msg.get("from", ""))
+        wa_norm = normalize_wa_id(wa_raw)
+        logger.info("webhook_processing_message", wa_raw=wa_raw, message=msg)
+        if not wa_norm:
+            logger.warning("webhook_unable_to_normalize_wa", wa_raw=wa_raw)
+            continue
+
+        # Drop redelivered messages before touching the user or any session
+        message_id = str(msg.get("id") or "")
+        claimed = dedup.reclaim_message(message_id) if retrying else dedup.claim_message(message_id)
+        if not claimed:
+            continue
+
+        try:
+            _handle_message(wa_norm, msg, contacts, value, fallback_on_error=fallback_on_error)
+        except Exception:
+            dedup.release_message(message_id)
+            raise
+        dedup.complete_message(message_id)
+        processed += 1
+    return processed
+
+
+def _handle_message(wa_norm: str, msg: dict, contacts: dict, value: dict, *, fallback_on_error: bool) -> None:
+    """Resolve the user and send (or queue) exactly one reply for ``msg``."""
+    ctx = _build_user_context(wa_norm=wa_norm, msg=msg, contacts=contacts, value=value)
+    logger.info(
+        "webhook_user_resolved",
+        user_id=ctx.user.pk,
+        created=ctx.created,
+        wa_number=ctx.wa_norm,
+        locale=ctx.current_locale,
+    )
+
+    # Generic state-machine evaluation via handlers
+    state = None
+    try:
+        state, reply = dispatch(ctx, msg)
+        if reply:
+            logger.info("handler_state", state=state, wa_hash=ctx.wa_hash)
+            _send_flow_message(ctx.wa_norm, reply)
+            logger.info(
+                "handler_response_sent",
+                wa_hash=ctx.wa_hash,
+                payload=summarize_payload(reply),
+            )
+            return
+    except Exception:
+        if not fallback_on_error:
+            raise
+        logger.exception("handler_send_failed", wa_hash=ctx.wa_hash)
+
+    # Fallback: intro/help
+    state = state or "FALLBACK"
+    fallback = fallback_payload(ctx)
+    logger.info("handler_fallback_intro", state=state, wa_hash=ctx.wa_hash)
+    _send_flow_message(ctx.wa_norm, fallback)
+    logger.info(
+        "handler_fallback_response",
+        wa_hash=ctx.wa_hash,
+        payload=summarize_payload(fallback),
+    )
+
+
+def _send_flow_message(recipient: str, payload: FlowMessage | str) -> None:
+    if outbox.is_enabled():
+        _enqueue_flow_message(recipient, payload)
+        return
+    if isinstance(payload, FlowMessage):
+        text = payload.text
+        buttons = payload.buttons or []
+        if buttons:
+            sent = send_whatsapp_buttons(recipient, text, buttons)
+            if not sent:
+                send_whatsapp_text(recipient, text)
+        else:
+            send_whatsapp_text(recipient, text)
+    else:
+        send_whatsapp_text(recipient, payload)
+
+
+def _enqueue_flow_message(recipient: str, payload: FlowMessage | str) -> None:
+    """Queue the reply in the outbox; buttons fall back to plain text if rejected."""
+    if isinstance(payload, FlowMessage):
+        message = buttons_payload(recipient, payload.text, payload.buttons or [])
+        fallback = text_payload(recipient, payload.text) if message["type"] == "interactive" else None
+        outbox.enqueue(recipient, message, fallback)
+    else:
+        outbox.enqueue(recipient, text_payload(recipient, payload))
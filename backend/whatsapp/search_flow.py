@@ -1,34 +1,55 @@
 from __future__ import annotations
+import re
 from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
 from typing import Optional
 
-from django.db.models import Q
-from django.utils import translation
+from django.conf import settings
+from django.contrib.gis.db.models import PointField
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import F, FloatField, Func, Value
+from django.utils import timezone, translation
 from django.utils.translation import gettext as _
 import structlog
 
-from pricing.models import PriceReport
-from stores.models import Store
+from catalog.models import normalize_product_text
+from catalog.search import text_match
+from pricing.models import StoreProductSnapshot
+from stores import city_index
 from .text_normalization import is_keyword_norm, normalize_for_match
+from .unit_translations import UNIT_REGISTRY, base_unit, get_unit_label_for_locale
+from . import user_cache
 from .models import DealLookupSession, WAUser
 
 
 RESULT_LIMIT = 5
 
+# "milk per liter", "חלב לליטר": rank by price per liter/kg/unit instead of relevance
+_PER_UNIT_RE = re.compile(r"^(?P<product>.+?)\s+(?:per\s+|ל)(?P<unit>\S+)\s*$", re.IGNORECASE)
+
 logger = structlog.get_logger(__name__)
 
 
 def start_find_deal_flow(user: WAUser, locale: str) -> str:
     DealLookupSession.objects.filter(user=user, is_active=True).update(is_active=False, step=DealLookupSession.Steps.CANCELED)
+    user_cache.forget_sessions(user.pk)
     session = DealLookupSession.objects.create(user=user)
     logger.info("find_deal_flow_started", session_id=session.pk, user_id=user.pk)
     return _question(session.step, locale)
 
 
 def handle_find_deal_text(
-    user: WAUser, locale: str, message_text: Optional[str], message_text_norm: Optional[str] = None
+    user: WAUser,
+    locale: str,
+    message_text: Optional[str],
+    message_text_norm: Optional[str] = None,
+    session: Optional[DealLookupSession] = None,
 ) -> Optional[str]:
-    session = _get_active_session(user)
+    if session is None:
+        session = _get_active_session(user)
     if not session or session.step == DealLookupSession.Steps.COMPLETE:
         return None
     text = (message_text or "").strip()
@@ -75,10 +96,14 @@ def handle_find_deal_text(
     return None
 
 
-def handle_find_deal_location(user: WAUser, locale: str, location_payload: dict) -> Optional[str]:
-    session = _get_active_session(user)
+def handle_find_deal_location(
+    user: WAUser, locale: str, location_payload: dict, session: Optional[DealLookupSession] = None
+) -> Optional[str]:
+    if session is None:
+        session = _get_active_session(user)
     if not session or session.step != DealLookupSession.Steps.LOCATION:
         return None
+    point = _payload_point(location_payload)
     logger.info(
         "find_deal_location_received",
         session_id=session.pk,
@@ -86,12 +111,29 @@ def handle_find_deal_location(user: WAUser, locale: str, location_payload: dict)
         latitude=location_payload.get("latitude"),
         longitude=location_payload.get("longitude"),
     )
-    with translation.override(locale):
-        return _("Please type the city name so I can find the right deals.")
+    if point is None:
+        with translation.override(locale):
+            return _("Please type the city name so I can find the right deals.")
+    session.data = {**(session.data or {}), "latitude": point.y, "longitude": point.x}
+    session.step = DealLookupSession.Steps.COMPLETE
+    session.is_active = False
+    session.save(update_fields=["data", "step", "is_active", "updated_at"])
+    return _format_results(session, locale)
+
+
+def _payload_point(location_payload: dict) -> Optional[Point]:
+    try:
+        latitude = float(location_payload.get("latitude"))
+        longitude = float(location_payload.get("longitude"))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return Point(longitude, latitude, srid=4326)
 
 
 def _get_active_session(user: WAUser) -> Optional[DealLookupSession]:
-    return DealLookupSession.objects.filter(user=user, is_active=True).order_by("-updated_at").first()
+    return user_cache.get_active_session(user, user_cache.LOOKUP)
 
 
 def _question(step: str, locale: str) -> str:
@@ -102,7 +144,7 @@ def _question(step: str, locale: str) -> str:
                 "Which brand do you prefer for this product? Type \"skip\" if you don't mind."
             ),
             DealLookupSession.Steps.LOCATION: _(
-                "Which city should I search in?"
+                "Which city should I search in? You can also share your location."
             ),
         }
         return prompts.get(step, _("Thanks!"))
@@ -113,44 +155,81 @@ def _format_results(session: DealLookupSession, locale: str) -> str:
     product_query = data.get("product_query")
     brand_query = data.get("brand_query")
     city_query = data.get("city")
+    point = _session_point(data)
     if not product_query:
         with translation.override(locale):
             return _("Please start again and tell me which product you want.")
-    if not city_query:
+    if point is None and not city_query:
         with translation.override(locale):
             return _("Please start again and tell me which city you want.")
 
-    deals = _fetch_deals(product_query, brand_query, city_query, locale)
+    search_query, per_unit = _split_per_unit(product_query)
+    if point is not None:
+        deals = _fetch_nearby_deals(search_query, brand_query, point, locale, per_unit=per_unit)
+    else:
+        deals = _fetch_deals(search_query, brand_query, city_query, locale, per_unit=per_unit)
     logger.info(
         "find_deal_results",
         session_id=session.pk,
         user_id=session.user_id,
         product=product_query,
         brand=brand_query or "any",
-        city=city_query,
+        city=city_query or "",
+        nearby=point is not None,
+        per_unit=per_unit or "",
         count=len(deals),
     )
     with translation.override(locale):
         if not deals:
-            return _(
-                "Sorry, I couldn't find any recent deals for %(product)s in %(city)s."
-                % {"product": product_query, "city": city_query}
-            )
+            if point is not None:
+                return _("Sorry, I couldn't find any recent deals for %(product)s near you.") % {
+                    "product": product_query
+                }
+            return _("Sorry, I couldn't find any recent deals for %(product)s in %(city)s.") % {
+                "product": product_query,
+                "city": city_query,
+            }
         lines = [_("Here are the latest deals:")]
         for deal in deals:
             brand_part = _(" (%(brand)s)") % {"brand": deal.brand} if deal.brand else ""
-            line = _("• %(product)s%(brand)s — %(price)s₪ at %(store)s (%(city)s)") % {
+            values = {
                 "product": deal.product_name,
                 "brand": brand_part,
                 "price": deal.price,
                 "store": deal.store_name,
                 "city": deal.city or "",
             }
+            if deal.distance_km is not None:
+                values["distance"] = f"{deal.distance_km:.1f}"
+                line = _("• %(product)s%(brand)s — %(price)s₪ at %(store)s (%(city)s, %(distance)s km)") % values
+            else:
+                line = _("• %(product)s%(brand)s — %(price)s₪ at %(store)s (%(city)s)") % values
+            if deal.unit_price is not None:
+                line += " · " + _("%(price)s₪ per %(unit)s") % {
+                    "price": deal.unit_price,
+                    "unit": get_unit_label_for_locale(per_unit, locale) or per_unit,
+                }
             lines.append(line)
         lines.append(_("Tip: tap “Add a deal” to share your own find."))
         return "\n".join(lines)
 
 
+def _split_per_unit(product_query: str) -> tuple[str, Optional[str]]:
+    """Split "milk per liter" into ("milk", "liter"); the unit is a base unit slug."""
+    match = _PER_UNIT_RE.match(product_query or "")
+    if match:
+        base = base_unit(UNIT_REGISTRY.match(match.group("unit")))
+        if base:
+            return match.group("product"), base[0]
+    return product_query, None
+
+
+def _session_point(data: dict) -> Optional[Point]:
+    if data.get("latitude") is None or data.get("longitude") is None:
+        return None
+    return _payload_point(data)
+
+
 @dataclass
 class DealResult:
     product_name: str
@@ -158,6 +237,42 @@ class DealResult:
     price: str
     store_name: str
     city: Optional[str]
+    distance_km: Optional[float] = None
+    unit_price: Optional[str] = None
+
+
+def _deals_queryset(
+    product_query: str,
+    brand_query: Optional[str],
+    city_query: str,
+    limit: int = RESULT_LIMIT,
+    per_unit: Optional[str] = None,
+):
+    """Best-matching snapshots (latest approved deal per store×product), at most ``limit``.
+
+    Reads only the ``StoreProductSnapshot`` read model: city equality and the
+    product text match are both answered by ``sps_city_search_idx``; the city
+    name is resolved in memory (``stores.city_index``). With
+    ``per_unit`` ("liter", "kilogram" or "unit") rows are ranked cheapest
+    first by normalized unit price, in ``sps_city_unit_price_idx`` order.
+    """
+    query_norm = normalize_product_text(product_query)
+    if not query_norm:
+        return StoreProductSnapshot.objects.none()
+    qs = StoreProductSnapshot.objects.filter(text_match(query_norm))
+    brand_norm = normalize_product_text(brand_query)
+    if brand_norm:
+        qs = qs.filter(text_match(brand_norm))
+    if (city_query or "").strip():
+        ids = city_index.city_ids(city_query)
+        qs = qs.filter(city_id=ids[0]) if len(ids) == 1 else qs.filter(city_id__in=ids)
+    if per_unit:
+        return qs.filter(normalized_unit=per_unit, normalized_unit_price__isnull=False).order_by(
+            "normalized_unit_price", "-last_observed_at", "-pk"
+        )[:limit]
+    return qs.annotate(rank=TrigramWordSimilarity(query_norm, "search_text")).order_by(
+        "-rank", "-last_observed_at", "-pk"
+    )[:limit]
 
 
 def _fetch_deals(
@@ -166,85 +281,102 @@ def _fetch_deals(
     city_query: str,
     locale: str,
     limit: int = RESULT_LIMIT,
+    per_unit: Optional[str] = None,
 ) -> list[DealResult]:
-    qs = (
-        PriceReport.objects.filter(needs_moderation=False)
-        .select_related("product", "store", "store__city_obj")
-        .order_by("-observed_at")
-    )
-    qs = qs.filter(_product_filter_for_locale(product_query, locale))
-    qs = qs.filter(_city_filter(city_query))
-    if brand_query:
-        qs = qs.filter(_brand_filter(brand_query))
-
-    seen: set[tuple[int, int, str]] = set()
-    results: list[DealResult] = []
     lang = _lang(locale)
-
-    for report in qs:
-        brand = (report.product.brand or "").strip()
-        dedupe_key = (report.store_id, report.product_id, brand.lower())
-        if dedupe_key in seen:
-            continue
-        seen.add(dedupe_key)
-        product_name = _result_product_name(report, lang)
-        results.append(
-            DealResult(
-                product_name=product_name,
-                brand=brand or None,
-                price=str(report.price),
-                store_name=report.store.display_name or report.store.name,
-                city=_store_city_display(report.store),
-            )
-        )
-        if len(results) >= limit:
-            break
-    return results
-
-
-def _store_city_display(store: Store) -> str:
-    if store.city_obj:
-        return store.city_obj.display_name
-    return store.city or store.city_en or store.city_he or ""
+    return [
+        _deal_result(snapshot, lang, per_unit=per_unit)
+        for snapshot in _deals_queryset(product_query, brand_query, city_query, limit, per_unit=per_unit)
+    ]
+
+
+def _deal_result(
+    snapshot: StoreProductSnapshot, lang: str, per_unit: Optional[str] = None, distance_km: Optional[float] = None
+) -> DealResult:
+    unit_price = None
+    if per_unit and snapshot.normalized_unit_price is not None:
+        unit_price = str(snapshot.normalized_unit_price.quantize(Decimal("0.01")))
+    return DealResult(
+        product_name=_result_product_name(snapshot, lang),
+        brand=snapshot.product_brand.strip() or None,
+        price=str(snapshot.last_price),
+        store_name=snapshot.store_display_name,
+        city=snapshot.store_city,
+        distance_km=distance_km,
+        unit_price=unit_price,
+    )
 
 
-def _product_filter_for_locale(product_query: str, locale: str) -> Q:
-    lang = _lang(locale)
-    if lang == "he":
-        base = Q(product__name_he__icontains=product_query)
-    else:
-        base = Q(product__name_en__icontains=product_query)
-    return base | Q(product_text_raw__icontains=product_query)
+class KNNDistance(Func):
+    """PostGIS ``<->``: index-assisted (GiST) distance, in meters for geography."""
 
+    arg_joiner = " <-> "
+    template = "(%(expressions)s)"
+    output_field = FloatField()
 
-def _brand_filter(brand_query: str) -> Q:
-    return (
-        Q(product__brand__icontains=brand_query)
-        | Q(product__name_he__icontains=brand_query)
-        | Q(product__name_en__icontains=brand_query)
-        | Q(product_text_raw__icontains=brand_query)
-    )
 
-
-def _city_filter(city_query: str) -> Q:
-    city = (city_query or "").strip()
-    if not city:
-        return Q()
-    return (
-        Q(store__city__iexact=city)
-        | Q(store__city_he__iexact=city)
-        | Q(store__city_en__iexact=city)
-        | Q(store__city_obj__name_he__iexact=city)
-        | Q(store__city_obj__name_en__iexact=city)
+def _nearby_deals_queryset(
+    product_query: str,
+    brand_query: Optional[str],
+    point: Point,
+    limit: int = RESULT_LIMIT,
+    radius_km: Optional[float] = None,
+    max_age_days: Optional[int] = None,
+    per_unit: Optional[str] = None,
+):
+    """Nearest snapshots to ``point`` with a recent approved deal, nearest then cheapest first.
+
+    ``ST_DWithin`` bounds the search to the radius and ``<->`` orders by
+    distance; both use ``sps_location_gist_idx``. With ``per_unit`` only
+    deals with that normalized unit are listed and ties go to the lower unit
+    price.
+    """
+    query_norm = normalize_product_text(product_query)
+    if not query_norm:
+        return StoreProductSnapshot.objects.none()
+    if radius_km is None:
+        radius_km = float(getattr(settings, "FIND_DEAL_RADIUS_KM", 15))
+    if max_age_days is None:
+        max_age_days = int(getattr(settings, "FIND_DEAL_MAX_AGE_DAYS", 30))
+    qs = StoreProductSnapshot.objects.filter(
+        text_match(query_norm),
+        location__dwithin=(point, D(km=radius_km)),
+        last_observed_at__gte=timezone.now() - timedelta(days=max_age_days),
     )
+    brand_norm = normalize_product_text(brand_query)
+    if brand_norm:
+        qs = qs.filter(text_match(brand_norm))
+    price_order = "last_price"
+    if per_unit:
+        qs = qs.filter(normalized_unit=per_unit, normalized_unit_price__isnull=False)
+        price_order = "normalized_unit_price"
+    origin = Value(point, output_field=PointField(geography=True, srid=4326))
+    return qs.annotate(distance_m=KNNDistance(F("location"), origin)).order_by(
+        "distance_m", price_order, "-pk"
+    )[:limit]
+
+
+def _fetch_nearby_deals(
+    product_query: str,
+    brand_query: Optional[str],
+    point: Point,
+    locale: str,
+    limit: int = RESULT_LIMIT,
+    per_unit: Optional[str] = None,
+) -> list[DealResult]:
+    lang = _lang(locale)
+    return [
+        _deal_result(snapshot, lang, per_unit=per_unit, distance_km=snapshot.distance_m / 1000)
+        for snapshot in _nearby_deals_queryset(product_query, brand_query, point, limit, per_unit=per_unit)
+    ]
 
 
-def _result_product_name(report: PriceReport, lang: str) -> str:
-    if report.product_text_raw:
-        return report.product_text_raw
+def _result_product_name(snapshot: StoreProductSnapshot, lang: str) -> str:
+    if snapshot.product_text_raw:
+        return snapshot.product_text_raw
     if lang == "he":
-        return report.product.name_he or report.product.name_en
-    return report.product.name_en or report.product.name_he
+        return snapshot.product_name_he or snapshot.product_name_en
+    return snapshot.product_name_en or snapshot.product_name_he
 
 
 def _lang(locale: str) -> str:
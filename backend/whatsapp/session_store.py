@@ -0,0 +1,132 @@
+"""Where the state (step, data) of in-progress deal-report flows is kept.
+
+Each inbound message applies one reply to the session and writes the result
+once, as a compare-and-set against the state the message was handled from,
+so two messages racing on the same session cannot both advance it
+(``StaleSession``). Backends (``WHATSAPP_DEAL_SESSION_STORE``):
+
+``db`` (default)
+    The ``DealReportSession`` row is the state: one conditional ``UPDATE``
+    per message, guarded by the step and ``updated_at`` that were loaded.
+``cache``
+    The state lives in the Django cache (use a shared backend such as
+    Redis) under a version counter; ``cache.add`` of the next version is the
+    compare-and-set. The row is written only at checkpoints: when the flow
+    completes or is canceled, and every
+    ``WHATSAPP_DEAL_SESSION_CHECKPOINT_STEPS`` writes in between. If the
+    cache entry is lost, the flow resumes from the last checkpoint.
+"""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import metrics, user_cache
+from .models import DealReportSession
+
+
+# Seconds a compare-and-set marker is kept (longer than any one message takes)
+CAS_MARKER_TTL = 300
+
+
+class StaleSession(Exception):
+    """Another message already moved the session past the state this one was handled from."""
+
+
+def _write_row(session: DealReportSession, **conditions) -> bool:
+    now = timezone.now()
+    updated = DealReportSession.objects.filter(pk=session.pk, **conditions).update(
+        step=session.step, data=session.data, is_active=session.is_active, updated_at=now
+    )
+    if not updated:
+        return False
+    session.updated_at = now
+    # QuerySet.update skips post_save: keep the cached active-session pointer in sync
+    user_cache.session_saved(session)
+    metrics.incr("deal_session.row_write")
+    return True
+
+
+class DatabaseSessionStore:
+    name = "db"
+
+    def load(self, session: DealReportSession) -> Any:
+        """Bring ``session`` up to date and return the token ``save`` compares against."""
+        return (session.step, session.updated_at)
+
+    def save(self, session: DealReportSession, token: Any) -> None:
+        step, updated_at = token
+        if not _write_row(session, step=step, updated_at=updated_at):
+            raise StaleSession(session.pk)
+
+    def checkpoint(self, session: DealReportSession) -> None:
+        """Write the row now (e.g. after recording the created price report)."""
+        _write_row(session)
+
+
+class CacheSessionStore:
+    name = "cache"
+
+    @staticmethod
+    def _key(session_id) -> str:
+        return f"wa:deal_session:{session_id}"
+
+    @staticmethod
+    def _ttl() -> int:
+        return int(getattr(settings, "WHATSAPP_DEAL_SESSION_TTL", 24 * 3600))
+
+    @staticmethod
+    def _checkpoint_every() -> int:
+        return max(1, int(getattr(settings, "WHATSAPP_DEAL_SESSION_CHECKPOINT_STEPS", 5)))
+
+    def load(self, session: DealReportSession) -> Any:
+        state = cache.get(self._key(session.pk))
+        if state is None:
+            # Versions restart from the last checkpoint; the epoch keeps their markers apart
+            return {"epoch": f"{session.updated_at.timestamp():.6f}", "version": 0, "unsaved": 0}
+        session.step, session.data, session.is_active = state["step"], state["data"], state["is_active"]
+        return state
+
+    def save(self, session: DealReportSession, token: Any) -> None:
+        key = self._key(session.pk)
+        version = token["version"] + 1
+        # cache.add is atomic: only the first writer of a version wins it. The
+        # marker only has to outlive messages handled concurrently.
+        if not cache.add(f"{key}:{token['epoch']}:{version}", 1, CAS_MARKER_TTL):
+            raise StaleSession(session.pk)
+        unsaved = token["unsaved"] + 1
+        if not session.is_active or unsaved >= self._checkpoint_every():
+            _write_row(session)
+            unsaved = 0
+        if not session.is_active:
+            cache.delete(key)
+            return
+        cache.set(
+            key,
+            {
+                "step": session.step,
+                "data": session.data,
+                "is_active": session.is_active,
+                "epoch": token["epoch"],
+                "version": version,
+                "unsaved": unsaved,
+            },
+            self._ttl(),
+        )
+
+    def checkpoint(self, session: DealReportSession) -> None:
+        _write_row(session)
+
+
+_STORES = {store.name: store for store in (DatabaseSessionStore(), CacheSessionStore())}
+
+
+def get_store(name: Optional[str] = None):
+    name = name or getattr(settings, "WHATSAPP_DEAL_SESSION_STORE", "db")
+    try:
+        return _STORES[name]
+    except KeyError:
+        raise ValueError(f"Unknown WHATSAPP_DEAL_SESSION_STORE {name!r}; expected one of {sorted(_STORES)}") from None
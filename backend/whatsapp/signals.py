@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import user_cache
+from .models import DealLookupSession, DealReportSession, WAUser
+
+
+@receiver(post_save, sender=WAUser)
+def _invalidate_cached_user(sender, instance: WAUser, **kwargs) -> None:
+    user_cache.invalidate_user(instance)
+
+
+@receiver(post_delete, sender=WAUser)
+def _drop_cached_user(sender, instance: WAUser, **kwargs) -> None:
+    user_cache.invalidate_user(instance)
+    user_cache.forget_sessions(instance.pk)
+
+
+@receiver(post_save, sender=DealReportSession)
+@receiver(post_save, sender=DealLookupSession)
+def _track_active_session(sender, instance, **kwargs) -> None:
+    user_cache.session_saved(instance)
+
+
+@receiver(post_delete, sender=DealReportSession)
+@receiver(post_delete, sender=DealLookupSession)
+def _drop_session_pointer(sender, instance, **kwargs) -> None:
+    user_cache.forget_sessions(instance.user_id)
@@ -11,6 +11,7 @@ from whatsapp.deal_flow import (
     start_add_deal_flow,
     handle_deal_flow_response,
     _find_store_candidates,
+    _get_or_create_store,
     FlowMessage,
 )
 from pricing.models import PriceReport
@@ -48,7 +49,7 @@ class DealFlowTests(TestCase):
             response = handle_deal_flow_response(self.user, locale, answer)
             self.assertIn(expected_prompt.lower(), self._text(response).lower())
 
-        summary = handle_deal_flow_response(self.user, locale, "100")
+        summary = handle_deal_flow_response(self.user, locale, "100", message_id="wamid.final")
         summary_text = self._text(summary)
         self.assertIn("Store: Shufersal", summary_text)
         self.assertIn("Branch or address: Givat Tal", summary_text)
@@ -73,6 +74,8 @@ class DealFlowTests(TestCase):
         self.assertTrue(pr.needs_moderation)
         self.assertIn("Limit per shopper", pr.deal_notes)
         self.assertEqual(pr.product_text_raw, "Milk 3% 1L")
+        self.assertEqual(pr.wa_message_id, "wamid.final")
+        self.assertEqual(pr.deal_session_id, session.pk)
         self.assertEqual(pr.product.brand, "Tnuva")
         self.assertEqual(pr.unit_measure_type, "Liter")
         self.assertEqual(pr.unit_measure_quantity, Decimal("1.00"))
@@ -253,6 +256,26 @@ class DealFlowTests(TestCase):
         report = PriceReport.objects.get()
         self.assertEqual(report.store_id, store.id)
 
+    def test_saving_never_attaches_a_fuzzy_or_other_branch_match(self):
+        center = Store.objects.create(
+            name="Shufersal",
+            display_name="Shufersal Center",
+            city="Rosh HaAyin",
+            city_obj=self.city,
+        )
+        Store.objects.create(name="Victory", city="Rosh HaAyin", city_obj=self.city, is_active=False)
+        data = {"city_id": str(self.city.id), "city": "Rosh HaAyin"}
+
+        same_branch = _get_or_create_store({**data, "store_name": "Shufersal", "store_detail": "Center"})
+        other_branch = _get_or_create_store({**data, "store_name": "Shufersal", "store_detail": "Givat Tal"})
+        typo = _get_or_create_store({**data, "store_name": "Shufersl", "store_detail": ""})
+        inactive = _get_or_create_store({**data, "store_name": "Victory", "store_detail": ""})
+
+        self.assertEqual(same_branch.pk, center.pk)
+        self.assertNotEqual(other_branch.pk, center.pk)
+        self.assertNotEqual(typo.pk, center.pk)
+        self.assertTrue(inactive.is_active)
+
     def test_hebrew_variants_return_identical_store_candidates(self):
         Store.objects.create(
             name="ויקטורי",
@@ -307,6 +330,18 @@ class DealFlowTests(TestCase):
         summary = handle_deal_flow_response(self.user, locale, "no")
         self.assertIn("Milk 3% 1L", self._text(summary))
 
+    def test_unit_quantity_accepts_quantity_with_unit(self):
+        locale = "en"
+        start_add_deal_flow(self.user, locale)
+        for answer in ("ראש העין", "Shufersal", "Givat Tal", "Milk 3% 1L", "skip", "Units", "Liter"):
+            handle_deal_flow_response(self.user, locale, answer)
+        retry_prompt = handle_deal_flow_response(self.user, locale, "500 g")
+        self.assertIn("numeric quantity", self._text(retry_prompt).lower())
+        price_prompt = handle_deal_flow_response(self.user, locale, "1.5 ליטר")
+        self.assertIn("what is the price", self._text(price_prompt).lower())
+        session = DealReportSession.objects.filter(user=self.user).latest("updated_at")
+        self.assertEqual(session.data.get("unit_quantity"), "1.50")
+
     def test_weight_category_skips_unit_type(self):
         locale = "en"
         start_add_deal_flow(self.user, locale)
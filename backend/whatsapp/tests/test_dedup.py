@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from whatsapp import dedup, metrics
+from whatsapp.models import ProcessedMessage
+from whatsapp.processing import process_webhook_payload
+
+
+def _payload(message_id: str) -> dict:
+    return {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "messages": [
+                                {"from": "972500000001", "id": message_id, "type": "text", "text": {"body": "hi"}}
+                            ]
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+
+
+@override_settings(WA_SALT="salt")
+class WebhookDedupTests(TestCase):
+    def setUp(self) -> None:
+        metrics.reset()
+        dedup.clear_local_cache()
+
+    def test_claim_rejects_seen_ids_and_counts_duplicates(self):
+        self.assertTrue(dedup.claim_message("wamid.1"))
+        self.assertFalse(dedup.claim_message("wamid.1"))
+        dedup.clear_local_cache()
+        self.assertFalse(dedup.claim_message("wamid.1"))
+        self.assertEqual(metrics.counter("webhook.duplicates_dropped"), 2)
+        self.assertEqual(metrics.counter("webhook.duplicates_dropped.db"), 1)
+        self.assertTrue(dedup.claim_message(""))
+
+    @mock.patch("whatsapp.processing._build_user_context")
+    def test_redelivered_message_is_dropped_before_user_context(self, mock_ctx):
+        dedup.claim_message("wamid.done")
+        self.assertEqual(process_webhook_payload(_payload("wamid.done")), 0)
+        mock_ctx.assert_not_called()
+
+    @mock.patch("whatsapp.processing._build_user_context", side_effect=RuntimeError("boom"))
+    def test_failure_before_handling_releases_the_id(self, _mock_ctx):
+        with self.assertRaises(RuntimeError):
+            process_webhook_payload(_payload("wamid.retry"))
+        self.assertFalse(ProcessedMessage.objects.filter(message_id="wamid.retry").exists())
+        self.assertTrue(dedup.claim_message("wamid.retry"))
+
+    @mock.patch("whatsapp.processing._send_flow_message")
+    @mock.patch("whatsapp.processing.dispatch", side_effect=RuntimeError("boom"))
+    def test_handler_failure_releases_the_id(self, _mock_dispatch, mock_send):
+        with self.assertRaises(RuntimeError):
+            process_webhook_payload(_payload("wamid.handler"), fallback_on_error=False)
+        mock_send.assert_not_called()
+        self.assertFalse(ProcessedMessage.objects.filter(message_id="wamid.handler").exists())
+
+    @mock.patch("whatsapp.processing._handle_message")
+    def test_retried_event_is_handled_even_if_the_id_was_marked(self, mock_handle):
+        # A worker that died mid-message left the id marked without a reply
+        dedup.claim_message("wamid.orphan")
+        self.assertEqual(process_webhook_payload(_payload("wamid.orphan"), retrying=True), 1)
+        mock_handle.assert_called_once()
+        self.assertFalse(dedup.claim_message("wamid.orphan"))
+
+    def test_prune_expired_entries(self):
+        ProcessedMessage.objects.create(message_id="old", processed_at=timezone.now() - timedelta(days=30))
+        ProcessedMessage.objects.create(message_id="new")
+        self.assertEqual(dedup.prune_expired(), 1)
+        self.assertEqual(list(ProcessedMessage.objects.values_list("message_id", flat=True)), ["new"])
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from django.test import TestCase, override_settings
+
+from whatsapp import metrics
+from whatsapp.deal_flow import start_add_deal_flow
+from whatsapp.handlers import _build_user_context, dispatch
+from whatsapp.models import DealReportSession, WAUser
+from whatsapp.search_flow import start_find_deal_flow
+from whatsapp.utils import compute_wa_hash
+
+
+def _msg(text: str) -> dict:
+    return {"from": "972500000001", "id": "wamid.x", "type": "text", "text": {"body": text}}
+
+
+@override_settings(WA_SALT="salt")
+class DispatchTests(TestCase):
+    def setUp(self) -> None:
+        metrics.reset()
+        self.user = WAUser.objects.create(
+            wa_id_hash=compute_wa_hash("972500000001"),
+            wa_number="972500000001",
+            wa_last4="0001",
+            locale="en",
+        )
+
+    def _ctx(self, text: str):
+        return _build_user_context(wa_norm="972500000001", msg=_msg(text), contacts={}, value={})
+
+    def test_idle_user_loads_flows_with_a_single_query(self):
+        ctx = self._ctx("what is this")
+        with self.assertNumQueries(1):
+            state, reply = dispatch(ctx, _msg("what is this"))
+        self.assertIsNone(state)
+        self.assertIsNone(reply)
+        self.assertEqual(metrics.counter("webhook.handler.NONE"), 1)
+        self.assertEqual(metrics.snapshot()["timings"]["webhook.dispatch_ms"]["count"], 1)
+
+    def test_active_deal_flow_routes_to_step_handler(self):
+        start_add_deal_flow(self.user, "en")
+        ctx = self._ctx("Haifa")
+        state, reply = dispatch(ctx, _msg("Haifa"))
+        self.assertEqual(state, "DEAL_FLOW_CONT")
+        self.assertIsNotNone(reply)
+        self.assertNotEqual(
+            DealReportSession.objects.get(user=self.user, is_active=True).step,
+            DealReportSession.Steps.CITY,
+        )
+
+    def test_active_lookup_flow_routes_to_find_handler(self):
+        start_find_deal_flow(self.user, "en")
+        state, reply = dispatch(self._ctx("Milk"), _msg("Milk"))
+        self.assertEqual(state, "FIND_TEXT")
+        self.assertIn("brand", reply.lower())
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hmac
+import json
+from hashlib import sha256
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from whatsapp import ingest
+from whatsapp.models import WebhookEvent
+
+
+def _payload(sender: str, text: str = "hi") -> dict:
+    return {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "messages": [
+                                {"from": sender, "id": f"wamid.{sender}.{text}", "type": "text", "text": {"body": text}}
+                            ]
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+
+
+@override_settings(META_APP_SECRET="app-secret", WHATSAPP_WEBHOOK_ASYNC=True, WHATSAPP_WEBHOOK_MAX_ATTEMPTS=2)
+class WebhookIngestTests(TestCase):
+    def _post(self, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        signature = hmac.new(b"app-secret", msg=body, digestmod=sha256).hexdigest()
+        return self.client.post(
+            reverse("whatsapp-webhook"),
+            data=body,
+            content_type="application/json",
+            HTTP_X_HUB_SIGNATURE_256=f"sha256={signature}",
+        )
+
+    @mock.patch("whatsapp.views.process_webhook_payload")
+    def test_async_mode_enqueues_and_acknowledges(self, mock_process):
+        response = self._post(_payload("972500000001"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "queued")
+        mock_process.assert_not_called()
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.sender, "972500000001")
+        self.assertEqual(event.status, WebhookEvent.Status.PENDING)
+
+    def test_status_only_payload_is_not_queued(self):
+        response = self._post({"entry": [{"changes": [{"value": {"statuses": [{"id": "x"}]}}]}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 0)
+
+    def test_claim_keeps_per_sender_order(self):
+        first = ingest.enqueue_payload(_payload("972500000001", "one"))
+        ingest.enqueue_payload(_payload("972500000001", "two"))
+        other = ingest.enqueue_payload(_payload("972500000002", "three"))
+
+        claimed = ingest.claim_events("worker-a", limit=10)
+        self.assertEqual([e.pk for e in claimed], [first.pk, other.pk])
+        self.assertTrue(all(e.status == WebhookEvent.Status.PROCESSING for e in claimed))
+        self.assertEqual(ingest.claim_events("worker-b", limit=10), [])
+
+    @mock.patch("whatsapp.ingest.process_webhook_payload", return_value=1)
+    def test_drain_marks_events_done_and_reports_stats(self, _mock_process):
+        ingest.enqueue_payload(_payload("972500000001"))
+        self.assertEqual(ingest.drain("worker-a"), 1)
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.Status.DONE)
+        self.assertEqual(event.messages_processed, 1)
+        stats = ingest.queue_stats()
+        self.assertEqual(stats["depth"], 0)
+        self.assertEqual(stats["done"], 1)
+        self.assertEqual(stats["latency_ms"]["count"], 1)
+
+    @mock.patch("whatsapp.ingest.process_webhook_payload", side_effect=RuntimeError("boom"))
+    def test_failures_retry_then_fail_and_can_be_replayed(self, _mock_process):
+        ingest.enqueue_payload(_payload("972500000001"))
+        ingest.drain("worker-a")
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.Status.PENDING)
+        self.assertIn("boom", event.last_error)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+        # Backed off: not claimed again until it is due
+        self.assertEqual(ingest.drain("worker-a"), 0)
+        WebhookEvent.objects.filter(pk=event.pk).update(next_attempt_at=timezone.now())
+        ingest.drain("worker-a")
+        event.refresh_from_db()
+        self.assertEqual(event.status, WebhookEvent.Status.FAILED)
+        self.assertEqual(event.attempts, 2)
+
+        self.assertEqual(ingest.replay_events(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.status, WebhookEvent.Status.PENDING)
+        self.assertEqual(event.attempts, 0)
+
+    @override_settings(WA_SALT="salt")
+    @mock.patch("whatsapp.processing._send_flow_message")
+    @mock.patch("whatsapp.processing.dispatch", side_effect=RuntimeError("handler boom"))
+    def test_handler_errors_reach_the_retry_path_instead_of_the_fallback(self, _mock_dispatch, mock_send):
+        ingest.enqueue_payload(_payload("972500000001"))
+        ingest.drain("worker-a")
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.Status.PENDING)
+        self.assertIn("handler boom", event.last_error)
+        mock_send.assert_not_called()
+
+    @mock.patch("whatsapp.processing._handle_message", side_effect=[None, RuntimeError("second failed"), None])
+    def test_retry_only_handles_messages_that_did_not_complete(self, mock_handle):
+        payload = _payload("972500000001", "one")
+        second = dict(payload["entry"][0]["changes"][0]["value"]["messages"][0], id="wamid.second")
+        payload["entry"][0]["changes"][0]["value"]["messages"].append(second)
+        ingest.enqueue_payload(payload)
+
+        ingest.drain("worker-a")
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.Status.PENDING)
+
+        WebhookEvent.objects.filter(pk=event.pk).update(next_attempt_at=timezone.now())
+        ingest.drain("worker-a")
+        event.refresh_from_db()
+        self.assertEqual(event.status, WebhookEvent.Status.DONE)
+        handled_ids = [call.args[1]["id"] for call in mock_handle.call_args_list]
+        self.assertEqual(handled_ids, ["wamid.972500000001.one", "wamid.second", "wamid.second"])
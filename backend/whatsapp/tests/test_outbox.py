@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from whatsapp import outbox
+from whatsapp.deal_flow import FlowMessage
+from whatsapp.models import DeadLetterMessage, OutboundMessage
+from whatsapp.processing import _send_flow_message
+from whatsapp.transport import SendResult
+
+
+class _FakeTransport:
+    def __init__(self, *results: SendResult):
+        self.results = list(results)
+        self.sent: list[dict] = []
+
+    def send_many(self, requests, max_workers=8):
+        out = []
+        for req in requests:
+            self.sent.append(req)
+            out.append(self.results.pop(0) if self.results else SendResult(ok=True, status=200))
+        return out
+
+
+@override_settings(
+    WHATSAPP_ACCESS_TOKEN="token",
+    WHATSAPP_PHONE_NUMBER_ID="12345",
+    WHATSAPP_OUTBOX_MAX_ATTEMPTS=3,
+    WHATSAPP_OUTBOX_BACKOFF_BASE=1,
+    WHATSAPP_OUTBOX_BACKOFF_MAX=60,
+)
+class OutboxTests(TestCase):
+    def _drain(self, transport: _FakeTransport, worker_id: str = "worker-a") -> int:
+        with mock.patch("whatsapp.outbox.get_transport", return_value=transport):
+            return outbox.drain(worker_id)
+
+    def test_claim_keeps_per_recipient_order_and_never_double_claims(self):
+        first = outbox.enqueue("972500000001", {"n": 1})
+        outbox.enqueue("972500000001", {"n": 2})
+        other = outbox.enqueue("972500000002", {"n": 3})
+
+        claimed = outbox.claim_messages("worker-a")
+        self.assertEqual([m.pk for m in claimed], [first.pk, other.pk])
+        self.assertEqual(outbox.claim_messages("worker-b"), [])
+
+    def test_sent_messages_release_the_next_one(self):
+        outbox.enqueue("972500000001", {"n": 1})
+        second = outbox.enqueue("972500000001", {"n": 2})
+        transport = _FakeTransport()
+        self.assertEqual(self._drain(transport), 1)
+        self.assertEqual(self._drain(transport), 1)
+        second.refresh_from_db()
+        self.assertEqual(second.status, OutboundMessage.Status.SENT)
+        self.assertEqual(len(transport.sent), 2)
+
+    def test_rate_limited_message_waits_for_retry_after_and_blocks_later_ones(self):
+        message = outbox.enqueue("972500000001", {"n": 1})
+        outbox.enqueue("972500000001", {"n": 2})
+        self._drain(_FakeTransport(SendResult(ok=False, status=429, retry_after=30)))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundMessage.Status.PENDING)
+        self.assertEqual(message.last_status, 429)
+        self.assertGreaterEqual(message.next_attempt_at, timezone.now() + timedelta(seconds=29))
+        self.assertEqual(outbox.claim_messages("worker-b"), [])
+
+    def test_retryable_failures_are_dead_lettered_after_max_attempts(self):
+        message = outbox.enqueue("972500000001", {"n": 1})
+        later = outbox.enqueue("972500000001", {"n": 2})
+        for _ in range(3):
+            OutboundMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+            self._drain(_FakeTransport(SendResult(ok=False, status=503, error="unavailable")))
+
+        self.assertFalse(OutboundMessage.objects.filter(pk=message.pk).exists())
+        dead = DeadLetterMessage.objects.get()
+        self.assertEqual(dead.outbound_id, message.pk)
+        self.assertEqual(dead.attempts, 3)
+        self.assertEqual(dead.last_status, 503)
+        self.assertEqual([m.pk for m in outbox.claim_messages("worker-a")], [later.pk])
+
+    def test_rejected_payload_uses_fallback_then_dead_letters(self):
+        message = outbox.enqueue("972500000001", {"type": "interactive"}, {"type": "text"})
+        rejected = SendResult(ok=False, status=400, error="bad buttons")
+        self._drain(_FakeTransport(rejected))
+        message.refresh_from_db()
+        self.assertEqual(message.payload, {"type": "text"})
+        self.assertIsNone(message.fallback_payload)
+
+        self._drain(_FakeTransport(rejected))
+        self.assertEqual(DeadLetterMessage.objects.get().payload, {"type": "text"})
+
+        self.assertEqual(outbox.requeue_dead_letters(), 1)
+        self.assertEqual(OutboundMessage.objects.get().status, OutboundMessage.Status.PENDING)
+
+    @override_settings(WHATSAPP_OUTBOX_ENABLED=True)
+    @mock.patch("whatsapp.processing.send_whatsapp_buttons")
+    def test_flow_messages_are_enqueued_when_enabled(self, mock_buttons):
+        _send_flow_message("972500000001", FlowMessage(text="Pick", buttons=[{"id": "a", "title": "A"}]))
+        mock_buttons.assert_not_called()
+        message = OutboundMessage.objects.get()
+        self.assertEqual(message.payload["type"], "interactive")
+        self.assertEqual(message.fallback_payload["text"]["body"], "Pick")
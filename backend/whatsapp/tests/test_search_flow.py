@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 from datetime import timedelta
+from io import StringIO
 
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
 from django.test import TestCase
 from django.utils import timezone
 
 from catalog.models import Product
 from stores.models import Store, City
-from pricing.models import PriceReport
+from pricing import snapshots
+from pricing.models import PriceReport, StoreProductSnapshot
 from whatsapp.models import WAUser, DealLookupSession
-from whatsapp.search_flow import start_find_deal_flow, handle_find_deal_text
+from whatsapp.search_flow import start_find_deal_flow, handle_find_deal_location, handle_find_deal_text
 
 
 class SearchFlowTests(TestCase):
@@ -102,6 +106,7 @@ class SearchFlowTests(TestCase):
             needs_moderation=False,
             product_text_raw="Tnuva Milk 3%",
         )
+        snapshots.rebuild()
 
     def test_flow_collects_product_brand_city_and_returns_latest_result_per_store(self):
         locale = "en"
@@ -144,3 +149,76 @@ class SearchFlowTests(TestCase):
         handle_find_deal_text(self.user, locale, "unknown")
         response = handle_find_deal_text(self.user, locale, "Tel Aviv")
         self.assertIn("couldn't find", response.lower())
+
+    def test_product_search_tolerates_typos(self):
+        self.assertEqual(self.product_tnuva.search_text, "חלב תנובה 3 tnuva milk")
+        start_find_deal_flow(self.user, "en")
+        handle_find_deal_text(self.user, "en", "Tnuvs Milk")
+        handle_find_deal_text(self.user, "en", "skip")
+        results = handle_find_deal_text(self.user, "en", "Tel Aviv")
+        self.assertIn("Shufersal Center", results)
+        self.assertIn("5.90", results)
+        self.assertNotIn("Strauss Shop", results)
+
+    def test_shared_location_lists_nearest_stores_first(self):
+        # Saving the store location refreshes its snapshots
+        for store, (lon, lat) in (
+            (self.store_primary, (34.8000, 32.1100)),  # ~3 km away
+            (self.store_secondary, (34.7820, 32.0860)),  # ~100 m away
+            (self.store_other_city, (34.9900, 32.7900)),  # Haifa, outside the radius
+        ):
+            store.location = Point(lon, lat, srid=4326)
+            store.save()
+        start_find_deal_flow(self.user, "en")
+        handle_find_deal_text(self.user, "en", "Tnuva Milk")
+        handle_find_deal_text(self.user, "en", "skip")
+
+        results = handle_find_deal_location(self.user, "en", {"latitude": 32.0853, "longitude": 34.7818})
+
+        self.assertLess(results.index("City Super"), results.index("Shufersal Center"))
+        self.assertIn("5.90", results)
+        self.assertIn("km)", results)
+        self.assertNotIn("Haifa Fresh", results)
+        session = DealLookupSession.objects.get(user=self.user)
+        self.assertEqual(session.step, DealLookupSession.Steps.COMPLETE)
+
+    def test_invalid_location_asks_for_city(self):
+        start_find_deal_flow(self.user, "en")
+        handle_find_deal_text(self.user, "en", "Tnuva Milk")
+        handle_find_deal_text(self.user, "en", "skip")
+        response = handle_find_deal_location(self.user, "en", {"latitude": "north"})
+        self.assertIn("type the city name", response.lower())
+        results = handle_find_deal_text(self.user, "en", "Tel Aviv")
+        self.assertIn("Shufersal Center", results)
+
+    def test_per_liter_query_ranks_by_normalized_unit_price(self):
+        # 5.90 for 1 liter at the primary store, 4.50 for 2 liters at the Strauss shop
+        PriceReport.objects.filter(store=self.store_primary).update(unit_measure_type_en="Liter")
+        PriceReport.objects.filter(store=self.store_other_brand).update(
+            unit_measure_type_en="Liter", unit_measure_quantity="2"
+        )
+        call_command("backfill_unit_prices", stdout=StringIO())
+        start_find_deal_flow(self.user, "en")
+        handle_find_deal_text(self.user, "en", "Milk per liter")
+        handle_find_deal_text(self.user, "en", "skip")
+        results = handle_find_deal_text(self.user, "en", "Tel Aviv")
+
+        self.assertLess(results.index("Strauss Shop"), results.index("Shufersal Center"))
+        self.assertIn("2.25₪ per Liter", results)
+        self.assertIn("5.90₪ per Liter", results)
+        self.assertNotIn("City Super", results)  # no unit recorded
+
+    def test_search_reads_one_snapshot_per_store_and_product(self):
+        from whatsapp.search_flow import _deals_queryset
+
+        self.assertEqual(StoreProductSnapshot.objects.count(), 4)
+        with self.assertNumQueries(2):  # city index load (not kept inside a transaction) + snapshot read
+            rows = list(_deals_queryset("Tnuva Milk", None, "Tel Aviv", limit=10))
+        self.assertEqual(
+            sorted((r.store_id, str(r.last_price)) for r in rows),
+            sorted([(self.store_primary.pk, "5.90"), (self.store_secondary.pk, "6.20")]),
+        )
+        primary = next(r for r in rows if r.store_id == self.store_primary.pk)
+        self.assertEqual(primary.confirmation_count, 2)
+        self.assertEqual(primary.city_id, self.city.pk)
+        self.assertEqual(primary.store_display_name, "Shufersal Center")
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from stores.models import City
+from whatsapp import session_store
+from whatsapp.deal_flow import handle_deal_flow_response, start_add_deal_flow
+from whatsapp.models import DealReportSession, WAUser
+
+
+class DatabaseSessionStoreTests(TestCase):
+    def setUp(self) -> None:
+        self.user = WAUser.objects.create(wa_id_hash="hash", locale="en")
+        City.objects.create(name_he="ראש העין", name_en="Rosh HaAyin")
+        start_add_deal_flow(self.user, "en")
+
+    def test_one_conditional_update_per_message(self):
+        session = DealReportSession.objects.get(user=self.user, is_active=True)
+        handle_deal_flow_response(self.user, "en", "ראש העין", session=session)
+        self.assertEqual(session.step, DealReportSession.Steps.STORE)
+        with self.assertNumQueries(1):
+            handle_deal_flow_response(self.user, "en", "Super Yuda", session=session)
+        self.assertEqual(DealReportSession.objects.get(pk=session.pk).step, DealReportSession.Steps.BRANCH)
+
+    def test_racing_message_on_a_stale_session_is_rejected(self):
+        first = DealReportSession.objects.get(user=self.user, is_active=True)
+        second = DealReportSession.objects.get(pk=first.pk)
+        handle_deal_flow_response(self.user, "en", "ראש העין", session=first)
+        reply = handle_deal_flow_response(self.user, "en", "Haifa", session=second)
+        self.assertIn("already got an answer", reply)
+        row = DealReportSession.objects.get(pk=first.pk)
+        self.assertEqual(row.step, DealReportSession.Steps.STORE)
+        self.assertEqual(row.data["city_en"], "Rosh HaAyin")
+
+
+@override_settings(WHATSAPP_DEAL_SESSION_STORE="cache", WHATSAPP_DEAL_SESSION_CHECKPOINT_STEPS=3)
+class CacheSessionStoreTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = WAUser.objects.create(wa_id_hash="hash", locale="en")
+        City.objects.create(name_he="ראש העין", name_en="Rosh HaAyin")
+        start_add_deal_flow(self.user, "en")
+        self.session_id = DealReportSession.objects.get(user=self.user, is_active=True).pk
+
+    def _row(self) -> DealReportSession:
+        return DealReportSession.objects.get(pk=self.session_id)
+
+    def test_row_is_written_only_at_checkpoints(self):
+        handle_deal_flow_response(self.user, "en", "ראש העין")
+        handle_deal_flow_response(self.user, "en", "Shufersal")
+        self.assertEqual(self._row().step, DealReportSession.Steps.CITY)
+        handle_deal_flow_response(self.user, "en", "Givat Tal")
+        row = self._row()
+        self.assertEqual(row.step, DealReportSession.Steps.PRODUCT)
+        self.assertEqual(row.data["store_detail"], "Givat Tal")
+
+    def test_flow_resumes_from_the_cache_and_cancel_writes_the_row(self):
+        handle_deal_flow_response(self.user, "en", "ראש העין")
+        reply = handle_deal_flow_response(self.user, "en", "Shufersal")
+        self.assertIn("which branch", reply.text.lower())
+        handle_deal_flow_response(self.user, "en", "cancel")
+        row = self._row()
+        self.assertFalse(row.is_active)
+        self.assertEqual(row.step, DealReportSession.Steps.CANCELED)
+        self.assertIsNone(cache.get(f"wa:deal_session:{self.session_id}"))
+
+    def test_racing_message_on_a_stale_version_is_rejected(self):
+        store = session_store.get_store()
+        first, second = self._row(), self._row()
+        token_first, token_second = store.load(first), store.load(second)
+        first.step = second.step = DealReportSession.Steps.STORE
+        store.save(first, token_first)
+        with self.assertRaises(session_store.StaleSession):
+            store.save(second, token_second)
@@ -0,0 +1,82 @@
+from django.test import SimpleTestCase
+
+from whatsapp.benchmarking import NORMALIZE_SAMPLES, legacy_normalize_for_match
+from whatsapp.text_normalization import (
+    KEYWORDS,
+    build_intent_matcher,
+    is_keyword,
+    is_keyword_norm,
+    match_intents,
+    normalize_for_match,
+)
+from whatsapp.utils import is_add_command, is_find_command, parse_language_choice
+
+
+class IntentMatcherTests(SimpleTestCase):
+    def test_every_registered_keyword_matches_its_category(self):
+        for category, options in KEYWORDS.items():
+            for lang, keyword_set in options.items():
+                for word in keyword_set.words:
+                    with self.subTest(category=category, word=word):
+                        self.assertTrue(is_keyword(word, category, lang))
+
+    def test_keywords_match_whole_message_only(self):
+        self.assertTrue(is_keyword_norm("כן", "yes", "he"))
+        self.assertFalse(is_keyword_norm("כן בטח", "yes", "he"))
+        self.assertFalse(is_keyword_norm("yes", "yes", "he"))
+        self.assertTrue(is_keyword_norm("דלגו", "skip", "he"))
+        self.assertFalse(is_keyword_norm("", "skip", "en"))
+
+    def test_one_pass_returns_every_intent(self):
+        intents = match_intents("אין")
+        self.assertTrue(intents.has("no", "he"))
+        self.assertTrue(intents.has("skip", "he"))
+        self.assertIsNone(intents.command)
+        self.assertEqual(match_intents(normalize_for_match("Add a Deal!")).command, "add")
+
+    def test_commands(self):
+        self.assertTrue(is_add_command("הוסף דיל"))
+        self.assertTrue(is_find_command(" find deal "))
+        self.assertFalse(is_add_command("add deal please"))
+
+    def test_language_choice(self):
+        cases = {
+            "1": "he",
+            "2": "en",
+            "עברית בבקשה": "he",
+            "English please": "en",
+            "he": "he",
+            "lang: en": "en",
+            "hello": None,
+            "then": None,
+            "12": None,
+            "": None,
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(parse_language_choice(text), expected)
+
+    def test_custom_registry(self):
+        matcher = build_intent_matcher(keywords={}, commands={"help": {"help"}}, language_choices={})
+        self.assertEqual(matcher.match("help").labels, frozenset({"command:help"}))
+        self.assertEqual(matcher.match("help me").labels, frozenset())
+
+
+class NormalizeForMatchTests(SimpleTestCase):
+    def test_matches_previous_implementation(self):
+        hebrew_and_punctuation = [chr(cp) for cp in range(0x0590, 0x0600)] + [chr(cp) for cp in range(0x2000, 0x2070)]
+        samples = list(NORMALIZE_SAMPLES) + [f"א{ch}ב{ch}{ch}" for ch in hebrew_and_punctuation]
+        for text in samples:
+            with self.subTest(text=text):
+                self.assertEqual(normalize_for_match(text), legacy_normalize_for_match(text))
+
+    def test_examples(self):
+        self.assertEqual(normalize_for_match("\u200fכןןן!\u200f"), "כןן")
+        self.assertEqual(normalize_for_match("קוקה\u05beקולה"), "קוקהקולה")
+        self.assertEqual(normalize_for_match("Coca\u2013Cola   ZERO"), "coca-cola zero")
+        self.assertEqual(normalize_for_match("חָלָב"), "חלב")
+        self.assertEqual(normalize_for_match(""), "")
+
+    def test_long_inputs_bypass_the_cache(self):
+        text = "מבצע " * 40
+        self.assertEqual(normalize_for_match(text), legacy_normalize_for_match(text))
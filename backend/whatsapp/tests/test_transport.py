@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from django.test import SimpleTestCase, override_settings
+
+from whatsapp.mock_graph import MockGraphServer
+from whatsapp.transport import GraphTransport, get_transport, parse_retry_after
+from whatsapp.utils import _build_request, send_whatsapp_text, send_whatsapp_texts
+
+
+class GraphTransportTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.server = MockGraphServer().start()
+        self.addCleanup(self.server.stop)
+
+    def _settings(self, **extra):
+        values = {
+            "WHATSAPP_GRAPH_API_BASE_URL": self.server.base_url,
+            "WHATSAPP_ACCESS_TOKEN": "token",
+            "WHATSAPP_PHONE_NUMBER_ID": "12345",
+            "WHATSAPP_HTTP_POOL_SIZE": 4,
+            "WHATSAPP_SEND_CONCURRENCY": 4,
+        }
+        values.update(extra)
+        return override_settings(**values)
+
+    def test_sequential_sends_reuse_one_connection(self):
+        with self._settings():
+            self.assertTrue(send_whatsapp_text("972500000001", "one"))
+            self.assertTrue(send_whatsapp_text("972500000001", "two"))
+            get_transport().close()
+        self.assertEqual(self.server.connections, 1)
+        bodies = [req["body"]["text"]["body"] for req in self.server.requests]
+        self.assertEqual(bodies, ["one", "two"])
+        self.assertEqual(self.server.requests[0]["path"], "/v20.0/12345/messages")
+        self.assertEqual(self.server.requests[0]["headers"]["Authorization"], "Bearer token")
+
+    def test_batch_is_sent_concurrently_with_bounded_connections(self):
+        messages = [(f"97250000{i:04d}", f"msg {i}") for i in range(40)]
+        with self._settings():
+            results = send_whatsapp_texts(messages)
+            get_transport().close()
+        self.assertEqual(results, [True] * 40)
+        self.assertEqual(len(self.server.requests), 40)
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_error_status_and_retry_after_are_reported(self):
+        transport = GraphTransport(self.server.base_url, pool_size=1)
+        self.addCleanup(transport.close)
+        self.server.fail_next(429, retry_after=7)
+        with self._settings():
+            result = transport.send(_build_request({"to": "1"}))
+        self.assertFalse(result.ok)
+        self.assertEqual(result.status, 429)
+        self.assertEqual(result.retry_after, 7.0)
+        self.assertTrue(result.retryable)
+
+    def test_request_lost_after_sending_is_not_resent(self):
+        transport = GraphTransport(self.server.base_url, pool_size=1)
+        self.addCleanup(transport.close)
+        with self._settings():
+            self.assertTrue(transport.send(_build_request({"to": "1"})).ok)
+            self.server.drop_next()
+            result = transport.send(_build_request({"to": "2"}))
+        self.assertFalse(result.ok)
+        self.assertIsNone(result.status)
+        self.assertEqual([req["body"]["to"] for req in self.server.requests], ["1", "2"])
+
+    def test_missing_credentials_fail_without_network(self):
+        with self._settings(WHATSAPP_ACCESS_TOKEN=""):
+            self.assertEqual(send_whatsapp_texts([("9721", "hi")]), [False])
+        self.assertEqual(self.server.requests, [])
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("12"), 12.0)
+        self.assertIsNone(parse_retry_after(""))
+        self.assertIsNone(parse_retry_after("soon"))
@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from whatsapp.unit_translations import (
+    UNIT_CANONICALS,
+    get_unit_by_slug,
+    get_unit_label_for_locale,
+    normalize_unit_price,
+    parse_quantity_unit,
+    parse_quantity_units,
+    resolve_unit_translation,
+    resolve_unit_translations,
+)
+
+
+class UnitRegistryTests(SimpleTestCase):
+    def test_aliases_and_labels_resolve_to_their_entry(self):
+        for entry in UNIT_CANONICALS:
+            for alias in entry["aliases"] + [entry["en"], entry["he"]]:
+                if alias == "pkg":
+                    continue
+                with self.subTest(alias=alias):
+                    self.assertEqual(resolve_unit_translation(alias)["slug"], entry["slug"])
+
+    def test_shared_alias_keeps_first_entry(self):
+        self.assertEqual(resolve_unit_translation("pkg")["slug"], "pack")
+
+    def test_unknown_units_pass_through(self):
+        self.assertEqual(resolve_unit_translation("dozen"), {"he": "Dozen", "en": "Dozen", "slug": "dozen"})
+        self.assertEqual(resolve_unit_translation("  "), {"he": "", "en": "", "slug": ""})
+
+    def test_slug_lookup(self):
+        self.assertEqual(get_unit_by_slug("LITER")["he"], "ליטר")
+        self.assertEqual(get_unit_label_for_locale("gram", "he"), "גרם")
+        self.assertIsNone(get_unit_by_slug("furlong"))
+
+    def test_batch_resolution(self):
+        results = resolve_unit_translations(["kg", "ק\"ג", "", "kg"])
+        self.assertEqual([r["slug"] for r in results], ["kilogram", "kilogram", "", "kilogram"])
+        results[0]["slug"] = "changed"
+        self.assertEqual(results[3]["slug"], "kilogram")
+
+
+class QuantityUnitParsingTests(SimpleTestCase):
+    def test_compound_inputs(self):
+        cases = {
+            "1.5 ליטר": (Decimal("1.5"), "liter"),
+            "500g": (Decimal("500"), "gram"),
+            "1,5L": (Decimal("1.5"), "liter"),
+            "ליטר 2": (Decimal("2"), "liter"),
+            "2 ק\"ג": (Decimal("2"), "kilogram"),
+            "12 יח'": (Decimal("12"), "unit"),
+        }
+        for text, (quantity, slug) in cases.items():
+            with self.subTest(text=text):
+                parsed = parse_quantity_unit(text)
+                self.assertEqual(parsed.quantity, quantity)
+                self.assertEqual(parsed.unit["slug"], slug)
+
+    def test_missing_or_unknown_parts(self):
+        self.assertIsNone(parse_quantity_unit("ml"))
+        self.assertIsNone(parse_quantity_unit(""))
+        self.assertIsNone(parse_quantity_unit("1.5.2 l"))
+        bare = parse_quantity_unit("3")
+        self.assertEqual((bare.quantity, bare.unit_text, bare.unit), (Decimal("3"), "", None))
+        unknown = parse_quantity_unit("500 foo")
+        self.assertEqual((unknown.unit_text, unknown.unit), ("foo", None))
+
+    def test_batch_parsing(self):
+        parsed = parse_quantity_units(["500g", "x", "500g"])
+        self.assertEqual(parsed[0], parsed[2])
+        self.assertIsNone(parsed[1])
+
+
+class NormalizedUnitPriceTests(SimpleTestCase):
+    def test_prices_per_base_unit(self):
+        cases = [
+            (("12.00", 2, ["Liter"], "1.5"), (Decimal("4.0000"), "liter")),
+            (("9.90", 1, ["", "גרם"], "250"), (Decimal("39.6000"), "kilogram")),
+            (("5.00", 1, ["ml"], "500"), (Decimal("10.0000"), "liter")),
+            (("29.90", 1, ["קילו"], None), (Decimal("29.9000"), "kilogram")),
+            (("10.00", 3, ["unit"], None), (Decimal("3.3333"), "unit")),
+            (("24.00", 1, ["unit"], "12"), (Decimal("2.0000"), "unit")),
+            # Containers count as one unit whatever their size
+            (("7.00", 1, ["bottle"], "1.5"), (Decimal("7.0000"), "unit")),
+        ]
+        for args, expected in cases:
+            with self.subTest(args=args):
+                self.assertEqual(normalize_unit_price(*args), expected)
+
+    def test_unknown_unit(self):
+        self.assertEqual(normalize_unit_price("5.00", 1, ["", "foo"], "1"), (None, ""))
+        self.assertEqual(normalize_unit_price("5.00", 1, ["liter"], "0"), (None, ""))
+
+    def test_zero_quantity_is_rejected(self):
+        self.assertEqual(normalize_unit_price("5.00", 1, ["liter"], 0), (None, ""))
+        self.assertEqual(normalize_unit_price("5.00", 1, ["liter"], Decimal("0")), (None, ""))
+
+    def test_result_too_large_for_the_field(self):
+        # 1000 per 0.01 g is 1e8 per kilogram: more than the column can hold
+        self.assertEqual(normalize_unit_price("1000.00", 1, ["gram"], Decimal("0.01")), (None, ""))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from whatsapp import user_cache
+from whatsapp.deal_flow import handle_deal_flow_response, start_add_deal_flow
+from whatsapp.handlers import _build_user_context
+from whatsapp.models import DealReportSession, WAUser
+from whatsapp.utils import compute_wa_hash
+
+
+def _msg(text: str) -> dict:
+    return {"from": "972500000001", "id": "wamid.x", "type": "text", "text": {"body": text}}
+
+
+@override_settings(WA_SALT="salt", WHATSAPP_USER_CACHE_TTL=600, WHATSAPP_LAST_SEEN_FLUSH_SECONDS=60)
+class UserContextCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        user_cache.flush_last_seen()
+
+    def _context(self, text: str = "hello"):
+        return _build_user_context(wa_norm="972500000001", msg=_msg(text), contacts={}, value={})
+
+    def test_repeat_messages_resolve_user_without_queries(self):
+        first = self._context()
+        self.assertTrue(first.created)
+        with self.assertNumQueries(0):
+            second = self._context()
+        self.assertFalse(second.created)
+        self.assertEqual(second.user.pk, first.user.pk)
+
+    def test_update_user_writes_through(self):
+        ctx = self._context()
+        user_cache.update_user(ctx.user, locale="he")
+        self.assertIsNone(user_cache.get_user(compute_wa_hash("972500000001")))
+        self.assertEqual(self._context().user.locale, "he")
+
+    def test_inactive_flow_pointer_skips_session_lookup(self):
+        user = self._context().user
+        self.assertIsNone(handle_deal_flow_response(user, "en", "hi"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(handle_deal_flow_response(user, "en", "hi"))
+
+        start_add_deal_flow(user, "en")
+        session = user_cache.get_active_session(user, user_cache.DEAL)
+        self.assertEqual(session, DealReportSession.objects.get(user=user, is_active=True))
+
+        session.is_active = False
+        session.save()
+        self.assertIsNone(user_cache.get_active_session(user, user_cache.DEAL))
+
+    def test_last_seen_is_flushed_in_one_batched_update(self):
+        now = timezone.now()
+        users = [WAUser.objects.create(wa_id_hash=f"hash-{i}") for i in range(3)]
+        for offset, user in enumerate(users):
+            user_cache.touch(user, now - timedelta(seconds=offset))
+        self.assertFalse(WAUser.objects.filter(last_seen__isnull=False).exists())
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user_cache.flush_last_seen(), 3)
+        for offset, user in enumerate(users):
+            user.refresh_from_db()
+            self.assertEqual(user.last_seen, now - timedelta(seconds=offset))
+
+    @mock.patch("whatsapp.user_cache.connections")
+    def test_timer_flushes_pending_last_seen_without_further_touches(self, _mock_connections):
+        user = WAUser.objects.create(wa_id_hash="hash-timer")
+        now = timezone.now()
+        user_cache.touch(user, now)
+        self.assertIsNotNone(user_cache._flush_timer)
+
+        # What the armed timer runs once the flush interval has passed
+        user_cache._flush_from_timer()
+        user.refresh_from_db()
+        self.assertEqual(user.last_seen, now)
+        self.assertIsNone(user_cache._flush_timer)
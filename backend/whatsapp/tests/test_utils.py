@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from django.conf import settings
 from django.test import SimpleTestCase
 
+from whatsapp import language
 from whatsapp.utils import detect_locale
 
 
@@ -17,3 +24,31 @@ class LanguageDetectionTests(SimpleTestCase):
     def test_detect_locale_falls_back_to_heuristic_for_symbols(self):
         text = "12345 :)"
         self.assertEqual(detect_locale(text), "en")
+
+    @mock.patch("langdetect.detect_langs")
+    def test_single_script_text_skips_langdetect(self, mock_detect):
+        language._detect_key.cache_clear()
+        self.assertEqual(detect_locale("‏שָׁלוֹם‏"), "he")
+        self.assertEqual(detect_locale("Milk 3% 1L"), "en")
+        self.assertEqual(detect_locale("Привет"), "en")
+        mock_detect.assert_not_called()
+
+    @mock.patch("langdetect.detect_langs")
+    def test_mixed_script_text_falls_back_to_langdetect(self, mock_detect):
+        language._detect_key.cache_clear()
+        mock_detect.return_value = [mock.Mock(lang="he", prob=0.99)]
+        self.assertEqual(detect_locale("Shufersal דיל"), "he")
+        self.assertEqual(detect_locale("  SHUFERSAL   דיל "), "he")
+        mock_detect.assert_called_once()
+
+    def test_langdetect_is_not_imported_at_startup(self):
+        script = "import django, sys; django.setup(); import config.urls; print('langdetect' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            text=True,
+            cwd=str(settings.BASE_DIR),
+            env=dict(os.environ),
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "False")
@@ -3,6 +3,7 @@ from __future__ import annotations
 import re
 import unicodedata
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Pattern
 
 
@@ -37,10 +38,49 @@ _QUOTES = "\u2018\u2019\u201a\u201b\u201c\u201d\u201e\u201f\u05f3\u05f4"
 _RE_MULTISPACE = re.compile(r"\s+")
 # Safe repeated-letters collapse for Hebrew and Latin letters
 _RE_REPEAT_SAFE = re.compile(r"([A-Za-z\u0590-\u05FF])\1{2,}")
+# Anything but letters, numbers, spaces and hyphens
+_RE_DISALLOWED = re.compile(r"[^0-9A-Za-z\u0590-\u05FF\s-]+")
+
+_NIQQUD_TABLE = {cp: None for cp in range(_NIQQUD_START, _NIQQUD_END + 1)}
+_INVISIBLE_TABLE = {ord(ch): None for ch in _ZW_CHARS | _BIDI_CHARS}
+# One pass for normalize_for_match: drop invisible controls and niqqud (maqaf
+# included, as before), canonicalize quotes and the remaining dashes.
+_MATCH_TABLE = {
+    **{ord(ch): "'" for ch in _QUOTES},
+    **{ord(ch): "-" for ch in _DASHES},
+    **_NIQQUD_TABLE,
+    **_INVISIBLE_TABLE,
+}
+
+# Inputs up to this length are memoized (buttons, keywords, short replies)
+CACHE_MAX_LENGTH = 64
+CACHE_SIZE = 4096
 
 
 def strip_niqqud(s: str) -> str:
-    return "".join(ch for ch in s or "" if not (_NIQQUD_START <= ord(ch) <= _NIQQUD_END))
+    return (s or "").translate(_NIQQUD_TABLE)
+
+
+def strip_invisible(s: str) -> str:
+    """Remove zero-width characters and bidi direction controls."""
+    return (s or "").translate(_INVISIBLE_TABLE)
+
+
+def _normalize(s: str) -> str:
+    # Unicode normalization (a no-op for ASCII)
+    if not s.isascii():
+        s = unicodedata.normalize("NFKC", s)
+    # Strip invisible controls and niqqud, canonicalize quotes and dashes;
+    # then Unicode-friendly lowercase
+    s = s.translate(_MATCH_TABLE).casefold()
+    # Collapse long repeated letters (e.g., כןןן => כן)
+    s = _RE_REPEAT_SAFE.sub(r"\1\1", s)
+    # Keep letters, numbers, spaces, and hyphens only; normalize whitespace
+    s = _RE_DISALLOWED.sub("", s)
+    return " ".join(s.split())
+
+
+_normalize_cached = lru_cache(maxsize=CACHE_SIZE)(_normalize)
 
 
 def normalize_for_match(s: str) -> str:
@@ -51,24 +91,9 @@ def normalize_for_match(s: str) -> str:
     """
     if not s:
         return ""
-    # Unicode normalization
-    s = unicodedata.normalize("NFKC", s)
-    # Strip invisible and direction controls
-    s = "".join(ch for ch in s if ch not in _ZW_CHARS and ch not in _BIDI_CHARS)
-    # Remove niqqud (Hebrew diacritics)
-    s = strip_niqqud(s)
-    # Canonicalize quotes and dashes
-    s = s.translate({ord(ch): "'" for ch in _QUOTES})
-    s = s.translate({ord(ch): "-" for ch in _DASHES})
-    # Unicode-friendly lowercase
-    s = s.casefold()
-    # Collapse long repeated letters (e.g., כןןן => כן)
-    s = _RE_REPEAT_SAFE.sub(r"\1\1", s)
-    # Keep letters, numbers, spaces, and hyphens only
-    s = re.sub(r"[^0-9A-Za-z\u0590-\u05FF\s-]", "", s)
-    # Normalize whitespace
-    s = _RE_MULTISPACE.sub(" ", s).strip()
-    return s
+    if len(s) <= CACHE_MAX_LENGTH:
+        return _normalize_cached(s)
+    return _normalize(s)
 
 
 @dataclass(frozen=True)
@@ -124,22 +149,159 @@ def _lang_of(locale: str | None) -> str:
     return "he" if s.startswith("he") else "en"
 
 
+# Whole-message commands that start a flow
+COMMANDS: dict[str, set[str]] = {
+    "add": {"add deal", "add a deal", "הוסף דיל", "הוספת דיל"},
+    "find": {"find deal", "find a deal", "מצא דיל", "חפש דיל"},
+}
+
+# Explicit language choice tokens by how they must appear in the message
+LANGUAGE_CHOICES: dict[str, dict[str, set[str]]] = {
+    "he": {"exact": {"1"}, "word": {"he"}, "substring": {"עברית"}},
+    "en": {"exact": {"2"}, "word": {"en"}, "substring": {"english"}},
+}
+
+# How a trie entry must sit in the text to count as a match
+_EXACT, _WORD, _SUBSTRING = "exact", "word", "substring"
+# Word separators left in text after normalize_for_match
+_SEPARATORS = frozenset(" -")
+
+
+class _TrieNode:
+    __slots__ = ("children", "outputs")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.outputs: list[tuple[str, str]] = []
+
+
+@dataclass(frozen=True)
+class MessageIntents:
+    """Intent labels found in a normalized message.
+
+    Labels are ``"<category>:<lang>"`` for ``KEYWORDS``, ``"command:<name>"``
+    for ``COMMANDS`` and ``"language:<lang>"`` for ``LANGUAGE_CHOICES``.
+    """
+
+    labels: frozenset[str] = frozenset()
+
+    def has(self, category: str, locale: str | None = None) -> bool:
+        """Same semantics as ``is_keyword_norm`` (falls back to English keywords)."""
+        options = KEYWORDS.get(category, {})
+        lang = _lang_of(locale)
+        if not options.get(lang):
+            lang = "en"
+        return f"{category}:{lang}" in self.labels
+
+    @property
+    def command(self) -> str | None:
+        for name in COMMANDS:
+            if f"command:{name}" in self.labels:
+                return name
+        return None
+
+    @property
+    def language(self) -> str | None:
+        # Hebrew wins when both languages are mentioned (historical behaviour)
+        for lang in ("he", "en"):
+            if f"language:{lang}" in self.labels:
+                return lang
+        return None
+
+
+NO_INTENTS = MessageIntents()
+
+
+class IntentMatcher:
+    """Character trie over every keyword, command and language token.
+
+    Built once at import. ``match`` walks the text from each position at most
+    as deep as the longest entry, so one call finds all intents regardless of
+    how many categories are registered.
+    """
+
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+        self._patterns: list[tuple[str, Pattern[str]]] = []
+
+    def add(self, phrase: str, label: str, anchor: str = _EXACT) -> None:
+        node = self._root
+        for ch in phrase:
+            node = node.children.setdefault(ch, _TrieNode())
+        node.outputs.append((label, anchor))
+
+    def add_pattern(self, pattern: Pattern[str], label: str) -> None:
+        """Register a full-match regex for entries a trie cannot express."""
+        self._patterns.append((label, pattern))
+
+    def match(self, text_norm: str) -> MessageIntents:
+        t = (text_norm or "").strip()
+        if not t:
+            return NO_INTENTS
+        size = len(t)
+        labels: set[str] = set()
+        for start in range(size):
+            word_start = start == 0 or t[start - 1] in _SEPARATORS
+            node = self._root
+            for end in range(start, size):
+                node = node.children.get(t[end])
+                if node is None:
+                    break
+                if not node.outputs:
+                    continue
+                word_end = end + 1 == size or t[end + 1] in _SEPARATORS
+                for label, anchor in node.outputs:
+                    if (
+                        anchor == _SUBSTRING
+                        or (anchor == _WORD and word_start and word_end)
+                        or (start == 0 and end + 1 == size)
+                    ):
+                        labels.add(label)
+        for label, pattern in self._patterns:
+            if label not in labels and pattern.fullmatch(t):
+                labels.add(label)
+        return MessageIntents(frozenset(labels))
+
+
+def build_intent_matcher(
+    keywords: dict[str, dict[str, KeywordSet]] = KEYWORDS,
+    commands: dict[str, set[str]] = COMMANDS,
+    language_choices: dict[str, dict[str, set[str]]] = LANGUAGE_CHOICES,
+) -> IntentMatcher:
+    matcher = IntentMatcher()
+    for category, options in keywords.items():
+        for lang, ks in options.items():
+            label = f"{category}:{lang}"
+            for word in ks.words:
+                # Keywords are compared against normalized text, so normalize them too
+                matcher.add(normalize_for_match(word), label)
+            for pattern in ks.patterns:
+                matcher.add_pattern(pattern, label)
+    for name, phrases in commands.items():
+        for phrase in phrases:
+            matcher.add(normalize_for_match(phrase), f"command:{name}")
+    for lang, anchors in language_choices.items():
+        for anchor, tokens in anchors.items():
+            for token in tokens:
+                matcher.add(normalize_for_match(token), f"language:{lang}", anchor)
+    return matcher
+
+
+INTENT_MATCHER = build_intent_matcher()
+
+
+@lru_cache(maxsize=1024)
+def match_intents(text_norm: str) -> MessageIntents:
+    """Return every intent in a text already normalized with normalize_for_match."""
+    return INTENT_MATCHER.match(text_norm)
+
+
 def is_keyword_norm(text_norm: str, category: str, locale: str | None = None) -> bool:
     """Match a normalized text against a semantic keyword category.
 
     Use this when you already normalized with normalize_for_match.
     """
-    t = (text_norm or "").strip()
-    if not t:
-        return False
-    lang = _lang_of(locale)
-    options = KEYWORDS.get(category, {})
-    ks = options.get(lang) or options.get("en")
-    if not ks:
-        return False
-    if t in ks.words:
-        return True
-    return any(p.fullmatch(t) for p in ks.patterns)
+    return match_intents(text_norm or "").has(category, locale)
 
 
 def is_keyword(text: str, category: str, locale: str | None = None) -> bool:
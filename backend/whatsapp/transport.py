@@ -0,0 +1,205 @@
+"""Outbound HTTP transport for the WhatsApp Graph API.
+
+Keeps a pool of persistent HTTP/1.1 (keep-alive) connections per process so
+consecutive sends reuse the same TLS session, and offers ``send_many`` to
+deliver a batch concurrently with a bounded number of worker threads.
+"""
+from __future__ import annotations
+
+import http.client
+import os
+import queue
+import select
+import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional, Sequence
+from urllib.parse import urlsplit
+
+import structlog
+from django.conf import settings
+from django.utils import timezone
+
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_BASE_URL = "https://graph.facebook.com/v20.0"
+
+# Errors writing a request on a pooled keep-alive connection the peer closed.
+# Only these are retried on another connection: once the request was written
+# it may have been delivered, and resending it would duplicate the message.
+_STALE_CONNECTION_ERRORS = (
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+
+@dataclass(frozen=True)
+class OutboundRequest:
+    path: str
+    body: bytes
+    headers: dict
+
+
+@dataclass(frozen=True)
+class SendResult:
+    ok: bool
+    status: Optional[int] = None  # None for network errors
+    retry_after: Optional[float] = None  # seconds, from the Retry-After header
+    error: str = ""
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - timezone.now()).total_seconds())
+
+
+class GraphTransport:
+    """Thread-safe pool of keep-alive connections to a single Graph API host."""
+
+    def __init__(self, base_url: str, pool_size: int = 8, timeout: float = 10.0):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self._secure = parts.scheme == "https"
+        self._host = parts.hostname or ""
+        self._port = parts.port
+        self._base_path = parts.path.rstrip("/")
+        self._timeout = timeout
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=max(1, pool_size))
+        self._ssl_context = ssl.create_default_context() if self._secure else None
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_opened += 1
+        if self._secure:
+            return http.client.HTTPSConnection(
+                self._host, self._port, timeout=self._timeout, context=self._ssl_context
+            )
+        return http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                return self._new_connection(), False
+            if _is_dropped(conn):
+                conn.close()
+                continue
+            return conn, True
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def send(self, req: OutboundRequest) -> SendResult:
+        path = f"{self._base_path}{req.path}"
+        while True:
+            conn, reused = self._acquire()
+            try:
+                conn.request("POST", path, body=req.body, headers=req.headers)
+            except _STALE_CONNECTION_ERRORS as exc:
+                conn.close()
+                if reused:
+                    # The server closed an idle keep-alive connection; try the next one.
+                    continue
+                return SendResult(ok=False, error=f"{type(exc).__name__}: {exc}")
+            except (OSError, http.client.HTTPException) as exc:
+                conn.close()
+                return SendResult(ok=False, error=f"{type(exc).__name__}: {exc}")
+            try:
+                resp = conn.getresponse()
+                body = resp.read()
+            except (OSError, http.client.HTTPException) as exc:
+                # The request may have reached the server: report, never resend here.
+                conn.close()
+                return SendResult(ok=False, error=f"{type(exc).__name__}: {exc}")
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            ok = 200 <= resp.status < 300
+            return SendResult(
+                ok=ok,
+                status=resp.status,
+                retry_after=parse_retry_after(resp.getheader("Retry-After")),
+                error="" if ok else body[:500].decode("utf-8", "replace"),
+            )
+
+    def send_many(self, requests: Sequence[OutboundRequest], max_workers: int = 8) -> list[SendResult]:
+        """Send a batch concurrently; results are returned in input order."""
+        if not requests:
+            return []
+        workers = max(1, min(max_workers, len(requests)))
+        if workers == 1:
+            return [self.send(req) for req in requests]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wa-send") as executor:
+            return list(executor.map(self.send, requests))
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def _is_dropped(conn: http.client.HTTPConnection) -> bool:
+    """Whether an idle pooled connection was closed by the peer (readable EOF)."""
+    sock = conn.sock
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    # An idle keep-alive connection has nothing to read unless the peer closed it
+    return bool(readable)
+
+
+_transport_lock = threading.Lock()
+_transport: Optional[GraphTransport] = None
+_transport_pid: Optional[int] = None
+
+
+def get_transport() -> GraphTransport:
+    """Return the per-process transport for the configured Graph API base URL."""
+    global _transport, _transport_pid
+    base_url = getattr(settings, "WHATSAPP_GRAPH_API_BASE_URL", "") or DEFAULT_BASE_URL
+    pid = os.getpid()
+    with _transport_lock:
+        # Never share sockets with a forked parent; rebuild when settings change (tests).
+        if _transport is None or _transport_pid != pid or _transport.base_url != base_url:
+            if _transport is not None and _transport_pid == pid:
+                _transport.close()
+            _transport = GraphTransport(
+                base_url,
+                pool_size=int(getattr(settings, "WHATSAPP_HTTP_POOL_SIZE", 8)),
+                timeout=float(getattr(settings, "WHATSAPP_HTTP_TIMEOUT", 10)),
+            )
+            _transport_pid = pid
+        return _transport
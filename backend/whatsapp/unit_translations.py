@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import re
-from typing import Optional
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, Optional
 
 
 UNIT_CANONICALS = [
@@ -9,25 +11,25 @@ UNIT_CANONICALS = [
         "slug": "liter",
         "en": "Liter",
         "he": "ליטר",
-        "aliases": ["liter", "litre", "ltr", "l", "ליטר", "ליט'", "ל'"],
+        "aliases": ["liter", "litre", "ltr", "l", "ליטר", "ליטרים", "ליט'", "ל'"],
     },
     {
         "slug": "milliliter",
         "en": "Milliliter",
         "he": "מיליליטר",
-        "aliases": ["milliliter", "millilitre", "ml", "מיליליטר", "מ״ל", "מל"],
+        "aliases": ["milliliter", "millilitre", "ml", "מיליליטר", "מיליליטרים", "מ״ל", "מל"],
     },
     {
         "slug": "kilogram",
         "en": "Kilogram",
         "he": "קילוגרם",
-        "aliases": ["kilogram", "kg", "kilo", "ק\"ג", "קג", "קילו", "קילוגרם"],
+        "aliases": ["kilogram", "kg", "kilo", "ק\"ג", "קג", "קילו", "קילוגרם", "קילוגרמים"],
     },
     {
         "slug": "gram",
         "en": "Gram",
         "he": "גרם",
-        "aliases": ["gram", "gr", "g", "גרם", "ג'", "גר"],
+        "aliases": ["gram", "gr", "g", "גרם", "גרמים", "ג'", "גר"],
     },
     {
         "slug": "unit",
@@ -96,16 +98,35 @@ def _normalize_token(value: str) -> str:
     return _TOKEN_RE.sub("", (value or "").strip().lower())
 
 
+class UnitRegistry:
+    """Hash indexes over unit entries, built once.
+
+    ``by_alias`` maps every normalized alias and canonical label to its entry;
+    when two entries share an alias (e.g. "pkg") the earlier one wins, as the
+    previous linear scan did.
+    """
+
+    def __init__(self, entries: Iterable[dict]) -> None:
+        self.entries = list(entries)
+        self.by_alias: dict[str, dict] = {}
+        self.by_slug: dict[str, dict] = {}
+        for entry in self.entries:
+            for alias in (*entry.get("aliases", []), entry["en"], entry["he"]):
+                self.by_alias.setdefault(_normalize_token(alias), entry)
+            self.by_slug.setdefault(_normalize_token(entry["slug"]), entry)
+
+    def match(self, value: str) -> Optional[dict]:
+        return self.by_alias.get(_normalize_token(value))
+
+    def get_by_slug(self, slug: str) -> Optional[dict]:
+        return self.by_slug.get(_normalize_token(slug))
+
+
+UNIT_REGISTRY = UnitRegistry(UNIT_CANONICALS)
+
+
 def _match_unit(value: str) -> Optional[dict]:
-    normalized = _normalize_token(value)
-    for entry in UNIT_CANONICALS:
-        aliases = entry.get("aliases", [])
-        if normalized in {_normalize_token(alias) for alias in aliases}:
-            return entry
-        # Also allow direct match on canonical forms
-        if normalized in (_normalize_token(entry["en"]), _normalize_token(entry["he"])):
-            return entry
-    return None
+    return UNIT_REGISTRY.match(value)
 
 
 def resolve_unit_translation(value: str) -> dict:
@@ -129,11 +150,7 @@ def select_unit_for_locale(data: dict, locale: str) -> str:
 
 
 def get_unit_by_slug(slug: str) -> Optional[dict]:
-    normalized = _normalize_token(slug)
-    for entry in UNIT_CANONICALS:
-        if _normalize_token(entry["slug"]) == normalized:
-            return entry
-    return None
+    return UNIT_REGISTRY.get_by_slug(slug)
 
 
 def get_unit_label_for_locale(slug: str, locale: str) -> Optional[str]:
@@ -141,3 +158,125 @@ def get_unit_label_for_locale(slug: str, locale: str) -> Optional[str]:
     if not entry:
         return None
     return entry["he"] if locale.startswith("he") else entry["en"]
+
+
+def resolve_unit_translations(values: Iterable[str]) -> list[dict]:
+    """Batch form of ``resolve_unit_translation`` (repeated values are resolved once)."""
+    resolved: dict[str, dict] = {}
+    results = []
+    for value in values:
+        key = value or ""
+        if key not in resolved:
+            resolved[key] = resolve_unit_translation(key)
+        results.append(dict(resolved[key]))
+    return results
+
+
+@dataclass(frozen=True)
+class UnitQuantity:
+    quantity: Decimal
+    unit_text: str
+    unit: Optional[dict]
+
+
+# "1.5 ליטר", "500g", "1,5L", "ליטר 1.5": a number and a unit in either order
+_QUANTITY_UNIT_RE = re.compile(
+    r"^\s*(?:(?P<qty>\d+(?:[.,]\d+)?)\s*(?P<unit>[^\d\s.,].*?)?"
+    r"|(?P<unit_first>[^\d\s.,].*?)\s*(?P<qty_last>\d+(?:[.,]\d+)?))\s*$"
+)
+
+
+def parse_quantity_unit(value: str) -> Optional[UnitQuantity]:
+    """Split compound input like "1.5 ליטר" or "500g" into quantity and unit.
+
+    Returns None when there is no number. ``unit`` is the registry entry, or
+    None when the unit text is missing or unknown.
+    """
+    match = _QUANTITY_UNIT_RE.match(value or "")
+    if not match:
+        return None
+    raw_qty = match.group("qty") or match.group("qty_last")
+    unit_text = (match.group("unit") or match.group("unit_first") or "").strip()
+    try:
+        quantity = Decimal(raw_qty.replace(",", "."))
+    except InvalidOperation:
+        return None
+    return UnitQuantity(
+        quantity=quantity,
+        unit_text=unit_text,
+        unit=UNIT_REGISTRY.match(unit_text) if unit_text else None,
+    )
+
+
+def parse_quantity_units(values: Iterable[str]) -> list[Optional[UnitQuantity]]:
+    """Batch form of ``parse_quantity_unit`` for backfills and imports."""
+    parsed: dict[str, Optional[UnitQuantity]] = {}
+    results = []
+    for value in values:
+        key = value or ""
+        if key not in parsed:
+            parsed[key] = parse_quantity_unit(key)
+        results.append(parsed[key])
+    return results
+
+
+# Canonical slug -> (base unit slug, size of one unit in the base unit). Prices
+# are normalized to ₪ per liter, per kilogram or per unit; containers count as
+# one unit each (their quantity is a size, not a count).
+BASE_UNITS: dict[str, tuple[str, Decimal]] = {
+    "liter": ("liter", Decimal("1")),
+    "milliliter": ("liter", Decimal("0.001")),
+    "kilogram": ("kilogram", Decimal("1")),
+    "gram": ("kilogram", Decimal("0.001")),
+    "unit": ("unit", Decimal("1")),
+}
+_CONTAINER_SLUGS = frozenset({"pack", "bottle", "can", "bag", "tray", "box", "jar", "tub"})
+
+NORMALIZED_PRICE_QUANT = Decimal("0.0001")
+# PriceReport.normalized_unit_price is DecimalField(max_digits=12, decimal_places=4)
+NORMALIZED_PRICE_LIMIT = Decimal("1e8")
+
+
+def base_unit(entry: Optional[dict]) -> Optional[tuple[str, Decimal]]:
+    """(base unit slug, factor) for a registry entry; None for unknown units."""
+    if entry is None:
+        return None
+    if entry["slug"] in _CONTAINER_SLUGS:
+        return "unit", Decimal("1")
+    return BASE_UNITS.get(entry["slug"])
+
+
+def normalize_unit_price(
+    price,
+    units_in_price: Optional[int],
+    unit_labels: Iterable[str],
+    quantity=None,
+) -> tuple[Optional[Decimal], str]:
+    """Return (price per base unit, base unit slug) for a reported deal.
+
+    ``unit_labels`` are tried in order (e.g. the English, Hebrew and raw unit
+    text of a report); a missing quantity means one unit (e.g. produce
+    priced per kilogram). ``(None, "")`` when no label is a known unit, the
+    quantity is not positive or the result does not fit the stored field.
+    """
+    entry = None
+    for label in unit_labels:
+        if label:
+            entry = UNIT_REGISTRY.match(label)
+            if entry:
+                break
+    base = base_unit(entry)
+    if base is None or price is None:
+        return None, ""
+    base_slug, factor = base
+    per_item = Decimal(price) / (units_in_price or 1)
+    if entry["slug"] in _CONTAINER_SLUGS:
+        normalized = per_item
+    else:
+        quantity = Decimal("1") if quantity is None or quantity == "" else Decimal(quantity)
+        if quantity <= 0:
+            return None, ""
+        normalized = per_item / (quantity * factor)
+    if abs(normalized) >= NORMALIZED_PRICE_LIMIT:
+        return None, ""
+    return normalized.quantize(NORMALIZED_PRICE_QUANT), base_slug
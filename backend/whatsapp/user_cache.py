@@ -0,0 +1,267 @@
+"""Per-user context cache for inbound message handling.
+
+Holds the ``WAUser`` row (keyed by ``wa_id_hash``) and pointers to the user's
+active ``DealReportSession``/``DealLookupSession`` (``None`` meaning "no active
+flow", which saves the lookup entirely). Entries are written through on every
+save via signals (see ``whatsapp.signals``); code that uses ``QuerySet.update``
+must call ``update_user`` or ``forget_sessions`` instead.
+
+``last_seen`` is coalesced in-process: ``touch`` records the timestamp and
+``flush_last_seen`` writes all pending users in one UPDATE, at most once per
+``WHATSAPP_LAST_SEEN_FLUSH_SECONDS``. A background timer armed by the first
+pending touch flushes after that interval even if no other message arrives,
+so a killed process loses at most one interval of ``last_seen`` updates.
+
+The Django cache backend is used, so a shared backend (e.g. Redis) makes the
+cache shared between worker processes. ``WHATSAPP_USER_CACHE_TTL = 0``
+disables it.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import structlog
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Case, CharField, DateTimeField, Value, When
+
+from . import metrics
+from .models import DealLookupSession, DealReportSession, WAUser
+
+
+logger = structlog.get_logger(__name__)
+
+DEAL = "deal"
+LOOKUP = "lookup"
+SESSION_MODELS = {DEAL: DealReportSession, LOOKUP: DealLookupSession}
+
+_MISSING = object()
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "WHATSAPP_USER_CACHE_TTL", 600))
+
+
+def enabled() -> bool:
+    return _ttl() > 0
+
+
+def _user_key(wa_hash: str) -> str:
+    return f"wa:user:{wa_hash}"
+
+
+def _flows_key(user_id) -> str:
+    return f"wa:flows:{user_id}"
+
+
+# --- WAUser ---------------------------------------------------------------
+
+
+def get_user(wa_hash: str) -> Optional[WAUser]:
+    if not enabled():
+        return None
+    user = cache.get(_user_key(wa_hash))
+    metrics.incr("user_cache.hit" if user is not None else "user_cache.miss")
+    return user
+
+
+def store_user(user: WAUser) -> None:
+    if enabled():
+        cache.set(_user_key(user.wa_id_hash), user, _ttl())
+
+
+def invalidate_user(user: WAUser) -> None:
+    if enabled():
+        cache.delete(_user_key(user.wa_id_hash))
+
+
+def update_user(user: WAUser, **fields) -> None:
+    """``UPDATE`` the given fields and keep the in-memory and cached copies in sync."""
+    WAUser.objects.filter(pk=user.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(user, name, value)
+    invalidate_user(user)
+
+
+# --- Active session pointers ---------------------------------------------
+
+
+def _get_pointers(user_id) -> dict:
+    if not enabled():
+        return {}
+    return cache.get(_flows_key(user_id)) or {}
+
+
+def _set_pointer(user_id, kind: str, session_id) -> None:
+    if not enabled():
+        return
+    pointers = _get_pointers(user_id)
+    pointers[kind] = session_id
+    cache.set(_flows_key(user_id), pointers, _ttl())
+
+
+def get_active_session(user: WAUser, kind: str):
+    """Return the user's active session of ``kind`` using the cached pointer."""
+    model = SESSION_MODELS[kind]
+    session_id = _get_pointers(user.pk).get(kind, _MISSING)
+    if session_id is None:
+        metrics.incr("user_cache.flow_hit")
+        return None
+    if session_id is _MISSING:
+        metrics.incr("user_cache.flow_miss")
+        session = model.objects.filter(user=user, is_active=True).order_by("-updated_at").first()
+        _set_pointer(user.pk, kind, session.pk if session else None)
+    else:
+        metrics.incr("user_cache.flow_hit")
+        session = model.objects.filter(pk=session_id, is_active=True).first()
+        if session is None:
+            # Pointer outlived the session (e.g. bulk update elsewhere); recompute next time.
+            forget_sessions(user.pk)
+            return get_active_session(user, kind)
+    if session is not None:
+        session.user = user
+    return session
+
+
+_SESSION_FIELDS = ("id", "step", "data", "is_active", "created_at", "updated_at")
+
+
+def load_active_sessions(user: WAUser) -> dict:
+    """Return ``{DEAL: session|None, LOOKUP: session|None}`` with at most one query.
+
+    Both session tables share their columns, so the active rows are fetched
+    with a single ``UNION ALL``; cached "no active flow" pointers skip it.
+    """
+    pointers = _get_pointers(user.pk)
+    if all(pointers.get(kind, _MISSING) is None for kind in SESSION_MODELS):
+        metrics.incr("user_cache.flow_hit")
+        return {kind: None for kind in SESSION_MODELS}
+
+    metrics.incr("user_cache.flow_miss")
+    parts = [
+        model.objects.filter(user=user, is_active=True)
+        .order_by()
+        .annotate(kind=Value(kind, output_field=CharField()))
+        .values("kind", *_SESSION_FIELDS)
+        for kind, model in SESSION_MODELS.items()
+    ]
+    rows = parts[0].union(*parts[1:], all=True).order_by("-updated_at", "-id")
+
+    sessions: dict = {kind: None for kind in SESSION_MODELS}
+    for row in rows:
+        kind = row["kind"]
+        if sessions[kind] is not None:
+            continue
+        session = SESSION_MODELS[kind].from_db(
+            DEFAULT_DB_ALIAS, list(_SESSION_FIELDS), [row[name] for name in _SESSION_FIELDS]
+        )
+        session.user = user
+        sessions[kind] = session
+    for kind, session in sessions.items():
+        _set_pointer(user.pk, kind, session.pk if session else None)
+    return sessions
+
+
+def session_saved(session) -> None:
+    """Write-through hook for session saves (active pointer follows the row)."""
+    kind = DEAL if isinstance(session, DealReportSession) else LOOKUP
+    if session.is_active:
+        _set_pointer(session.user_id, kind, session.pk)
+    elif _get_pointers(session.user_id).get(kind) == session.pk:
+        _set_pointer(session.user_id, kind, None)
+
+
+def forget_sessions(user_id) -> None:
+    if enabled():
+        cache.delete(_flows_key(user_id))
+
+
+# --- last_seen coalescing -------------------------------------------------
+
+
+_pending_lock = threading.Lock()
+_pending_seen: dict = {}
+_last_flush = time.monotonic()
+_flush_timer: Optional[threading.Timer] = None
+
+
+def _flush_interval() -> float:
+    return float(getattr(settings, "WHATSAPP_LAST_SEEN_FLUSH_SECONDS", 60))
+
+
+def touch(user: WAUser, when: datetime) -> None:
+    """Record activity; written to the DB by the next ``flush_last_seen``."""
+    user.last_seen = when
+    with _pending_lock:
+        _pending_seen[user.pk] = when
+        due = time.monotonic() - _last_flush >= _flush_interval()
+        if not due:
+            _arm_flush_timer()
+    if due:
+        flush_last_seen()
+
+
+def _arm_flush_timer() -> None:
+    """Start the flush timer unless one is pending (call with ``_pending_lock`` held)."""
+    global _flush_timer
+    if _flush_timer is not None:
+        return
+    _flush_timer = threading.Timer(_flush_interval(), _flush_from_timer)
+    _flush_timer.daemon = True
+    _flush_timer.start()
+
+
+def _flush_from_timer() -> None:
+    try:
+        flush_last_seen()
+    except Exception:
+        logger.warning("last_seen_flush_failed", exc_info=True)
+    finally:
+        # The timer thread's own DB connections
+        connections.close_all()
+
+
+def flush_last_seen() -> int:
+    """Write all pending ``last_seen`` values in a single UPDATE."""
+    global _last_flush, _flush_timer
+    with _pending_lock:
+        pending = dict(_pending_seen)
+        _pending_seen.clear()
+        _last_flush = time.monotonic()
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+    if not pending:
+        return 0
+    WAUser.objects.filter(pk__in=list(pending)).update(
+        last_seen=Case(
+            *(When(pk=pk, then=Value(when)) for pk, when in pending.items()),
+            output_field=DateTimeField(),
+        )
+    )
+    metrics.incr("user_cache.last_seen_flushed", len(pending))
+    return len(pending)
+
+
+def _flush_at_exit() -> None:
+    # Best effort on a clean shutdown; the timer bounds what a killed process loses
+    try:
+        flush_last_seen()
+    except Exception:  # pragma: no cover - best effort during interpreter shutdown
+        logger.warning("last_seen_flush_failed", exc_info=True)
+
+
+def _reset_after_fork() -> None:
+    # Timer threads do not survive fork; let the child arm its own
+    global _flush_timer
+    _flush_timer = None
+
+
+atexit.register(_flush_at_exit)
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -2,20 +2,20 @@ from __future__ import annotations
 import hashlib
 import re
 import json
-from urllib import request, error
+from typing import Iterable, Sequence
 from django.conf import settings
 from django.utils import translation
 from django.utils.translation import gettext as _
-from langdetect import DetectorFactory, LangDetectException, detect_langs
 import structlog
 
+from .language import detect_locale  # noqa: F401 - re-exported for callers
+from .text_normalization import COMMANDS, match_intents, normalize_for_match
+from .transport import OutboundRequest, SendResult, get_transport
+
 
 logger = structlog.get_logger(__name__)
 
 _NON_DIGIT = re.compile(r"\D+")
-LANG_PROB_THRESHOLD = 0.85
-
-DetectorFactory.seed = 0
 
 
 def normalize_wa_id(raw: str) -> str:
@@ -41,43 +41,13 @@ def normalize_locale(locale: str) -> str:
     return "en"
 
 
-def detect_locale(text: str) -> str:
-    """Detect locale with langdetect; fall back to character heuristic."""
-    sample = (text or "").strip()
-    if sample:
-        try:
-            candidates = detect_langs(sample)
-            if candidates:
-                best = max(candidates, key=lambda c: c.prob)
-                if best.prob >= LANG_PROB_THRESHOLD:
-                    if best.lang.startswith("he"):
-                        return "he"
-                    if best.lang.startswith("en"):
-                        return "en"
-        except LangDetectException:
-            logger.debug("langdetect_failed", exc_info=True)
-        except Exception:
-            logger.exception("langdetect_unexpected_error")
-
-    return "en"
-
-
 def parse_language_choice(text: str) -> str | None:
     """Parse explicit language choice from user text.
 
     Accepts digits (1/2), language names (English/עברית), and short codes (he/en).
     Returns 'he', 'en', or None if no explicit choice detected.
     """
-    t = (text or "").strip().lower()
-    if not t:
-        return None
-
-    # Normalize common tokens; allow matching even if surrounded by other text
-    if "עברית" in t or re.search(r"\bhe\b", t) or t == "1":
-        return "he"
-    if "english" in t or re.search(r"\ben\b", t) or t == "2":
-        return "en"
-    return None
+    return match_intents(normalize_for_match(text)).language
 
 
 def get_language_prompt() -> str:
@@ -85,28 +55,26 @@ def get_language_prompt() -> str:
     return "Please choose your language / נא לבחור שפה\n" "1) עברית\n" "2) English"
 
 
-ADD_COMMANDS = {"add deal", "add a deal", "הוסף דיל", "הוספת דיל"}
-FIND_COMMANDS = {"find deal", "find a deal", "מצא דיל", "חפש דיל"}
+ADD_COMMANDS = COMMANDS["add"]
+FIND_COMMANDS = COMMANDS["find"]
 
 
 def is_add_command(text: str | None) -> bool:
     """Check if text (already normalized upstream) is an add command.
 
-    Upstream webhook normalizes input using `normalize_for_match`. Here we only
-    trim whitespace to avoid duplicate normalization.
+    Upstream webhook normalizes input using `normalize_for_match`; handlers
+    read the precomputed ``UserMessageContext.intents`` instead.
     """
-    t = (text or "").strip()
-    return t in ADD_COMMANDS
+    return match_intents((text or "").strip()).command == "add"
 
 
 def is_find_command(text: str | None) -> bool:
     """Check if text (already normalized upstream) is a find command.
 
-    Upstream webhook normalizes input using `normalize_for_match`. Here we only
-    trim whitespace to avoid duplicate normalization.
+    Upstream webhook normalizes input using `normalize_for_match`; handlers
+    read the precomputed ``UserMessageContext.intents`` instead.
     """
-    t = (text or "").strip()
-    return t in FIND_COMMANDS
+    return match_intents((text or "").strip()).command == "find"
 
 
 def get_intro_message(locale: str) -> str:
@@ -136,63 +104,98 @@ def get_intro_buttons(locale: str) -> list[dict[str, str]]:
         ]
 
 
-def _build_request(payload: dict) -> request.Request | None:
+def _build_request(payload: dict) -> OutboundRequest | None:
     token = getattr(settings, "WHATSAPP_ACCESS_TOKEN", "")
     phone_id = getattr(settings, "WHATSAPP_PHONE_NUMBER_ID", "")
     if not token or not phone_id:
         logger.warning("whatsapp_credentials_missing")
         return None
 
-    url = f"https://graph.facebook.com/v20.0/{phone_id}/messages"
     data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-    return request.Request(
-        url,
-        data=data,
+    return OutboundRequest(
+        path=f"/{phone_id}/messages",
+        body=data,
         headers={
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
             "Accept": "application/json",
         },
-        method="POST",
     )
 
 
-def _execute_request(req: request.Request | None) -> bool:
-    if req is None:
-        return False
-    try:
-        with request.urlopen(req, timeout=10) as resp:
-            return 200 <= resp.status < 300
-    except error.HTTPError as e:
+def _log_send_result(result: SendResult) -> None:
+    if result.ok:
+        return
+    if result.status is not None:
         logger.error(
             "whatsapp_send_failed_http",
-            status=e.code,
-            reason=getattr(e, "reason", ""),
+            status=result.status,
+            reason=result.error[:200],
         )
-    except Exception:
+    else:
+        logger.error("whatsapp_send_failed_unexpected", error=result.error)
+
+
+def send_request(req: OutboundRequest | None) -> SendResult:
+    """Send a prepared request over the pooled keep-alive transport."""
+    if req is None:
+        return SendResult(ok=False, error="credentials missing")
+    try:
+        result = get_transport().send(req)
+    except Exception as exc:
         logger.exception("whatsapp_send_failed_unexpected")
-    return False
+        return SendResult(ok=False, error=f"{type(exc).__name__}: {exc}")
+    _log_send_result(result)
+    return result
 
 
-def send_whatsapp_text(to_e164: str, body: str) -> bool:
-    """Send a plain text WhatsApp message."""
-    payload = {
+def _execute_request(req: OutboundRequest | None) -> bool:
+    return send_request(req).ok
+
+
+def send_whatsapp_batch(payloads: Sequence[dict], max_workers: int | None = None) -> list[bool]:
+    """Send many message payloads concurrently; returns per-payload success flags.
+
+    Concurrency is bounded by ``max_workers`` (default WHATSAPP_SEND_CONCURRENCY)
+    and all workers share the process-wide connection pool.
+    """
+    requests = [_build_request(payload) for payload in payloads]
+    ready = [req for req in requests if req is not None]
+    workers = max_workers or int(getattr(settings, "WHATSAPP_SEND_CONCURRENCY", 8))
+    results = iter(get_transport().send_many(ready, max_workers=workers))
+    flags: list[bool] = []
+    for req in requests:
+        if req is None:
+            flags.append(False)
+            continue
+        result = next(results)
+        _log_send_result(result)
+        flags.append(result.ok)
+    return flags
+
+
+def text_payload(to_e164: str, body: str) -> dict:
+    return {
         "messaging_product": "whatsapp",
         "recipient_type": "individual",
         "to": to_e164,
         "type": "text",
         "text": {"body": body, "preview_url": False},
     }
-    return _execute_request(_build_request(payload))
 
 
-def send_whatsapp_buttons(
-    to_e164: str, body: str, buttons: list[dict[str, str]]
-) -> bool:
-    """Send an interactive message with quick-reply buttons (max 3).
+def send_whatsapp_texts(messages: Iterable[tuple[str, str]]) -> list[bool]:
+    """Send (recipient, body) text messages as one concurrent batch."""
+    return send_whatsapp_batch([text_payload(to, body) for to, body in messages])
 
-    Falls back to text if buttons list is empty.
-    """
+
+def send_whatsapp_text(to_e164: str, body: str) -> bool:
+    """Send a plain text WhatsApp message."""
+    return _execute_request(_build_request(text_payload(to_e164, body)))
+
+
+def buttons_payload(to_e164: str, body: str, buttons: list[dict[str, str]]) -> dict:
+    """Interactive quick-reply payload (max 3 buttons); plain text if no button is usable."""
     safe_buttons = []
     for btn in buttons:
         btn_id = (btn.get("id") or "").strip()[:128]
@@ -204,9 +207,9 @@ def send_whatsapp_buttons(
             break
 
     if not safe_buttons:
-        return send_whatsapp_text(to_e164, body)
+        return text_payload(to_e164, body)
 
-    payload = {
+    return {
         "messaging_product": "whatsapp",
         "recipient_type": "individual",
         "to": to_e164,
@@ -217,4 +220,16 @@ def send_whatsapp_buttons(
             "action": {"buttons": safe_buttons},
         },
     }
+
+
+def send_whatsapp_buttons(
+    to_e164: str, body: str, buttons: list[dict[str, str]]
+) -> bool:
+    """Send an interactive message with quick-reply buttons (max 3).
+
+    Falls back to text if buttons list is empty.
+    """
+    payload = buttons_payload(to_e164, body, buttons)
+    if payload["type"] != "interactive":
+        return send_whatsapp_text(to_e164, body)
     return _execute_request(_build_request(payload))
@@ -11,20 +11,9 @@ from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework import status
 
-from .utils import (
-    normalize_wa_id,
-    send_whatsapp_text,
-    send_whatsapp_buttons,
-)
-from .deal_flow import FlowMessage
+from .ingest import enqueue_payload, is_async_enabled
+from .processing import process_webhook_payload
 from .throttling import IPRateThrottle, WaHashRateThrottle
-from structlog import contextvars as structlog_contextvars
-from .handlers import (
-    HANDLERS,
-    fallback_payload,
-    summarize_payload,
-    _build_user_context,
-)
 
 
 logger = structlog.get_logger(__name__)
@@ -79,83 +68,11 @@ class MetaWebhookView(APIView):
             logger.exception("webhook_json_decode_failed")
             return JsonResponse({"detail": "bad json"}, status=status.HTTP_400_BAD_REQUEST)
 
-        processed: int = 0
-        # WhatsApp webhook structure: entry -> changes -> value -> messages[]
-        for entry in payload.get("entry", []):
-            for change in entry.get("changes", []):
-                value = change.get("value", {})
-                messages = value.get("messages", []) or []
-                contacts = {c.get("wa_id"): c for c in value.get("contacts", [])}
-                for msg in messages:
-                    structlog_contextvars.clear_contextvars()
-                    wa_raw = str(msg.get("from", ""))
-                    wa_norm = normalize_wa_id(wa_raw)
-                    logger.info("webhook_processing_message", wa_raw=wa_raw, message=msg)
-                    if not wa_norm:
-                        logger.warning("webhook_unable_to_normalize_wa", wa_raw=wa_raw)
-                        continue
-
-                    # Resolve user and message context once
-                    ctx = _build_user_context(wa_norm=wa_norm, msg=msg, contacts=contacts, value=value)
-                    logger.info(
-                        "webhook_user_resolved",
-                        user_id=ctx.user.pk,
-                        created=ctx.created,
-                        wa_number=ctx.wa_norm,
-                        locale=ctx.current_locale,
-                    )
-
-                    # Generic state-machine evaluation via handlers
-                    state = None
-                    handled = False
-                    try:
-                        for state_name, handler in HANDLERS:
-                            payload = handler(ctx, msg)
-                            if payload:
-                                state = state_name
-                                logger.info("handler_state", state=state, wa_hash=ctx.wa_hash)
-                                _send_flow_message(ctx.wa_norm, payload)
-                                logger.info(
-                                    "handler_response_sent",
-                                    wa_hash=ctx.wa_hash,
-                                    payload=summarize_payload(payload),
-                                )
-                                processed += 1
-                                handled = True
-                                break
-                            else:
-                                logger.info("handler_no_response", state=state_name, wa_hash=ctx.wa_hash)
-                    except Exception:
-                        logger.exception("handler_send_failed", wa_hash=ctx.wa_hash)
-
-                    if handled:
-                        continue
-
-                    # Fallback: intro/help
-                    state = state or "FALLBACK"
-                    fallback = fallback_payload(ctx)
-                    logger.info("handler_fallback_intro", state=state, wa_hash=ctx.wa_hash)
-                    _send_flow_message(ctx.wa_norm, fallback)
-                    logger.info(
-                        "handler_fallback_response",
-                        wa_hash=ctx.wa_hash,
-                        payload=summarize_payload(fallback),
-                    )
-                    processed += 1
+        if is_async_enabled():
+            event = enqueue_payload(payload)
+            logger.info("webhook_payload_queued", event_id=event.pk if event else None)
+            return JsonResponse({"status": "queued", "queued": 1 if event else 0})
 
+        processed = process_webhook_payload(payload)
         logger.info("webhook_processing_completed", processed=processed)
         return JsonResponse({"status": "ok", "processed": processed})
-     
-     
-def _send_flow_message(recipient: str, payload: FlowMessage | str) -> None:
-    if isinstance(payload, FlowMessage):
-        text = payload.text
-        buttons = payload.buttons or []
-        if buttons:
-            sent = send_whatsapp_buttons(recipient, text, buttons)
-            if not sent:
-                send_whatsapp_text(recipient, text)
-        else:
-            send_whatsapp_text(recipient, text)
-    else:
-        send_whatsapp_text(recipient, payload)